@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Batch execution of several simulations with deduplication of their common
+# 				tasks. The workflows are merged, the task instances with the same script,
+# 				parameters (apart from the results directory), inputs, and predecessors
+# 				are executed only once, and their outputs are copied to every simulation.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, shutil, time, hashlib
+
+from humain.constants import *
+from humain.utils import *
+from humain.simulation import *
+
+##############################################################################################################################
+# Copies the outputs of a task (and their sibling metrics directories) to the output locations of an equivalent task
+def copy_outputs( src_paths, dst_paths ):
+	for src_output, dst_output in zip( src_paths, dst_paths ):
+		for src in related_paths( src_output ):
+			dst = dst_output if src == src_output else os.path.dirname( dst_output ) + "/metrics"
+			if os.path.isdir( src ):
+				# In the memory results mode, the destination can be a link to a directory in memory: only its content is replaced
+				if os.path.islink( dst ):
+					delete_files_folders( dst )
+				elif os.path.isdir( dst ):
+					shutil.rmtree( dst )
+				shutil.copytree( src, dst, dirs_exist_ok = True )
+			elif os.path.isfile( src ):
+				verify_create_dir( os.path.dirname( dst ), 'The output directory (' + os.path.dirname( dst ) + ') could not be created.', None, 70 )
+				shutil.copy2( src, dst )
+
+
+class Batch:
+	'Several simulations executed together, running only once the tasks that they have in common'
+	######################################################################################################################################
+	# Constructor
+	def __init__(self, project, workflow, sim_names, execution_mode = None, jobs = 1, use_cache = True, queue_dir = None, memory_results = False, persist_patterns = None):
+		self.sims = [ Simulation( project, workflow, sim_name, execution_mode, 1, use_cache, None, memory_results, persist_patterns ) for sim_name in sim_names ]
+		self.sim_names = list(sim_names)
+		self.pool = create_pool( jobs, queue_dir )
+		self.fingerprints = ResultCache()
+		self.signatures = {}	# (simulation index, task) -> signature
+		self.nodes = {}			# signature -> {'members': [(simulation index, task)], 'preds': set of signatures}
+		self.order = []			# signatures in a deterministic order
+
+	######################################################################################################################################
+	# Signature of a task instance: script, parameters (the results directory of the simulation is normalized), content of the
+	# inputs that are not produced by the simulation, and signatures of the predecessors
+	def signature( self, i, task_name ):
+		if (i, task_name) in self.signatures:
+			return( self.signatures[ (i, task_name) ] )
+
+		sim = self.sims[ i ]
+		node = sim.workflow.node[ task_name ]
+		h = hashlib.blake2b( digest_size = 20 )
+		h.update( self.fingerprints.fingerprint_file( node['script'] ).encode('utf8') )
+		h.update( str(sim.get_execution_mode( task_name )).encode('utf8') )
+		for p_name, p_type in node['param_types'].items():
+			for p_value in node['param_values'][ p_name ]:
+				value = BASE_DIR + "/" + p_value
+				internal = value == sim.project_results or value.startswith( sim.project_results + "/" )
+				h.update( (p_name + "\0" + p_type + "\0" + value.replace( sim.project_results, "<results>" ) + "\n").encode('utf8') )
+				if (p_type in ['JPG', 'TXT', 'TSV', 'D_JPG', 'D_TXT', 'D_AR', 'D_JSON']) and not internal:
+					for path in related_paths( value ):
+						h.update( self.fingerprints.fingerprint( path ).encode('utf8') )
+		for predecessor_task in sorted( sim.workflow.predecessors( task_name ) ):
+			h.update( self.signature( i, predecessor_task ).encode('utf8') )
+
+		self.signatures[ (i, task_name) ] = h.hexdigest()
+		return( self.signatures[ (i, task_name) ] )
+
+	######################################################################################################################################
+	# Merges the workflows of the (non iterative) simulations in a graph of unique task instances
+	def plan( self ):
+		for i, sim in enumerate( self.sims ):
+			if sim.iterative:
+				continue
+			for task_name in sequential_order( sim.workflow, sim.next_task ):
+				sig = self.signature( i, task_name )
+				if not (sig in self.nodes):
+					preds = set( self.signature( i, p ) for p in sim.workflow.predecessors( task_name ) )
+					self.nodes[ sig ] = { 'members': [], 'preds': preds }
+					self.order.append( sig )
+				self.nodes[ sig ]['members'].append( (i, task_name) )
+		self.fingerprints.save_fingerprints()
+
+	######################################################################################################################################
+	# Executes the unique tasks (each one in its first simulation) and copies their outputs to the other simulations. Then runs the
+	# metrics and post-processing scripts of every simulation. Returns a dictionary: simulation -> {returncode, elapsed}.
+	def run( self ):
+		start = time.time()
+		self.plan()
+
+		returncodes = {}
+		ordered_logs = []
+		for i, sim in enumerate( self.sims ):
+			ordered_logs.append( OrderedLog( sim.log_pathfilename ) )
+			if sim.iterative:
+				continue
+			write_log( sim.log_pathfilename, "Simulation starts.", init = True )
+			sim.save_basic_info()
+			sim.place_results_in_memory()
+			sim.trace = TaskTrace( sim.trace_pathfilename )
+			ordered_logs[ i ].set_order( sequential_order( sim.workflow, sim.next_task ) )
+
+		n_instances = sum( len(self.nodes[ sig ]['members']) for sig in self.order )
+		print( "Batch: " + str(n_instances) + " task instances, " + str(len(self.order)) + " unique tasks to execute." )
+
+		done = set()
+		failed = set()
+		pending = list(self.order)
+		running = {}		# Future -> (signature, messages of the representative, cache key, execution mode)
+		while (len(pending) > 0) or (len(running) > 0):
+			# Launch the unique tasks whose predecessors finished, while there are free workers
+			for sig in list(pending):
+				if len(running) >= self.pool.jobs:
+					break
+				preds = self.nodes[ sig ]['preds']
+				if len(preds & failed) > 0:
+					pending.remove( sig )
+					failed.add( sig )
+					continue
+				if not preds.issubset( done ):
+					continue
+				pending.remove( sig )
+				i, task_name = self.nodes[ sig ]['members'][0]
+				sim = self.sims[ i ]
+				msg_list = []
+				execution_parameters = sim.get_execution_parameters( task_name, msg_list )
+				script_filename = sim.workflow.node[ task_name ]['script']
+				cache_key = None
+				if sim.cache and sim.workflow.node[ task_name ]['cacheable']:
+					start_ns = time.time_ns()
+					cache_key = sim.cache.task_key( script_filename, execution_parameters, sim.get_task_inputs( task_name ) )
+					if sim.cache.restore( cache_key, sim.get_task_outputs( task_name ) ):
+						msg_list.append( "Task " + task_name + " was restored from the cache." )
+						running[ completed_future( (0, usage_record( start_ns, time.time_ns() )) ) ] = ( sig, msg_list, None, 'cache' )
+						continue
+				future = self.pool.submit( script_filename, execution_parameters, sim.get_execution_mode( task_name ), sim.get_task_inputs( task_name ), sim.get_task_outputs( task_name ),
+					sim.manifest_pathfilename( task_name ) )
+				msg_list.append( "Task " + task_name + " was successfully executed." )
+				running[ future ] = ( sig, msg_list, cache_key, sim.get_execution_mode( task_name ) )
+
+			# Wait until (at least) one of the running tasks finishes
+			for future in self.pool.wait_any( list(running) ):
+				sig, msg_list, cache_key, mode = running.pop( future )
+				returncode, usage = future.result()
+				members = self.nodes[ sig ]['members']
+				i, task_name = members[0]
+				self.sims[ i ].trace.add( task_name, 'task', mode, 0, returncode, usage, self.sims[ i ].get_task_inputs( task_name ), self.sims[ i ].get_task_outputs( task_name ) )
+				if returncode != 0:
+					failed.add( sig )
+					for j, member_task in members:
+						returncodes[ j ] = returncode
+						ordered_logs[ j ].add( member_task, [ "ERROR: Task " + member_task + " generated an error (exit code " + str(returncode) + ").\n" ] )
+					continue
+
+				if mode == 'cache':
+					manifest = record_manifest( self.sims[ i ].manifest_pathfilename( task_name ), self.sims[ i ].get_task_outputs( task_name ) )
+				else:
+					manifest = read_manifest( self.sims[ i ].manifest_pathfilename( task_name ) )
+				self.sims[ i ].verifyTaskOutput( task_name, manifest )
+				msg_list.append( "The output of the " + task_name  + " Task has been successfully verified." )
+				if not (cache_key is None):
+					self.sims[ i ].cache.store( cache_key, task_name, self.sims[ i ].get_task_outputs( task_name ) )
+				ordered_logs[ i ].add( task_name, msg_list )
+
+				# The outputs are copied to the other simulations that have the same task instance
+				for j, member_task in members[1:]:
+					start_ns = time.time_ns()
+					copy_outputs( self.sims[ i ].get_task_outputs( task_name ), self.sims[ j ].get_task_outputs( member_task ) )
+					self.sims[ j ].trace.add( member_task, 'task', 'shared', 0, 0, usage_record( start_ns, time.time_ns() ),
+						self.sims[ j ].get_task_inputs( member_task ), self.sims[ j ].get_task_outputs( member_task ) )
+					self.sims[ j ].verifyTaskOutput( member_task, record_manifest( self.sims[ j ].manifest_pathfilename( member_task ), self.sims[ j ].get_task_outputs( member_task ) ) )
+					ordered_logs[ j ].add( member_task, [ "Task " + member_task + " was shared with the simulation " + self.sim_names[ i ] + " (outputs copied).",
+						"The output of the " + member_task  + " Task has been successfully verified." ] )
+				done.add( sig )
+
+		self.pool.shutdown()
+
+		# Metrics and post-processing of every simulation. The iterative simulations are executed on their own.
+		results = {}
+		for i, sim in enumerate( self.sims ):
+			returncode = returncodes.get( i, 0 )
+			try:
+				if sim.iterative:
+					sim.run()
+				else:
+					ordered_logs[ i ].flush( force = True )
+					if returncode == 0:
+						sim.run_scripts( ['metrics', 'post-processing'] )
+						sim.wait_scripts()
+						write_log( sim.log_pathfilename, "Simulation finishes." )
+					sim.trace.export_chrome( sim.chrome_trace_pathfilename )
+			except SystemExit as e:
+				returncode = e.code if isinstance( e.code, int ) else 1
+			if sim.memory:
+				sim.memory.persist()
+			results[ self.sim_names[ i ] ] = { 'simulation': self.sim_names[ i ], 'returncode': returncode, 'elapsed': time.time() - start }
+			if sim.cache:
+				sim.cache.save_fingerprints()
+		return( results )
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Measures the per-task launching overhead of the subprocess and in-process
+# 				execution modes for the tasks of a workflow. With --check, it executes the
+# 				tasks once in-process instead (smoke check of their main( argv ) functions).
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import sys, argparse, time, subprocess, io, contextlib, shlex, ntpath
+
+from humain.simulation import *
+
+
+##############################################################################################################################
+# Average time (in milliseconds) to launch the script n times. The --help argument makes the script exit right after
+# its imports and the creation of its parser, so only the launching overhead is measured.
+def launch_time( script_filename, execution_mode, n ):
+	start = time.perf_counter()
+	for i in range(n):
+		if execution_mode == 'in-process':
+			with contextlib.redirect_stdout( io.StringIO() ):
+				run_in_process( script_filename, ['--help'] )
+		else:
+			run_subprocess( script_filename, ['--help'], stdout = subprocess.DEVNULL )
+	return( (time.perf_counter() - start) * 1000.0 / n )
+
+##############################################################################################################################
+# Smoke check of the in-process mode: every task of the simulation (in the order of the workflow, with the parameters of its first
+# iteration) and every extra command (script, relative to the tasks directory, and its arguments) is executed once through its
+# main( argv ). Returns a list of (name, exit code), with None for the scripts without a main function.
+def check_in_process( sim, extra_commands ):
+	commands = []
+	if sim.iterative:
+		sim.start_iteration( 0, "/".join(sim.project_results.split('/')[-2:]) )
+	for task_name in sequential_order( sim.workflow, sim.next_task ):
+		commands.append( ( task_name, sim.workflow.node[ task_name ]['script'], None ) )
+	for command in extra_commands:
+		words = shlex.split( command )
+		script_filename = words[0] if os.path.isfile( words[0] ) else sim.tasks_dir + "/" + words[0]
+		commands.append( ( ntpath.basename( script_filename ), script_filename, words[1:] ) )
+
+	results = []
+	for name, script_filename, args_list in commands:
+		if not supports_in_process( script_filename ):
+			results.append( ( name, None ) )
+			continue
+		# The inputs of a task are verified when its predecessors have been executed
+		if args_list is None:
+			args_list = sim.get_execution_parameters( name, [] )
+		with contextlib.redirect_stdout( io.StringIO() ):
+			results.append( ( name, run_in_process( script_filename, args_list ) ) )
+	return( results )
+
+
+if __name__ == '__main__':
+	""" Measures the per-task launching overhead of the subprocess and in-process execution modes for the tasks of a workflow.
+	"""
+	parser = argparse.ArgumentParser("Measures the per-task launching overhead of the subprocess and in-process execution modes for the tasks of a workflow.")
+	parser.add_argument('-p', '--project', action="store", required=True, help="Project name (directory name of the project).")
+	parser.add_argument('-w', '--workflow', action="store", required=True, help="Workflow name (name of the workflow file) without .csv.")
+	parser.add_argument('-s', '--sim_file', action="store", required=True, help="Name of the file with the parameters for the simulation (do not require the .xml extension)")
+	parser.add_argument('-n', '--repetitions', action="store", required=False, type=int, default=5, help="Number of launches of every task in each execution mode.")
+	parser.add_argument('-c', '--check', action="store_true", help="Instead of measuring the overhead, execute every task once in-process (with the parameters of the simulation) and report its exit code.")
+	parser.add_argument('-x', '--check_script', action="append", required=False, default=[], help="With --check, also execute in-process a script of the tasks directory with its arguments (quoted: \"script.py --arg value\"). One or more.")
+	args = parser.parse_args()
+
+	# Usage examples
+	# python3 benchmark_execution.py -p selfie -w recorded_by_hitl -s recorded_by_hitl -n 10
+	# python3 benchmark_execution.py -p selfie -w event_date -s event_date -c -x "getDate_dir.py -sd ../selfie/results/event_date/ocr_sim -o /tmp/dates.tsv"
+
+	if args.repetitions < 1:
+		print( "\nERROR: The number of repetitions must be greater than zero.\n" )
+		parser.print_help()
+		sys.exit( 1 )
+
+	sim = Simulation( args.project, args.workflow, args.sim_file )
+
+	if args.check:
+		results = check_in_process( sim, args.check_script )
+		for name, returncode in results:
+			print( name.ljust(20) + ( "(no main function)" if returncode is None else "exit code " + str(returncode) ) )
+		if any( not (returncode in [None, 0]) for name, returncode in results ):
+			print( "\nERROR: Some scripts failed in-process.\n" )
+			sys.exit( 2 )
+		sys.exit( 0 )
+
+	print( "Task".ljust(20) + "subprocess (ms)".rjust(18) + "import, once (ms)".rjust(20) + "in-process (ms)".rjust(18) )
+	total_subprocess, total_import, total_in_process = 0.0, 0.0, 0.0
+	for task_name in list(sim.workflow):
+		script_filename = sim.workflow.node[ task_name ]['script']
+		subprocess_ms = launch_time( script_filename, 'subprocess', args.repetitions )
+		# In-process, the module of the script is imported only once (the first time)
+		start = time.perf_counter()
+		in_process = supports_in_process( script_filename )
+		import_ms = (time.perf_counter() - start) * 1000.0
+		if not in_process:
+			print( task_name.ljust(20) + ("%.1f" % subprocess_ms).rjust(18) + "(no main function)".rjust(20) )
+			continue
+		in_process_ms = launch_time( script_filename, 'in-process', args.repetitions )
+		print( task_name.ljust(20) + ("%.1f" % subprocess_ms).rjust(18) + ("%.1f" % import_ms).rjust(20) + ("%.3f" % in_process_ms).rjust(18) )
+		total_subprocess += subprocess_ms
+		total_import += import_ms
+		total_in_process += in_process_ms
+
+	print( "\nOverhead per workflow execution: subprocess = %.1f ms, in-process = %.3f ms (plus %.1f ms of imports, once per simulation)." % (total_subprocess, total_in_process, total_import) )
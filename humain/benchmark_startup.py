@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Measures the startup time of the simulator: the import time of its modules
+# 				(python -X importtime) and the cold start, from the launch of the
+# 				interpreter to the moment the first task of a simulation can be launched.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, sys, argparse, time, subprocess
+
+from humain.constants import *
+
+# Code run in a new interpreter: loads the simulation and prepares the arguments of its first task
+COLD_START_CODE = """
+import sys, time
+from humain.simulation import Simulation
+sim = Simulation( sys.argv[1], sys.argv[2], sys.argv[3] )
+sim.get_execution_parameters( sim.next_task[0], [] )
+print( time.time() )
+"""
+
+##############################################################################################################################
+# Environment of the child interpreters: the simulator's directory is added to PYTHONPATH
+def child_environment():
+	env = dict( os.environ )
+	env['PYTHONPATH'] = BASE_DIR + ( os.pathsep + env['PYTHONPATH'] if env.get('PYTHONPATH') else "" )
+	return( env )
+
+##############################################################################################################################
+# Import time of the modules (microseconds) reported by python -X importtime. Returns (time of the module, list of (cumulative, module)).
+def import_times( module_name ):
+	output = subprocess.run( args = [ sys.executable, "-X", "importtime", "-c", "import " + module_name ], stderr = subprocess.PIPE,
+		universal_newlines = True, env = child_environment() )
+	modules = []
+	for line in output.stderr.splitlines():
+		if not line.startswith( "import time:" ) or ("cumulative" in line):
+			continue
+		self_us, cumulative_us, name = line[ len("import time:"): ].split('|')
+		modules.append( ( int(cumulative_us), name.rstrip() ) )
+	total = sum( c for c, name in modules if name.strip() == module_name )
+	return( total, modules )
+
+##############################################################################################################################
+# Time (milliseconds) from the launch of a new interpreter to the moment the first task of the simulation can be launched
+def cold_start_time( project, workflow, sim_name ):
+	start = time.time()
+	output = subprocess.run( args = [ sys.executable, "-c", COLD_START_CODE, project, workflow, sim_name ], stdout = subprocess.PIPE,
+		universal_newlines = True, env = child_environment() )
+	if output.returncode != 0:
+		print( "\nERROR: The simulation " + sim_name + " could not be loaded (exit code " + str(output.returncode) + ").\n" )
+		sys.exit( 2 )
+	return( (float( output.stdout.strip().splitlines()[-1] ) - start) * 1000.0 )
+
+
+if __name__ == '__main__':
+	""" Measures the import time of the simulator's modules and the cold start time of a simulation.
+	"""
+	parser = argparse.ArgumentParser("Measures the import time of the simulator's modules and the cold start time of a simulation.")
+	parser.add_argument('-p', '--project', action="store", required=True, help="Project name (directory name of the project).")
+	parser.add_argument('-w', '--workflow', action="store", required=True, help="Workflow name (name of the workflow file) without .csv.")
+	parser.add_argument('-s', '--sim_file', action="store", required=True, help="Name of the file with the parameters for the simulation (do not require the .xml extension)")
+	parser.add_argument('-n', '--repetitions', action="store", required=False, type=int, default=5, help="Number of cold starts measured.")
+	parser.add_argument('-t', '--top', action="store", required=False, type=int, default=10, help="Number of modules with the largest import time shown.")
+	parser.add_argument('-m', '--max_ms', action="store", required=False, type=float, default=None, help="Maximum cold start time (ms). The script exits with code 3 if the median is larger.")
+	args = parser.parse_args()
+
+	# Usage example
+	# python3 benchmark_startup.py -p selfie -w scientific_name -s scientific_name_50 -m 1000
+
+	if args.repetitions < 1:
+		print( "\nERROR: The number of repetitions must be greater than zero.\n" )
+		parser.print_help()
+		sys.exit( 1 )
+
+	total_us, modules = import_times( "humain.simulation" )
+	print( "Import time of humain.simulation: %.1f ms. Largest imports (cumulative):" % (total_us / 1000.0) )
+	for cumulative_us, name in sorted( modules, reverse = True )[ :args.top ]:
+		print( "\t" + ("%.1f ms" % (cumulative_us / 1000.0)).rjust(10) + "  " + name.strip() )
+
+	# The first cold start also compiles the plan of the simulation (it is reused by the next ones)
+	times = sorted( cold_start_time( args.project, args.workflow, args.sim_file ) for i in range(args.repetitions) )
+	median = times[ len(times) // 2 ]
+	print( "\nCold start to first task launch: median %.1f ms, min %.1f ms, max %.1f ms (%d runs)." % (median, times[0], times[-1], len(times)) )
+
+	if (not (args.max_ms is None)) and median > args.max_ms:
+		print( "\nERROR: The cold start time (%.1f ms) exceeds the maximum (%.1f ms).\n" % (median, args.max_ms) )
+		sys.exit( 3 )
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Content-addressed cache of the tasks' results. The key of an execution is
+# 				the hash of the task's script, its arguments, and the content of its input
+# 				files and directories. The cache has a size limit (LRU eviction).
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, shutil, json, time, hashlib, mmap, fcntl
+
+from humain.constants import *
+from humain.utils import *
+
+# Files of this size (bytes) or larger are hashed through a memory map instead of being read in blocks
+MMAP_MIN_SIZE = 1 << 20
+
+##############################################################################################################################
+# Hash of the content of a file
+def file_digest( pathfilename ):
+	h = hashlib.blake2b( digest_size = 20 )
+	with open( pathfilename, "rb" ) as f:
+		if os.fstat( f.fileno() ).st_size >= MMAP_MIN_SIZE:
+			with mmap.mmap( f.fileno(), 0, access = mmap.ACCESS_READ ) as m:
+				h.update( m )
+		else:
+			h.update( f.read() )
+	return( h.hexdigest() )
+
+##############################################################################################################################
+# Total size, in bytes, of the files of a directory (recursively)
+def dir_size( dir_name ):
+	total = 0
+	for root, dirs, files in os.walk( dir_name ):
+		for f in files:
+			total += os.path.getsize( os.path.join(root, f) )
+	return( total )
+
+##############################################################################################################################
+# Paths related to a file or directory: a file's sibling "metrics" directory is also part of the data (tasks save their metrics there)
+def related_paths( path ):
+	if os.path.isdir( path ):
+		return( [ path ] )
+	metrics_dir = os.path.dirname( path ) + "/metrics"
+	if os.path.isdir( metrics_dir ):
+		return( [ path, metrics_dir ] )
+	return( [ path ] )
+
+
+class ResultCache:
+	'Cache of the outputs of the tasks, indexed by the hash of the script, the arguments, and the content of the inputs'
+	######################################################################################################################################
+	# Constructor
+	def __init__(self, cache_dir = CACHE_DIR, size_limit = CACHE_SIZE_LIMIT):
+		self.cache_dir = cache_dir
+		self.entries_dir = cache_dir + "/entries"
+		verify_create_dir( self.entries_dir, 'The cache directory (' + self.entries_dir + ') could not be created.', None, 50 )
+		self.size_limit = size_limit
+
+		# Manifests of the outputs produced in this execution: the inputs they contain are fingerprinted without reading them
+		self.manifests = []
+
+		# Digests of the files, valid while their size and modification time do not change: path -> [size, mtime_ns, digest]
+		# The digests computed in this execution are saved once, at its end (see save_fingerprints)
+		self.fingerprints_pathfilename = cache_dir + "/fingerprints.json"
+		self.fingerprints = self.load_fingerprints()
+		self.new_fingerprints = {}
+
+	######################################################################################################################################
+	# Digests of the files saved by the previous executions
+	def load_fingerprints( self ):
+		if os.path.isfile( self.fingerprints_pathfilename ):
+			try:
+				with open( self.fingerprints_pathfilename, "r" ) as f:
+					return( json.load( f ) )
+			except ValueError:
+				pass
+		return( {} )
+
+	######################################################################################################################################
+	# Hash of the content of a file (computed only if the file changed since the last time)
+	def fingerprint_file( self, pathfilename ):
+		st = os.stat( pathfilename )
+		known = self.fingerprints.get( pathfilename )
+		if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+			return( known[2] )
+		digest = file_digest( pathfilename )
+		self.fingerprints[ pathfilename ] = [ st.st_size, st.st_mtime_ns, digest ]
+		self.new_fingerprints[ pathfilename ] = self.fingerprints[ pathfilename ]
+		return( digest )
+
+	######################################################################################################################################
+	# Hash of a file or of the content of all the files of a directory (names and contents)
+	def fingerprint( self, path ):
+		if len(self.manifests) > 0:
+			from humain.manifest import manifest_digest
+		for manifest in reversed( self.manifests ):
+			digest = manifest_digest( manifest, path )
+			if not (digest is None):
+				return( digest )
+		if os.path.isfile( path ):
+			return( self.fingerprint_file( path ) )
+		if not os.path.isdir( path ):
+			return( "missing" )
+		h = hashlib.blake2b( digest_size = 20 )
+		for root, dirs, files in os.walk( path ):
+			dirs.sort()
+			for f in sorted(files):
+				pathfilename = os.path.join(root, f)
+				h.update( (os.path.relpath(pathfilename, path) + "\0" + self.fingerprint_file( pathfilename ) + "\n").encode('utf8') )
+		return( h.hexdigest() )
+
+	######################################################################################################################################
+	# Adds the manifest of the outputs of a task executed (or restored) in this execution
+	def add_manifest( self, manifest ):
+		self.manifests.append( manifest )
+
+	######################################################################################################################################
+	# Key of an execution: hash of the script, the arguments, the inputs, and the selection mode (when it is not the default one, it
+	# changes how ocr_sim writes its outputs)
+	def task_key( self, script_filename, args_list, input_paths ):
+		h = hashlib.blake2b( digest_size = 20 )
+		h.update( self.fingerprint_file( script_filename ).encode('utf8') )
+		h.update( "\0".join( args_list ).encode('utf8') )
+		selection_mode = os.environ.get( SELECTION_ENV ) or DEFAULT_SELECTION_MODE
+		if selection_mode != DEFAULT_SELECTION_MODE:
+			h.update( ( "\0selection=" + selection_mode ).encode('utf8') )
+		for input_path in input_paths:
+			for path in related_paths( input_path ):
+				h.update( (path + "\0" + self.fingerprint( path ) + "\n").encode('utf8') )
+		return( h.hexdigest() )
+
+	######################################################################################################################################
+	# Copies the cached outputs to their locations. Returns True if the key was found in the cache.
+	def restore( self, key, output_paths ):
+		entry_dir = self.entries_dir + "/" + key
+		entry_pathfilename = entry_dir + "/entry.json"
+		if not os.path.isfile( entry_pathfilename ):
+			return( False )
+		with open( entry_pathfilename, "r" ) as f:
+			entry = json.load( f )
+		if sorted(entry['outputs']) != sorted(output_paths):
+			return( False )
+
+		for i, path in enumerate( entry['paths'] ):
+			cached = entry_dir + "/" + str(i)
+			if os.path.isdir( cached ):
+				if os.path.isdir( path ):
+					shutil.rmtree( path )
+				shutil.copytree( cached, path )
+			elif os.path.isfile( cached ):
+				verify_create_dir( os.path.dirname( path ), 'The output directory (' + os.path.dirname( path ) + ') could not be created.', None, 51 )
+				shutil.copy2( cached, path )
+
+		# Last use (LRU)
+		os.utime( entry_pathfilename, None )
+		return( True )
+
+	######################################################################################################################################
+	# Saves a copy of the outputs of an execution, and evicts the least recently used entries when the size limit is exceeded
+	def store( self, key, task_name, output_paths ):
+		entry_dir = self.entries_dir + "/" + key
+		tmp_dir = entry_dir + ".tmp" + str(os.getpid())
+		if os.path.isdir( tmp_dir ):
+			shutil.rmtree( tmp_dir )
+		os.makedirs( tmp_dir )
+
+		paths = []
+		for output_path in output_paths:
+			paths += [ p for p in related_paths( output_path ) if not (p in paths) ]
+		for i, path in enumerate( paths ):
+			if os.path.isdir( path ):
+				shutil.copytree( path, tmp_dir + "/" + str(i) )
+			elif os.path.isfile( path ):
+				shutil.copy2( path, tmp_dir + "/" + str(i) )
+
+		entry = { 'task': task_name, 'outputs': list(output_paths), 'paths': paths, 'size': dir_size( tmp_dir ), 'created': time.time() }
+		with open( tmp_dir + "/entry.json", "w+" ) as f:
+			json.dump( entry, f )
+
+		if os.path.isdir( entry_dir ):
+			shutil.rmtree( entry_dir )
+		os.rename( tmp_dir, entry_dir )
+		self.evict()
+
+	######################################################################################################################################
+	# Deletes the least recently used entries until the size of the cache is below its limit
+	def evict( self ):
+		entries = []
+		total = 0
+		for key in os.listdir( self.entries_dir ):
+			entry_pathfilename = self.entries_dir + "/" + key + "/entry.json"
+			if not os.path.isfile( entry_pathfilename ):
+				continue
+			with open( entry_pathfilename, "r" ) as f:
+				size = json.load( f )['size']
+			entries.append( (os.path.getmtime( entry_pathfilename ), key, size) )
+			total += size
+
+		for last_use, key, size in sorted( entries ):
+			if total <= self.size_limit:
+				break
+			shutil.rmtree( self.entries_dir + "/" + key, ignore_errors = True )
+			total -= size
+
+	######################################################################################################################################
+	# Saves to disk the digests computed in this execution (once, when the simulation finishes). The simulations that share the cache
+	# (sweeps, shards, replicas) save theirs at the same time, so the file is read again and merged with them under a lock.
+	def save_fingerprints( self ):
+		if len(self.new_fingerprints) == 0:
+			return
+		with open( self.fingerprints_pathfilename + ".lock", "a" ) as f_lock:
+			fcntl.flock( f_lock.fileno(), fcntl.LOCK_EX )
+			fingerprints = self.load_fingerprints()
+			fingerprints.update( self.new_fingerprints )
+			tmp_pathfilename = self.fingerprints_pathfilename + ".tmp" + str(os.getpid())
+			with open( tmp_pathfilename, "w+" ) as f:
+				json.dump( fingerprints, f )
+			os.replace( tmp_pathfilename, self.fingerprints_pathfilename )
+		self.new_fingerprints = {}
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Checkpoint of the execution of a simulation. The state of the scheduler
+# 				(executed tasks, next tasks, iteration number and subdirectory, and the
+# 				paths of the parameters of the iteration) is saved after every task, and
+# 				run_simulation.py --resume continues from it.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, sys, json
+
+from humain.constants import *
+from humain.utils import *
+from humain.state import iteration_state
+from humain.plan import source_stamps
+
+# Version of the checkpoints' format
+CHECKPOINT_VERSION = 1
+
+##############################################################################################################################
+# Writes the state in the file (the previous checkpoint is replaced only when the new one is complete)
+def write_checkpoint( pathfilename, state ):
+	tmp_pathfilename = pathfilename + ".tmp" + str(os.getpid())
+	with open( tmp_pathfilename, "w+" ) as f:
+		json.dump( state, f )
+	os.replace( tmp_pathfilename, pathfilename )
+
+
+class Checkpoint:
+	'State of the scheduler of a simulation, valid while the workflow, tasks, and simulation files do not change'
+	######################################################################################################################################
+	# Constructor
+	def __init__(self, pathfilename, source_files):
+		self.pathfilename = pathfilename
+		self.source_files = source_files
+
+	######################################################################################################################################
+	# Saves the state. It is written through the iteration state, after the files of the tasks pending to be written in background,
+	# so the checkpoint never refers to results that are not in disk yet.
+	def save(self, state):
+		saved = { 'version': CHECKPOINT_VERSION, 'base_dir': BASE_DIR, 'sources': source_stamps( self.source_files ), 'state': state }
+		iteration_state.put( self.pathfilename, saved, write_checkpoint )
+
+	######################################################################################################################################
+	# Returns the saved state, or None if there is no checkpoint
+	def load(self):
+		if not os.path.isfile( self.pathfilename ):
+			return( None )
+		try:
+			with open( self.pathfilename, "r" ) as f:
+				saved = json.load( f )
+		except ValueError:
+			print( "\nERROR: The checkpoint file (" + self.pathfilename + ") is corrupted.\n" )
+			sys.exit( 90 )
+		if saved.get('version') != CHECKPOINT_VERSION or saved.get('base_dir') != BASE_DIR:
+			print( "\nERROR: The checkpoint file (" + self.pathfilename + ") was created by another version or installation of the simulator.\n" )
+			sys.exit( 91 )
+		if saved.get('sources') != source_stamps( self.source_files ):
+			print( "\nERROR: The workflow, tasks, or simulation files changed after the checkpoint (" + self.pathfilename + "). Run the simulation without --resume.\n" )
+			sys.exit( 92 )
+		return( saved['state'] )
+
+	######################################################################################################################################
+	# Deletes the checkpoint (e.g. the simulation finished)
+	def clear(self):
+		iteration_state.flush( [ self.pathfilename ] )
+		if os.path.isfile( self.pathfilename ):
+			os.remove( self.pathfilename )
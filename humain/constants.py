@@ -27,3 +27,68 @@ INPUT_TYPES = ['INT', 'FLOAT', 'STRING', 'JPG', 'TXT', 'TSV', 'D_JPG', 'D_TXT',
 OUTPUT_TYPES = ['O_JPG', 'O_TXT', 'O_TSV', 'O_D_AR', 'O_D_JPG', 'O_D_TXT', 'O_D_TSV']
 
 DATATYPES = INPUT_TYPES + OUTPUT_TYPES
+
+# Execution modes of the tasks and scripts: a new process per execution, a call to the main function of the (imported once) script,
+# or a child forked from the zygote process, where the heavy libraries and the scripts are already imported
+EXECUTION_MODES = ['subprocess', 'in-process', 'zygote']
+DEFAULT_EXECUTION_MODE = 'subprocess'
+
+# Cache of the tasks' results (disabled with --no-cache). The least recently used results are deleted when the size limit (bytes) is exceeded.
+CACHE_DIR = BASE_DIR + "/cache"
+CACHE_SIZE_LIMIT = 2 * 1024 * 1024 * 1024
+
+# Compiled simulation plans (workflow, tasks, and simulation files parsed and validated), reused while the files do not change
+PLANS_DIR = CACHE_DIR + "/plans"
+
+# Environment variable with the seed of the random tasks (e.g. the selection of the subsets of an HITL simulation), set for every replica
+SEED_ENV = "HUMAIN_SEED"
+
+# Work queue of the coordinator and worker mode (seconds): polling interval, period of the workers' heartbeats, and time without a
+# heartbeat after which the tasks of a worker are published again
+QUEUE_POLL_INTERVAL = 0.1
+WORKER_HEARTBEAT = 5
+WORKER_TIMEOUT = 60
+
+# Zygote execution mode: modules imported by the zygote before forking the tasks (the missing ones are skipped), and maximum time
+# (seconds) to wait for its start
+ZYGOTE_MODULES = ['numpy', 'pandas', 'spacy']
+ZYGOTE_START_TIMEOUT = 60
+
+# Memory results mode (--memory): RAM-backed directory (tmpfs) where the intermediate outputs of the tasks are written. The temporary
+# directory of the system is used when it does not exist.
+MEMORY_RESULTS_DIR = "/dev/shm"
+
+# Sharded execution (-k): directory, in the results of the simulation, with the workflow, the simulation files, and the results of the
+# shards. It is removed after their outputs are merged.
+SHARDS_DIRNAME = ".shards"
+
+# Specimen store of a collection of datasets (created with create_store.py): file of the store in the directory of the collection
+STORE_FILENAME = "specimens.sqlite"
+
+# Packed OCR corpus of a collection of datasets (created with create_corpus.py): file of the corpus in the directory of the collection,
+# and default directories (relative to the collection, with their subdirectories) and extensions of the packed files
+CORPUS_FILENAME = "ocr_corpus.pack"
+CORPUS_DIRS = ['ocr']
+CORPUS_EXTS = ['txt']
+
+# Selection of the OCR-ed files by ocr_sim (environment variable set with --selection): copies, hard links, or reflinks (copy-on-write
+# clones) of the files, or a selection manifest (SELECTION_FILENAME in the output directory, one line "source directory<TAB>filename"
+# per file) resolved by list_files_ext, verify_dir_ext, and the readers of corpus.py
+SELECTION_ENV = "HUMAIN_SELECTION"
+SELECTION_MODES = ['copy', 'link', 'reflink', 'manifest']
+DEFAULT_SELECTION_MODE = 'copy'
+SELECTION_FILENAME = ".selection"
+
+# Specimen registry of a collection of datasets (dense integer IDs of the canonical specimen names): list of specimens of the collection,
+# whose order gives the first IDs (the other specimens get the next ones when they are found)
+SPECIMEN_LIST_FILENAME = "specimen_list.txt"
+
+# Dataset server (--dataset-server): long-lived process of the machine, shared by the engines, that keeps the dataset files read by the
+# tasks, and the index of the lines of their tables by specimen, in shared memory segments (in MEMORY_RESULTS_DIR) that the processes of
+# the tasks map instead of reading and indexing the files again. Environment variable with its socket (set by the engine for the tasks),
+# directory of its socket and segments, time (seconds) without engines or requests after which it finishes, and maximum time to wait
+# for its start.
+DATASET_SERVER_ENV = "HUMAIN_DATASET_SERVER"
+DATASET_SERVER_DIRNAME = "humain_datasets"
+DATASET_SERVER_IDLE_TIMEOUT = 600
+DATASET_SERVER_START_TIMEOUT = 30
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Packed OCR corpus of a collection of datasets. The texts of its OCR
+# 				directories (one small file per specimen) are packed in a single file with
+# 				an index filename -> (offset, length), which is memory-mapped by the tasks:
+# 				a text is a slice of the map instead of an open() of its file. A directory
+# 				is read from the corpus only while it has the same modification time as
+# 				when the corpus was created (files added, removed, or renamed change it).
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+# Format of the corpus file: CORPUS_MAGIC, offset and length of the index (two unsigned 64 bits integers, little endian), the texts,
+# and the index (JSON): { "dirs": { directory: modification time (ns) }, "files": { directory: [ [filename, offset, length], ... ] } },
+# with the directories relative to the collection and their files in the order of the directory.
+
+import os, io, json, mmap, struct, codecs, fcntl, threading
+
+from humain.constants import *
+from humain.utils import read_selection
+from humain.store import *
+
+CORPUS_MAGIC = b"HMNCORP1"
+CORPUS_HEADER = struct.Struct("<8sQQ")
+# ioctl of Linux that clones a file (reflink) in the file systems with copy-on-write (e.g. Btrfs and XFS)
+FICLONE = 0x40049409
+
+##############################################################################################################################
+# Creates the corpus of a collection with the files with the extensions (e.g. txt and prob) of the directories (relative to the
+# collection) and their subdirectories. The new corpus replaces the previous one when it is complete. Returns (files, bytes).
+def create_corpus( collection_dir, dirs = CORPUS_DIRS, exts = CORPUS_EXTS ):
+	corpus_pathfilename = collection_dir + "/" + CORPUS_FILENAME
+	tmp_pathfilename = corpus_pathfilename + ".tmp" + str(os.getpid())
+	suffixes = tuple( "." + ext.lower() for ext in exts )
+	index = { 'dirs': {}, 'files': {} }
+	n_files = 0
+	with open( tmp_pathfilename, "wb" ) as f_c:
+		f_c.write( CORPUS_HEADER.pack( CORPUS_MAGIC, 0, 0 ) )
+		offset = CORPUS_HEADER.size
+		for top_dir in dirs:
+			for root, subdirs, files in os.walk( collection_dir + "/" + top_dir ):
+				subdirs.sort()
+				rel_dir = os.path.relpath( root, collection_dir )
+				index['dirs'][ rel_dir ] = os.stat( root ).st_mtime_ns
+				entries = []
+				with os.scandir( root ) as it:
+					filenames = [ entry.name for entry in it if entry.is_file() and entry.name.endswith( suffixes ) ]
+				for filename in filenames:
+					with open( root + "/" + filename, "rb" ) as f:
+						data = f.read()
+					f_c.write( data )
+					entries.append( [ filename, offset, len(data) ] )
+					offset += len(data)
+					n_files += 1
+				index['files'][ rel_dir ] = entries
+		index_data = json.dumps( index ).encode('utf8')
+		f_c.write( index_data )
+		f_c.seek( 0 )
+		f_c.write( CORPUS_HEADER.pack( CORPUS_MAGIC, offset, len(index_data) ) )
+	os.replace( tmp_pathfilename, corpus_pathfilename )
+	return( n_files, offset - CORPUS_HEADER.size )
+
+
+class Corpus:
+	'Packed OCR corpus of a collection (memory-mapped, read only)'
+	######################################################################################################################################
+	# Constructor. The index of a directory is loaded the first time it is used.
+	def __init__(self, corpus_pathfilename, collection_dir):
+		self.collection_dir = collection_dir
+		with open( corpus_pathfilename, "rb" ) as f:
+			self.map = mmap.mmap( f.fileno(), 0, access = mmap.ACCESS_READ )
+		magic, index_offset, index_length = CORPUS_HEADER.unpack_from( self.map, 0 )
+		if magic != CORPUS_MAGIC:
+			raise ValueError( "Invalid corpus file " + corpus_pathfilename )
+		index = json.loads( self.map[ index_offset:index_offset + index_length ].decode('utf8') )
+		self.dir_mtimes = index['dirs']
+		self.dir_entries = index['files']
+		self.dir_index = {}			# Directory -> filename -> (offset, length)
+		self.lock = threading.Lock()
+
+	######################################################################################################################################
+	# Index (filename -> (offset, length)) of a directory of the collection, None if it is not in the corpus or it changed after the
+	# creation of the corpus
+	def index(self, dir_name):
+		rel_dir = os.path.relpath( dir_name, self.collection_dir )
+		if not (rel_dir in self.dir_mtimes):
+			return( None )
+		try:
+			if os.stat( dir_name ).st_mtime_ns != self.dir_mtimes[ rel_dir ]:
+				return( None )
+		except OSError:
+			return( None )
+		with self.lock:
+			if not (rel_dir in self.dir_index):
+				self.dir_index[ rel_dir ] = { e[0]: ( e[1], e[2] ) for e in self.dir_entries[ rel_dir ] }
+			return( self.dir_index[ rel_dir ] )
+
+	######################################################################################################################################
+	# Files of a directory with the extension, in the order of the directory. None if the directory is not in the corpus.
+	def files(self, dir_name, ext):
+		index = self.index( dir_name )
+		if index is None:
+			return( None )
+		suffix = "." + ext.lower()
+		return( [ filename for filename in index if filename.endswith( suffix ) ] )
+
+	######################################################################################################################################
+	# Content of a file (memoryview of the map, without copies). None if it is not in the corpus.
+	def view(self, dir_name, filename):
+		index = self.index( dir_name )
+		if (index is None) or not (filename in index):
+			return( None )
+		offset, length = index[ filename ]
+		return( memoryview( self.map )[ offset:offset + length ] )
+
+
+# Opened corpora of the process: collection directory -> (modification time of the corpus file, corpus)
+corpora = {}
+corpora_lock = threading.Lock()
+
+##############################################################################################################################
+# Corpus of the collection of a directory of DATASETS_DIR, None if it is not in a collection with a corpus
+def dataset_corpus( dir_name ):
+	dir_name = os.path.abspath( dir_name )
+	if not dir_name.startswith( DATASETS_DIR + "/" ):
+		return( None )
+	collection_dir = DATASETS_DIR + "/" + dir_name[ len(DATASETS_DIR) + 1: ].split("/")[0]
+	corpus_pathfilename = collection_dir + "/" + CORPUS_FILENAME
+	try:
+		mtime_ns = os.stat( corpus_pathfilename ).st_mtime_ns
+	except OSError:
+		return( None )
+	with corpora_lock:
+		entry = corpora.get( collection_dir )
+		if (entry is None) or entry[0] != mtime_ns:
+			try:
+				entry = ( mtime_ns, Corpus( corpus_pathfilename, collection_dir ) )
+			except (OSError, ValueError):
+				entry = ( mtime_ns, None )
+			corpora[ collection_dir ] = entry
+	return( entry[1] )
+
+##############################################################################################################################
+# Directory where a file of a directory is: its source directory if it was selected through a selection manifest
+def resolve_selection( dir_name, filename ):
+	source_dir = read_selection( dir_name ).get( filename )
+	while source_dir is not None:
+		dir_name = source_dir
+		source_dir = read_selection( dir_name ).get( filename )
+	return( dir_name )
+
+##############################################################################################################################
+# Content of a file of a directory (memoryview), from the corpus of its collection when possible
+def corpus_view( dir_name, filename ):
+	dir_name = resolve_selection( dir_name, filename )
+	corpus = dataset_corpus( dir_name )
+	view = corpus.view( os.path.abspath( dir_name ), filename ) if corpus else None
+	return( memoryview( read_dataset( dir_name + "/" + filename ) ) if view is None else view )
+
+##############################################################################################################################
+# Files of a directory with the extension (as list_files_ext), from the corpus of its collection when possible
+def list_corpus_files( dir_name, ext ):
+	corpus = dataset_corpus( dir_name )
+	filenames = corpus.files( os.path.abspath( dir_name ), ext ) if corpus else None
+	return( list_dataset_files( dir_name, ext ) if filenames is None else filenames )
+
+##############################################################################################################################
+# Text of a file of a directory, decoded as codecs.open( pathfilename, encoding = encoding ).read() (the end of lines are kept)
+def read_corpus_text( dir_name, filename, encoding = 'utf-8' ):
+	return( codecs.decode( corpus_view( dir_name, filename ), encoding ) )
+
+##############################################################################################################################
+# Opens a text file of a directory for reading (as open( pathfilename, "r" ))
+def open_corpus_file( dir_name, filename ):
+	dir_name = resolve_selection( dir_name, filename )
+	corpus = dataset_corpus( dir_name )
+	view = corpus.view( os.path.abspath( dir_name ), filename ) if corpus else None
+	return( open_dataset( dir_name + "/" + filename ) if view is None else io.TextIOWrapper( io.BytesIO( view ) ) )
+
+##############################################################################################################################
+# Copies a file of a directory (as shutil.copyfile)
+def copy_corpus_file( dir_name, filename, dst ):
+	dir_name = resolve_selection( dir_name, filename )
+	corpus = dataset_corpus( dir_name )
+	view = corpus.view( os.path.abspath( dir_name ), filename ) if corpus else None
+	if view is None:
+		copy_dataset_file( dir_name + "/" + filename, dst )
+		return
+	with open( dst, "wb" ) as f:
+		f.write( view )
+
+##############################################################################################################################
+# Places a file of a directory in another one (mode of SELECTION_MODES, except manifest): a copy, a hard link, or a reflink. The links
+# fall back to a copy when the file system does not support them (e.g. another device).
+def select_corpus_file( dir_name, filename, dst_dir, mode = DEFAULT_SELECTION_MODE ):
+	dir_name = resolve_selection( dir_name, filename )
+	dst = dst_dir + "/" + filename
+	if mode in ['link', 'reflink'] and os.path.isfile( dir_name + "/" + filename ):
+		try:
+			if os.path.lexists( dst ):
+				os.remove( dst )
+			if mode == 'link':
+				os.link( dir_name + "/" + filename, dst )
+			else:
+				with open( dir_name + "/" + filename, "rb" ) as f_src, open( dst, "wb" ) as f_dst:
+					fcntl.ioctl( f_dst.fileno(), FICLONE, f_src.fileno() )
+			return
+		except OSError:
+			pass
+	copy_corpus_file( dir_name, filename, dst )
+
+##############################################################################################################################
+# Writes the selection manifest of a directory: list of (source directory, filename). The files copied before in the directory are
+# still listed with it.
+def write_selection( dir_name, selection ):
+	with open( dir_name + "/" + SELECTION_FILENAME, "w+" ) as f:
+		f.write( "".join( os.path.abspath( source_dir ) + "\t" + filename + "\n" for source_dir, filename in selection ) )
+
+##############################################################################################################################
+# Removes the selection manifest of a directory (its files are copied or linked)
+def remove_selection( dir_name ):
+	if os.path.isfile( dir_name + "/" + SELECTION_FILENAME ):
+		os.remove( dir_name + "/" + SELECTION_FILENAME )
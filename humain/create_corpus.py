@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Creates the packed OCR corpus of one or more collections of datasets. It
+# 				must be created again after a packed file is modified (the directories
+# 				with files added, removed, or renamed are read from the disk meanwhile).
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import argparse, time
+
+from humain.constants import *
+from humain.utils import *
+from humain.corpus import create_corpus
+
+
+if __name__ == '__main__':
+	""" Creates the packed OCR corpus of one or more collections of datasets.
+	"""
+	parser = argparse.ArgumentParser("Creates the packed OCR corpus of one or more collections of datasets.")
+	parser.add_argument('-c', '--collection', action="append", required=False, default=None, help="Name of the collection (directory of the datasets directory). One or more. All the collections by default.")
+	parser.add_argument('-d', '--dir', action="append", required=False, default=None, help="Directory of the collection (relative to it) whose files are packed, with its subdirectories. One or more (default: " + ", ".join( CORPUS_DIRS ) + ").")
+	parser.add_argument('-e', '--ext', action="append", required=False, default=None, help="Extension of the packed files (e.g. txt or prob). One or more (default: " + ", ".join( CORPUS_EXTS ) + ").")
+	args = parser.parse_args()
+
+	# Usage example
+	# python3 create_corpus.py -c aocr_mix100 -e txt -e prob
+
+	verify_dir( DATASETS_DIR, 'The datasets directory (' + DATASETS_DIR + ') was not found: ', parser, 1 )
+	collections = args.collection or sorted( d for d in os.listdir( DATASETS_DIR ) if os.path.isdir( DATASETS_DIR + "/" + d ) )
+	for collection in collections:
+		verify_dir( DATASETS_DIR + "/" + collection, 'The collection directory (' + DATASETS_DIR + "/" + collection + ') was not found: ', parser, 2 )
+	dirs = args.dir or CORPUS_DIRS
+	exts = [ ext.lstrip('.') for ext in ( args.ext or CORPUS_EXTS ) ]
+
+	for collection in collections:
+		start = time.time()
+		dirs_found = [ d for d in dirs if os.path.isdir( DATASETS_DIR + "/" + collection + "/" + d ) ]
+		if len(dirs_found) == 0:
+			print( "Corpus of " + collection + ": no directory to pack." )
+			continue
+		n_files, n_bytes = create_corpus( DATASETS_DIR + "/" + collection, dirs_found, exts )
+		print( "Corpus of " + collection + ": " + str(n_files) + " files, " + str(n_bytes) + " bytes (%.1f s)." % (time.time() - start) )
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Creates the specimen store (SQLite) of one or more collections of datasets.
+# 				It must be created again after the files of the collection change (the
+# 				changed files are read from the disk meanwhile).
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import argparse, time
+
+from humain.constants import *
+from humain.utils import *
+from humain.store import create_store
+
+
+if __name__ == '__main__':
+	""" Creates the specimen store of one or more collections of datasets.
+	"""
+	parser = argparse.ArgumentParser("Creates the specimen store of one or more collections of datasets.")
+	parser.add_argument('-c', '--collection', action="append", required=False, default=None, help="Name of the collection (directory of the datasets directory). One or more. All the collections by default.")
+	args = parser.parse_args()
+
+	# Usage example
+	# python3 create_store.py -c aocr_mix100 -c aocr_insects
+
+	verify_dir( DATASETS_DIR, 'The datasets directory (' + DATASETS_DIR + ') was not found: ', parser, 1 )
+	collections = args.collection or sorted( d for d in os.listdir( DATASETS_DIR ) if os.path.isdir( DATASETS_DIR + "/" + d ) )
+	for collection in collections:
+		verify_dir( DATASETS_DIR + "/" + collection, 'The collection directory (' + DATASETS_DIR + "/" + collection + ') was not found: ', parser, 2 )
+
+	for collection in collections:
+		start = time.time()
+		n_files, n_lines = create_store( DATASETS_DIR + "/" + collection )
+		print( "Store of " + collection + ": " + str(n_files) + " files and " + str(n_lines) + " indexed lines (%.1f s)." % (time.time() - start) )
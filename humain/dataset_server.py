@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Dataset server. A long-lived process of the machine, started by the first
+# 				engine that needs it and shared by all the engines (simulations, sweeps,
+# 				replicas, and workers), keeps the dataset files read by the tasks in shared
+# 				memory segments: their content and, for the tables, the index of their
+# 				lines by specimen. The processes of the tasks map the segments through a
+# 				Unix socket instead of reading and indexing the files again, so there is
+# 				one copy of every dataset in memory whatever the number of processes.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+# Format of a segment: SEGMENT_MAGIC, length of the content, number of lines, and width of the keys (unsigned 64 bits integers, little
+# endian), the content (padded to 8 bytes), and, for the tables, the offsets of the lines (int64, one more than the lines), the numbers
+# of the lines sorted by key (int64), and the sorted keys (specimens, fixed width bytes). The width is 0 when the lines are not indexed.
+# Requests and replies of the socket: one JSON object per line.
+
+import os, sys, json, stat, time, mmap, struct, socket, signal, selectors, hashlib, tempfile, subprocess, threading
+
+from humain.constants import *
+
+SEGMENT_MAGIC = b"HMNDSEG1"
+SEGMENT_HEADER = struct.Struct("<8sQQQ")
+
+##############################################################################################################################
+# Directory of the socket and the segments of the dataset server of the user (in memory, or in the temporary directory of the system)
+def server_dir():
+	base_dir = MEMORY_RESULTS_DIR if os.path.isdir( MEMORY_RESULTS_DIR ) else tempfile.gettempdir()
+	return( base_dir + "/" + DATASET_SERVER_DIRNAME + "_" + str(os.getuid()) )
+
+##############################################################################################################################
+# True if the directory of the dataset server is private: a real directory (not a link) of the user, with mode 0700. Its path is
+# predictable, so a directory created by another user (with its own socket and segments) must never be used. With create = True, the
+# directory is created (mode 0700) when it does not exist.
+def private_server_dir( path, create = False ):
+	if create:
+		try:
+			os.mkdir( path, 0o700 )
+			os.chmod( path, 0o700 )
+		except FileExistsError:
+			pass
+		except OSError:
+			return( False )
+	try:
+		st = os.lstat( path )
+	except OSError:
+		return( False )
+	return( stat.S_ISDIR( st.st_mode ) and st.st_uid == os.getuid() and stat.S_IMODE( st.st_mode ) == 0o700 )
+
+##############################################################################################################################
+# Size of a part of a segment, padded to 8 bytes (the arrays are aligned)
+def padded( size ):
+	return( (size + 7) // 8 * 8 )
+
+##############################################################################################################################
+# Writes the segment of a dataset file: its content (from the specimen store when possible) and, for the tables whose lines are
+# complete rows, the index of the lines by specimen. The segment is replaced only when it is complete.
+def build_segment( pathfilename, segment_pathfilename ):
+	import numpy as np
+	from humain.store import read_dataset, table_separator, is_line_table, line_key
+	data = read_dataset( pathfilename )
+	sep = table_separator( pathfilename )
+	n_lines, key_width, arrays = 0, 0, []
+	if (sep is not None) and is_line_table( data ):
+		lines = data.splitlines( True )
+		n_lines = len(lines)
+		line_starts = np.zeros( n_lines + 1, dtype = np.int64 )
+		np.cumsum( [ len(line) for line in lines ], out = line_starts[1:] )
+		keys = np.array( [ line_key( line, sep ).encode('utf8') for line in lines ] + [ b"" ], dtype = bytes )[:-1]
+		key_lines = np.argsort( keys, kind = 'stable' ).astype( np.int64 )
+		key_width = keys.dtype.itemsize
+		arrays = [ line_starts, key_lines, keys[ key_lines ] ]
+
+	tmp_pathfilename = segment_pathfilename + ".tmp"
+	with open( tmp_pathfilename, "wb" ) as f:
+		f.write( SEGMENT_HEADER.pack( SEGMENT_MAGIC, len(data), n_lines, key_width ) )
+		f.write( data )
+		f.write( b"\0" * (padded( len(data) ) - len(data)) )
+		for array in arrays:
+			f.write( array.tobytes() )
+	os.replace( tmp_pathfilename, segment_pathfilename )
+
+
+class DatasetSegment:
+	'Segment of a dataset file mapped by a process (read only)'
+	######################################################################################################################################
+	# Constructor
+	def __init__(self, segment_pathfilename):
+		import numpy as np
+		with open( segment_pathfilename, "rb" ) as f:
+			self.map = mmap.mmap( f.fileno(), 0, access = mmap.ACCESS_READ )
+		magic, data_length, self.n_lines, self.key_width = SEGMENT_HEADER.unpack_from( self.map, 0 )
+		if magic != SEGMENT_MAGIC:
+			raise ValueError( "Invalid segment file " + segment_pathfilename )
+		offset = SEGMENT_HEADER.size
+		self.data = memoryview( self.map )[ offset:offset + data_length ]
+		offset += padded( data_length )
+		if self.key_width > 0:
+			self.line_starts = np.frombuffer( self.map, dtype = np.int64, count = self.n_lines + 1, offset = offset )
+			offset += 8 * (self.n_lines + 1)
+			self.key_lines = np.frombuffer( self.map, dtype = np.int64, count = self.n_lines, offset = offset )
+			offset += 8 * self.n_lines
+			self.keys = np.frombuffer( self.map, dtype = "S" + str(self.key_width), count = self.n_lines, offset = offset )
+
+	######################################################################################################################################
+	# Header lines (n_header) and lines of the specimens of the table, in the order of the file (as store.select_lines). None if the
+	# lines of the table are not indexed.
+	def select_lines(self, specimens, n_header):
+		import numpy as np
+		if self.key_width == 0:
+			return( None )
+		keys = [ s.encode('utf8') for s in set( specimens ) if isinstance( s, str ) ]
+		keys = np.array( [ k for k in keys if len(k) <= self.key_width ] + [ b"" ], dtype = "S" + str(self.key_width) )[:-1]
+		first = np.searchsorted( self.keys, keys, side = 'left' )
+		last = np.searchsorted( self.keys, keys, side = 'right' )
+		rows = np.concatenate( [ self.key_lines[ a:b ] for a, b in zip( first, last ) ] + [ np.zeros( 0, dtype = np.int64 ) ] )
+		rows = np.sort( rows[ rows >= n_header ] )
+		line_numbers = list( range( min( n_header, self.n_lines ) ) ) + rows.tolist()
+		return( b"".join( self.data[ self.line_starts[i]:self.line_starts[i + 1] ] for i in line_numbers ) )
+
+
+class DatasetServer:
+	'Dataset server: it receives the requests of the engines and the tasks through a Unix socket, and builds the segments of the files'
+	######################################################################################################################################
+	# Constructor. The socket is created with a temporary name: it exists with its final name only when the server is ready.
+	def __init__(self, socket_pathfilename):
+		self.socket_pathfilename = socket_pathfilename
+		self.segment_dir = os.path.dirname( socket_pathfilename )
+		self.server = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+		self.server.bind( socket_pathfilename + ".tmp" + str(os.getpid()) )
+		self.server.listen( 64 )
+		os.rename( socket_pathfilename + ".tmp" + str(os.getpid()), socket_pathfilename )
+		self.socket_ino = os.stat( socket_pathfilename ).st_ino
+
+		self.selector = selectors.DefaultSelector()
+		self.selector.register( self.server, selectors.EVENT_READ )
+		self.buffers = {}			# Connection -> bytes received (incomplete request)
+		self.files = {}				# Dataset file -> (size, modification time (ns), segment, size of the segment)
+		self.last_request = time.time()
+		self.stopped = False
+
+	######################################################################################################################################
+	# Segment of a dataset file, built the first time and again when the file changes
+	def attach(self, pathfilename):
+		pathfilename = os.path.abspath( pathfilename )
+		if not pathfilename.startswith( DATASETS_DIR + "/" ):
+			return( { 'error': "The file is not in the datasets directory." } )
+		try:
+			st = os.stat( pathfilename )
+		except OSError:
+			return( { 'error': "The file was not found." } )
+		entry = self.files.get( pathfilename )
+		if (entry is None) or entry[0] != st.st_size or entry[1] != st.st_mtime_ns:
+			# The segments of the replaced versions are removed (the processes that mapped them keep their pages)
+			name = hashlib.blake2b( pathfilename.encode('utf8'), digest_size = 16 ).hexdigest()
+			segment_pathfilename = self.segment_dir + "/" + name + "_" + str(st.st_mtime_ns) + "_" + str(os.getpid()) + ".seg"
+			try:
+				build_segment( pathfilename, segment_pathfilename )
+			except (OSError, ValueError) as e:
+				return( { 'error': str(e) } )
+			if entry is not None and entry[2] != segment_pathfilename and os.path.isfile( entry[2] ):
+				os.remove( entry[2] )
+			entry = ( st.st_size, st.st_mtime_ns, segment_pathfilename, os.path.getsize( segment_pathfilename ) )
+			self.files[ pathfilename ] = entry
+		return( { 'segment': entry[2], 'size': entry[0], 'mtime_ns': entry[1] } )
+
+	######################################################################################################################################
+	# Reply to a request: attach (segment of a file), stats (files, bytes in memory, and connections), or stop
+	def handle(self, request):
+		op = request.get('op')
+		if op == 'attach':
+			return( self.attach( str(request.get('path')) ) )
+		if op == 'stats':
+			return( { 'pid': os.getpid(), 'files': len(self.files), 'bytes': sum( e[3] for e in self.files.values() ), 'connections': len(self.buffers) } )
+		if op == 'stop':
+			self.stopped = True
+			return( { 'stopped': True } )
+		return( { 'error': "Unknown request " + str(op) + "." } )
+
+	######################################################################################################################################
+	# Reads the requests of a connection and sends their replies. The connection is closed when the client closes it.
+	def receive(self, connection):
+		try:
+			data = connection.recv( 65536 )
+		except OSError:
+			data = b""
+		if not data:
+			self.selector.unregister( connection )
+			del self.buffers[ connection ]
+			connection.close()
+			return
+		self.buffers[ connection ] += data
+		while b"\n" in self.buffers[ connection ]:
+			line, self.buffers[ connection ] = self.buffers[ connection ].split( b"\n", 1 )
+			self.last_request = time.time()
+			try:
+				reply = self.handle( json.loads( line.decode('utf8') ) )
+			except ValueError:
+				reply = { 'error': "Invalid request." }
+			try:
+				connection.sendall( (json.dumps( reply ) + "\n").encode('utf8') )
+			except OSError:
+				pass
+
+	######################################################################################################################################
+	# Serves the requests until it is stopped, or until no engine is connected (their connection is a lease) and no request is received
+	# during DATASET_SERVER_IDLE_TIMEOUT seconds. Then its socket and segments are removed.
+	def serve(self):
+		try:
+			while not self.stopped:
+				for key, mask in self.selector.select( timeout = 1.0 ):
+					if key.fileobj is self.server:
+						connection, address = self.server.accept()
+						self.buffers[ connection ] = b""
+						self.selector.register( connection, selectors.EVENT_READ )
+					else:
+						self.receive( key.fileobj )
+				if len(self.buffers) == 0 and (time.time() - self.last_request) > DATASET_SERVER_IDLE_TIMEOUT:
+					break
+		finally:
+			# The socket is removed only if it was not replaced by another server
+			try:
+				if os.stat( self.socket_pathfilename ).st_ino == self.socket_ino:
+					os.remove( self.socket_pathfilename )
+			except OSError:
+				pass
+			self.server.close()
+			for entry in self.files.values():
+				if os.path.isfile( entry[2] ):
+					os.remove( entry[2] )
+
+
+##############################################################################################################################
+# Sends a request to the dataset server and returns its reply. None if the server is not running.
+def server_request( socket_pathfilename, request, timeout = 60 ):
+	try:
+		with socket.socket( socket.AF_UNIX, socket.SOCK_STREAM ) as connection:
+			connection.settimeout( timeout )
+			connection.connect( socket_pathfilename )
+			connection.sendall( (json.dumps( request ) + "\n").encode('utf8') )
+			with connection.makefile("r") as f:
+				return( json.loads( f.readline() ) )
+	except (OSError, ValueError):
+		return( None )
+
+
+# Connection of the engine to the dataset server (lease: the server does not finish while the engine is running)
+lease = None
+
+##############################################################################################################################
+# Starts the dataset server of the machine (if it is not running) and connects the engine to it. The tasks executed afterwards by the
+# engine (and by its processes and workers) find its socket in the environment variable DATASET_SERVER_ENV.
+def start_dataset_server():
+	global lease
+	socket_pathfilename = server_dir() + "/server.sock"
+	if not private_server_dir( server_dir(), create = True ):
+		print( "\nERROR: The directory of the dataset server (" + server_dir() + ") is not a private directory of the user (mode 0700).\n" )
+		sys.exit( 140 )
+	if server_request( socket_pathfilename, { 'op': 'stats' } ) is None:
+		# The server imports the simulator's package from the same directory as the engine, and outlives it (own session)
+		env = dict( os.environ )
+		env.pop( DATASET_SERVER_ENV, None )
+		package_dir = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+		env['PYTHONPATH'] = package_dir + ( os.pathsep + env['PYTHONPATH'] if env.get('PYTHONPATH') else "" )
+		process = subprocess.Popen( args = [ sys.executable, "-m", "humain.dataset_server", socket_pathfilename ], env = env,
+			stdin = subprocess.DEVNULL, stdout = subprocess.DEVNULL, start_new_session = True )
+
+		deadline = time.time() + DATASET_SERVER_START_TIMEOUT
+		while server_request( socket_pathfilename, { 'op': 'stats' } ) is None:
+			if (process.poll() is not None) or (time.time() > deadline):
+				print( "\nERROR: The dataset server could not be started.\n" )
+				sys.exit( 140 )
+			time.sleep( 0.05 )
+
+	lease = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+	try:
+		lease.connect( socket_pathfilename )
+	except OSError:
+		print( "\nERROR: The dataset server could not be reached (" + socket_pathfilename + ").\n" )
+		sys.exit( 141 )
+	os.environ[ DATASET_SERVER_ENV ] = socket_pathfilename
+
+
+# Segments mapped by the process: dataset file -> (size, modification time (ns), segment)
+segments = {}
+segments_lock = threading.Lock()
+
+##############################################################################################################################
+# Segment of a dataset file, from the dataset server of the environment. None if there is no server, its directory is not private, the
+# file is not in the datasets, or the server could not provide its current version (or replied with a segment outside its directory).
+def dataset_segment( pathfilename ):
+	socket_pathfilename = os.environ.get( DATASET_SERVER_ENV )
+	if not socket_pathfilename:
+		return( None )
+	socket_dir = os.path.dirname( os.path.abspath( socket_pathfilename ) )
+	pathfilename = os.path.abspath( pathfilename )
+	if not pathfilename.startswith( DATASETS_DIR + "/" ):
+		return( None )
+	try:
+		st = os.stat( pathfilename )
+	except OSError:
+		return( None )
+	with segments_lock:
+		entry = segments.get( pathfilename )
+		if (entry is not None) and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+			return( entry[2] )
+		if not private_server_dir( socket_dir ):
+			return( None )
+		reply = server_request( socket_pathfilename, { 'op': 'attach', 'path': pathfilename } )
+		if (reply is None) or ('error' in reply) or reply['size'] != st.st_size or reply['mtime_ns'] != st.st_mtime_ns:
+			return( None )
+		if os.path.dirname( os.path.abspath( str(reply['segment']) ) ) != socket_dir:
+			return( None )
+		try:
+			segment = DatasetSegment( reply['segment'] )
+		except (OSError, ValueError):
+			return( None )
+		segments[ pathfilename ] = ( st.st_size, st.st_mtime_ns, segment )
+	return( segment )
+
+
+if __name__ == '__main__':
+	""" Dataset server of the machine (started by start_dataset_server): python3 -m humain.dataset_server <socket path>
+	"""
+	signal.signal( signal.SIGTERM, lambda signum, frame: sys.exit( 0 ) )
+	if not private_server_dir( os.path.dirname( os.path.abspath( sys.argv[1] ) ) ):
+		sys.exit( 1 )
+	DatasetServer( sys.argv[1] ).serve()
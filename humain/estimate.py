@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Runtime prediction of a simulation before it is executed (--dry-run
+# 				--estimate). The duration of every task is predicted from the traces of
+# 				the previous executions of the project and the size of its inputs, and the
+# 				makespan is obtained by simulating the scheduler with the number of jobs.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+
+import os, glob, json, heapq, ntpath
+
+from humain.constants import *
+from humain.trace import count_units
+from humain.graph import TaskGraph
+from humain.scheduler import critical_path, sequential_order
+
+# The duration per input unit is fitted (least squares) only when the largest input size of the executions is at least FIT_MIN_SIZE_RATIO
+# times the smallest one, and the fit explains at least FIT_MIN_R2 of the variance of their durations
+FIT_MIN_SIZE_RATIO = 1.5
+FIT_MIN_R2 = 0.5
+
+##############################################################################################################################
+# Successful executions recorded in the traces of the project's results: (kind, name) -> list of (input units or None, wall time).
+# The tasks restored from the cache or copied from another simulation are not executions.
+def load_history( project_dir ):
+	history = {}
+	for trace_pathfilename in glob.glob( project_dir + "/results/**/*.trace.jsonl", recursive = True ):
+		with open( trace_pathfilename, "r" ) as f:
+			for line in f:
+				try:
+					record = json.loads( line )
+				except ValueError:
+					continue
+				if record.get('returncode') != 0 or not (record.get('mode') in EXECUTION_MODES):
+					continue
+				history.setdefault( (record['kind'], record['name']), [] ).append( ( record.get('input_units'), record['wall_s'] ) )
+	return( history )
+
+##############################################################################################################################
+# Model of the duration of a task: fixed + per_unit * units (both non-negative), fitted (least squares) to the executions when their
+# input sizes differ enough and the fit is good (see FIT_MIN_SIZE_RATIO and FIT_MIN_R2). Otherwise, the duration is proportional to
+# the units (mean duration per unit); without sizes, it is the mean duration.
+def fit_model( samples ):
+	walls = [ w for u, w in samples ]
+	mean_wall = sum(walls) / len(walls)
+	sized = [ (u, w) for u, w in samples if not (u is None) ]
+	units = [ u for u, w in sized ]
+	if len(set( units )) > 1 and min( units ) > 0 and max( units ) >= FIT_MIN_SIZE_RATIO * min( units ):
+		mean_u = sum( u for u, w in sized ) / len(sized)
+		mean_w = sum( w for u, w in sized ) / len(sized)
+		per_unit = sum( (u - mean_u) * (w - mean_w) for u, w in sized ) / sum( (u - mean_u) ** 2 for u, w in sized )
+		fixed = mean_w - per_unit * mean_u
+		ss_total = sum( (w - mean_w) ** 2 for u, w in sized )
+		ss_residual = sum( (w - fixed - per_unit * u) ** 2 for u, w in sized )
+		r2 = 1.0 - ss_residual / ss_total if ss_total > 0 else 1.0
+		if per_unit >= 0 and r2 >= FIT_MIN_R2:
+			return( { 'fixed': max( 0.0, fixed ), 'per_unit': per_unit, 'samples': len(samples) } )
+	if len(sized) > 0 and sum( units ) > 0:
+		return( { 'fixed': 0.0, 'per_unit': max( 0.0, sum( w for u, w in sized ) / sum( units ) ), 'samples': len(samples) } )
+	return( { 'fixed': max( 0.0, mean_wall ), 'per_unit': 0.0, 'samples': len(samples) } )
+
+##############################################################################################################################
+# Predicted duration (seconds) with the model and the input units
+def predict( model, units ):
+	return( model['fixed'] + model['per_unit'] * units )
+
+##############################################################################################################################
+# Makespan of the execution of the graph by a scheduler like the simulator's: the ready tasks are launched in FIFO order
+# while there are free jobs
+def schedule_makespan( graph, ready_tasks, durations, jobs ):
+	ready = list(ready_tasks)
+	executed = set()
+	running = []		# Heap of (end time, launch number, task)
+	now, launched = 0.0, 0
+	while len(ready) > 0 or len(running) > 0:
+		while len(ready) > 0 and len(running) < jobs:
+			task_name = ready.pop(0)
+			heapq.heappush( running, ( now + durations.get( task_name, 0.0 ), launched, task_name ) )
+			launched += 1
+		now, n, task_name = heapq.heappop( running )
+		executed.add( task_name )
+		for successor_task in graph.successors( task_name ):
+			if all( (p in executed) for p in graph.predecessors( successor_task ) ) and not (successor_task in ready):
+				ready.append( successor_task )
+	return( now )
+
+##############################################################################################################################
+# Estimate of the execution of a simulation with its number of jobs: the predicted duration and input units of every task, the
+# makespan of the workflow (of one iteration if it is iterative), its critical path, and the duration of the metrics and
+# post-processing scripts. When some inputs do not exist yet, the task has its mean units of the previous executions (or, without
+# them, the units of its largest predecessor).
+def estimate_simulation( sim, history ):
+	models = {}
+	for key, samples in history.items():
+		models[ key ] = fit_model( samples )
+
+	tasks = {}			# Task -> {'units', 'predicted', 'samples'}
+	durations = {}
+	for task_name in sequential_order( sim.workflow, sim.next_task ):
+		units = 0
+		missing = False
+		for path in sim.get_task_inputs( task_name ):
+			if os.path.exists( path ):
+				units += count_units( [ path ] )
+			else:
+				missing = True
+		previous_units = [ u for u, w in history.get( ('task', task_name), [] ) if not (u is None) ]
+		if missing and len(previous_units) > 0:
+			units = round( sum(previous_units) / len(previous_units) )
+		elif missing:
+			units = max( [ units ] + [ tasks[ p ]['units'] for p in sim.workflow.predecessors( task_name ) if p in tasks ] )
+		model = models.get( ('task', task_name) )
+		durations[ task_name ] = predict( model, units ) if model else 0.0
+		tasks[ task_name ] = { 'units': units, 'predicted': durations[ task_name ], 'samples': model['samples'] if model else 0 }
+
+	makespan = schedule_makespan( sim.workflow, sim.next_task, durations, sim.pool.jobs )
+	path, path_duration = critical_path( sim.workflow, durations )
+
+	# Metrics and post-processing scripts, with the dependencies and the number of workers of run_script_graph
+	commands = sim.script_commands( ['metrics', 'post-processing'] )
+	scripts_graph = TaskGraph()
+	scripts_durations = {}
+	for k, dependencies in enumerate( sim.script_dependencies( commands ) ):
+		scripts_graph.add_node( k )
+		for d in dependencies:
+			scripts_graph.add_edge( d, k )
+		model = models.get( ( commands[ k ][0], ntpath.basename( commands[ k ][1] ) ) )
+		scripts_durations[ k ] = predict( model, 0 ) if model else 0.0
+	roots = [ k for k in scripts_graph if len( list( scripts_graph.predecessors( k ) ) ) == 0 ]
+	scripts_makespan = schedule_makespan( scripts_graph, roots, scripts_durations, sim.script_pool.jobs )
+
+	return( { 'tasks': tasks, 'jobs': sim.pool.jobs, 'iterative': sim.iterative, 'makespan': makespan, 'sequential': sum( durations.values() ),
+		'critical_path': path, 'critical_path_s': path_duration, 'scripts_s': scripts_makespan, 'total_s': makespan + scripts_makespan,
+		'unknown': [ t for t in tasks if tasks[ t ]['samples'] == 0 ] } )
+
+##############################################################################################################################
+# Text report of an estimate
+def estimate_report( sim_name, estimate ):
+	report = "Estimate of " + sim_name + " with " + str(estimate['jobs']) + " jobs" + (" (per iteration)" if estimate['iterative'] else "") + ":\n"
+	report += "\t" + "Task".ljust(30) + "Input units".rjust(12) + "Predicted".rjust(12) + "Executions".rjust(12) + "\n"
+	for task_name, task in estimate['tasks'].items():
+		marker = " *" if task_name in estimate['critical_path'] else ""
+		report += "\t" + (task_name + marker).ljust(30) + str(task['units']).rjust(12) + ("%.2f s" % task['predicted']).rjust(12) + str(task['samples']).rjust(12) + "\n"
+	report += "\tWorkflow makespan: %.2f s (sequential: %.2f s)\n" % (estimate['makespan'], estimate['sequential'])
+	report += "\tCritical path (*): " + " -> ".join( estimate['critical_path'] ) + " (%.2f s)\n" % estimate['critical_path_s']
+	report += "\tMetrics and post-processing scripts: %.2f s\n" % estimate['scripts_s']
+	report += "\tEstimated total: %.2f s\n" % estimate['total_s']
+	if len(estimate['unknown']) > 0:
+		report += "\tWithout previous executions (predicted 0 s): " + ", ".join( estimate['unknown'] ) + "\n"
+	return( report )
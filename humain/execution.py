@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Execution of the tasks' and scripts' Python files. A script can be run in
+# 				a new subprocess or in-process, by calling the main( argv ) function of
+# 				the script, which is imported only once.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, sys, re, time, subprocess, traceback, resource
+import importlib.util
+
+from humain.constants import *
+
+# Modules of the scripts already imported, indexed by the script's path and filename
+loaded_modules = {}
+
+##############################################################################################################################
+# Imports (only the first time) the Python script and returns its module
+def load_script_module( script_filename ):
+	if script_filename in loaded_modules:
+		return( loaded_modules[ script_filename ] )
+
+	module_name = "humain_script_" + re.sub( r'\W', '_', script_filename )
+	spec = importlib.util.spec_from_file_location( module_name, script_filename )
+	module = importlib.util.module_from_spec( spec )
+	spec.loader.exec_module( module )
+	loaded_modules[ script_filename ] = module
+	return( module )
+
+##############################################################################################################################
+# True if the script can be run in-process, i.e. it exposes a main( argv ) function
+def supports_in_process( script_filename ):
+	try:
+		module = load_script_module( script_filename )
+	except Exception:
+		return( False )
+	return( callable( getattr(module, 'main', None) ) )
+
+##############################################################################################################################
+# Converts the code of a SystemExit exception in an exit code, as the interpreter does it
+def exit_code( code ):
+	if code is None:
+		return( 0 )
+	if isinstance( code, int ):
+		return( code )
+	print( code, file = sys.stderr )
+	return( 1 )
+
+##############################################################################################################################
+# Runs the script in a new Python process. Returns the exit code.
+def run_subprocess( script_filename, args_list, **kwargs ):
+	output = subprocess.run( args = [script_filename] + args_list, **kwargs )
+	return( output.returncode )
+
+##############################################################################################################################
+# Calls the main function of the (already imported) script. Returns the exit code.
+def run_in_process( script_filename, args_list ):
+	module = load_script_module( script_filename )
+	try:
+		module.main( list(args_list) )
+	except SystemExit as e:
+		return( exit_code( e.code ) )
+	except Exception:
+		traceback.print_exc()
+		return( 1 )
+	return( 0 )
+
+##############################################################################################################################
+# Runs the script with the specified execution mode. The scripts without a main( argv ) function always run in a subprocess.
+def run_script( script_filename, args_list, execution_mode = DEFAULT_EXECUTION_MODE ):
+	if not (execution_mode in EXECUTION_MODES):
+		print( "\nERROR: Unknown execution mode (" + str(execution_mode) + ").\n" )
+		sys.exit( 40 )
+
+	if (execution_mode == 'in-process') and supports_in_process( script_filename ):
+		return( run_in_process( script_filename, args_list ) )
+	if execution_mode == 'zygote':
+		# The zygote is only imported when it is used (startup time)
+		from humain.zygote import run_zygote
+		return( run_zygote( script_filename, args_list ) )
+	return( run_subprocess( script_filename, args_list ) )
+
+##############################################################################################################################
+# Characters read and written by a process (rchar and wchar of /proc/<pid>/io, i.e. including the page cache). Empty if not available.
+def read_proc_io( pid = "self" ):
+	io = {}
+	try:
+		with open( "/proc/" + str(pid) + "/io", "r" ) as f:
+			for line in f:
+				name, value = line.split(':')
+				io[ name.strip() ] = int( value )
+	except (OSError, ValueError):
+		return( {} )
+	return( { 'read_bytes': io.get('rchar'), 'write_bytes': io.get('wchar') } )
+
+##############################################################################################################################
+# Resource usage of an execution: wall-clock interval (ns), CPU time (s), peak RSS (KB), and bytes read and written
+def usage_record( start_ns, end_ns, ru = None, io_before = None, io_after = None ):
+	usage = { 'start_ns': start_ns, 'end_ns': end_ns, 'user_s': None, 'sys_s': None, 'max_rss_kb': None, 'read_bytes': None, 'write_bytes': None }
+	if not (ru is None):
+		usage['user_s'], usage['sys_s'], usage['max_rss_kb'] = ru[0], ru[1], ru[2]
+	if io_after:
+		for name in ['read_bytes', 'write_bytes']:
+			if not (io_after[ name ] is None):
+				usage[ name ] = io_after[ name ] - ( io_before[ name ] if io_before else 0 )
+	return( usage )
+
+##############################################################################################################################
+# Runs the script in a new Python process and measures its resource usage (the child is reaped by wait4 after reading its
+# /proc/<pid>/io). Returns (exit code, usage).
+def run_subprocess_measured( script_filename, args_list ):
+	start_ns = time.time_ns()
+	process = subprocess.Popen( args = [script_filename] + args_list )
+	os.waitid( os.P_PID, process.pid, os.WEXITED | os.WNOWAIT )
+	io = read_proc_io( process.pid )
+	pid, status, ru = os.wait4( process.pid, 0 )
+	end_ns = time.time_ns()
+	process.returncode = os.waitstatus_to_exitcode( status )
+	return( process.returncode, usage_record( start_ns, end_ns, (ru.ru_utime, ru.ru_stime, ru.ru_maxrss), None, io ) )
+
+##############################################################################################################################
+# Calls the main function of the script and measures the resource usage of the calling process (its peak RSS is the high-water
+# mark of the process, not of the call). Returns (exit code, usage).
+def run_in_process_measured( script_filename, args_list ):
+	load_script_module( script_filename )
+	who = getattr( resource, 'RUSAGE_THREAD', resource.RUSAGE_SELF )
+	ru_before, io_before = resource.getrusage( who ), read_proc_io()
+	start_ns = time.time_ns()
+	returncode = run_in_process( script_filename, args_list )
+	end_ns = time.time_ns()
+	ru_after, io_after = resource.getrusage( who ), read_proc_io()
+	ru = ( ru_after.ru_utime - ru_before.ru_utime, ru_after.ru_stime - ru_before.ru_stime, resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss )
+	return( returncode, usage_record( start_ns, end_ns, ru, io_before, io_after ) )
+
+##############################################################################################################################
+# Runs the script with the specified execution mode and measures its resource usage. Returns (exit code, usage).
+def run_script_measured( script_filename, args_list, execution_mode = DEFAULT_EXECUTION_MODE ):
+	if not (execution_mode in EXECUTION_MODES):
+		print( "\nERROR: Unknown execution mode (" + str(execution_mode) + ").\n" )
+		sys.exit( 40 )
+
+	if (execution_mode == 'in-process') and supports_in_process( script_filename ):
+		return( run_in_process_measured( script_filename, args_list ) )
+	if execution_mode == 'zygote':
+		from humain.zygote import run_zygote_measured
+		return( run_zygote_measured( script_filename, args_list ) )
+	return( run_subprocess_measured( script_filename, args_list ) )
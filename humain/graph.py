@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Minimal directed graph (adjacency lists) where the workflow is stored. It
+# 				implements the subset of the networkx DiGraph interface used by the
+# 				simulator, so networkx is only imported to draw the workflow.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+
+class TaskGraph:
+	'Directed graph of tasks: the attributes of every node, and the successors and predecessors (in insertion order) of every node'
+	######################################################################################################################################
+	# Constructor
+	def __init__(self):
+		self.node = {}		# Node -> dictionary of attributes
+		self.succ = {}		# Node -> list of successors
+		self.pred = {}		# Node -> list of predecessors
+
+	######################################################################################################################################
+	# Adds a node (or updates the attributes of an existing node)
+	def add_node(self, node_name, **attributes):
+		if not (node_name in self.node):
+			self.node[ node_name ] = {}
+			self.succ[ node_name ] = []
+			self.pred[ node_name ] = []
+		self.node[ node_name ].update( attributes )
+
+	######################################################################################################################################
+	# Adds the edge u -> v (and its nodes, if they do not exist)
+	def add_edge(self, u, v):
+		for node_name in [u, v]:
+			if not (node_name in self.node):
+				self.add_node( node_name )
+		if not (v in self.succ[ u ]):
+			self.succ[ u ].append( v )
+			self.pred[ v ].append( u )
+
+	######################################################################################################################################
+	# Iterator over the successors of a node
+	def successors(self, node_name):
+		return( iter( self.succ[ node_name ] ) )
+
+	######################################################################################################################################
+	# Iterator over the predecessors of a node
+	def predecessors(self, node_name):
+		return( iter( self.pred[ node_name ] ) )
+
+	######################################################################################################################################
+	# List of the edges (u, v)
+	@property
+	def edges(self):
+		return( [ (u, v) for u in self.succ for v in self.succ[ u ] ] )
+
+	######################################################################################################################################
+	# Nodes, in insertion order
+	def __iter__(self):
+		return( iter( self.node ) )
+
+	def __contains__(self, node_name):
+		return( node_name in self.node )
+
+	def __len__(self):
+		return( len(self.node) )
+
+	######################################################################################################################################
+	# Copy of the graph as a networkx DiGraph (e.g. to draw it). networkx is imported only here.
+	def to_networkx(self):
+		import networkx as nx
+		g = nx.DiGraph()
+		for node_name, attributes in self.node.items():
+			g.add_node( node_name, **attributes )
+		g.add_edges_from( self.edges )
+		return( g )
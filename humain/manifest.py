@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Output manifests of the tasks. After a successful execution, the files of
+# 				every output (and of its metrics directory) are listed with their size,
+# 				modification time, and content hash. The simulator verifies the outputs,
+# 				and the cache fingerprints them, from the manifest instead of walking the
+# 				directories again.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+
+import os, json, time, hashlib
+
+from humain.constants import *
+from humain.utils import *
+from humain.cache import file_digest, related_paths
+from humain.state import iteration_state
+from humain.trace import io_counts
+
+# Version of the manifests' format
+MANIFEST_VERSION = 1
+
+##############################################################################################################################
+# Files of an output, in the order of a sorted os.walk: [relative path, size, modification time (ns), digest]. The digests of the
+# files that did not change since the previous manifest (same path, size, and modification time) are not computed again.
+def output_files( path, previous_files ):
+	files = []
+	dirs = []
+	for root, subdirs, filenames in os.walk( path ):
+		subdirs.sort()
+		rel_root = os.path.relpath( root, path )
+		if rel_root != ".":
+			dirs.append( rel_root )
+		for f in sorted( filenames ):
+			pathfilename = os.path.join( root, f )
+			rel_path = os.path.relpath( pathfilename, path )
+			st = os.stat( pathfilename )
+			known = previous_files.get( rel_path )
+			if known and known[1] == st.st_size and known[2] == st.st_mtime_ns:
+				files.append( known )
+			else:
+				files.append( [ rel_path, st.st_size, st.st_mtime_ns, file_digest( pathfilename ) ] )
+	return( files, dirs )
+
+##############################################################################################################################
+# Digest of a list of files of a directory (the same as ResultCache.fingerprint of the directory)
+def files_digest( files ):
+	h = hashlib.blake2b( digest_size = 20 )
+	for rel_path, size, mtime_ns, digest in files:
+		h.update( (rel_path + "\0" + digest + "\n").encode('utf8') )
+	return( h.hexdigest() )
+
+##############################################################################################################################
+# Manifest of the outputs of a task (and their metrics directories). previous is the last manifest of the task (or None).
+def build_manifest( output_paths, previous = None ):
+	previous_outputs = { o['path']: o for o in previous['outputs'] } if previous else {}
+	paths = []
+	for output_path in output_paths:
+		paths += [ p for p in related_paths( output_path ) if not (p in paths) ]
+
+	outputs = []
+	for path in paths:
+		previous_files = { f[0]: f for f in previous_outputs.get( path, {} ).get( 'files', [] ) }
+		if os.path.isfile( path ):
+			st = os.stat( path )
+			known = previous_files.get( "" )
+			if known and known[1] == st.st_size and known[2] == st.st_mtime_ns:
+				files = [ known ]
+			else:
+				files = [ [ "", st.st_size, st.st_mtime_ns, file_digest( path ) ] ]
+			outputs.append( { 'path': path, 'type': 'file', 'files': files, 'dirs': [], 'digest': files[0][3] } )
+		elif os.path.isdir( path ):
+			files, dirs = output_files( path, previous_files )
+			outputs.append( { 'path': path, 'type': 'dir', 'files': files, 'dirs': dirs, 'digest': files_digest( files ) } )
+		else:
+			outputs.append( { 'path': path, 'type': 'missing', 'files': [], 'dirs': [], 'digest': "missing" } )
+	return( { 'version': MANIFEST_VERSION, 'created': time.time(), 'outputs': outputs } )
+
+##############################################################################################################################
+# Summary of a manifest: for every output, whether it exists, and its number of files and bytes
+def manifest_summary( manifest ):
+	return( [ { 'path': o['path'], 'exists': o['type'] != 'missing', 'files': len(o['files']), 'bytes': sum( f[1] for f in o['files'] ) }
+		for o in manifest['outputs'] ] )
+
+##############################################################################################################################
+# Reads a manifest. None if it does not exist or it is not valid.
+def read_manifest( pathfilename ):
+	try:
+		with open( pathfilename, "r" ) as f:
+			manifest = json.load( f )
+	except (OSError, ValueError):
+		return( None )
+	if manifest.get('version') != MANIFEST_VERSION:
+		return( None )
+	return( manifest )
+
+##############################################################################################################################
+# Writes a manifest (the previous one is replaced only when the new one is complete)
+def write_manifest( pathfilename, manifest ):
+	os.makedirs( os.path.dirname( pathfilename ), exist_ok = True )
+	tmp_pathfilename = pathfilename + ".tmp" + str(os.getpid())
+	with open( tmp_pathfilename, "w+" ) as f:
+		json.dump( manifest, f )
+	os.replace( tmp_pathfilename, pathfilename )
+
+##############################################################################################################################
+# Builds and writes the manifest of the outputs of a task, reusing the digests of its previous manifest. Returns the manifest.
+def record_manifest( pathfilename, output_paths ):
+	manifest = build_manifest( output_paths, read_manifest( pathfilename ) )
+	write_manifest( pathfilename, manifest )
+	return( manifest )
+
+##############################################################################################################################
+# Runs a task with the function run (e.g. run_in_process_measured) and, if it succeeds, records the manifest of its outputs. It is
+# executed by the worker of the task, so the manifest is built in parallel with the other tasks. The files of its outputs that the
+# iteration state is still writing in background are written first. With input_paths, the files and units of the inputs and outputs
+# of the trace are also counted by the worker. Returns (exit code, usage).
+def run_and_record( run, script_filename, args_list, output_paths, manifest_pathfilename, input_paths = None ):
+	returncode, usage = run( script_filename, args_list )
+	manifest = None
+	if returncode == 0 and manifest_pathfilename:
+		iteration_state.flush( output_paths )
+		manifest = record_manifest( manifest_pathfilename, output_paths )
+	if not (input_paths is None):
+		usage.update( io_counts( input_paths, output_paths, manifest ) )
+	return( returncode, usage )
+
+##############################################################################################################################
+# Output of the manifest that contains the path, and the path relative to it. (None, None) if no output contains the path.
+def manifest_output( manifest, path ):
+	for o in manifest['outputs']:
+		if path == o['path']:
+			return( o, "" )
+		if path.startswith( o['path'] + "/" ):
+			return( o, path[ len(o['path']) + 1: ] )
+	return( None, None )
+
+##############################################################################################################################
+# Digest of a file or directory contained in the outputs of the manifest (the same as ResultCache.fingerprint). None if not contained.
+def manifest_digest( manifest, path ):
+	o, rel_path = manifest_output( manifest, path )
+	if o is None:
+		return( None )
+	if rel_path == "":
+		return( o['digest'] )
+	for f in o['files']:
+		if f[0] == rel_path:
+			return( f[3] )
+	if rel_path in o['dirs']:
+		prefix = rel_path + "/"
+		return( files_digest( [ [ f[0][ len(prefix): ] ] + f[1:] for f in o['files'] if f[0].startswith( prefix ) ] ) )
+	return( "missing" )
+
+##############################################################################################################################
+# Verifies, with the manifest, a list of paths: (path, 'file' or 'dir', extension or None), like utils.verify_paths. The paths
+# that are not contained in the manifest's outputs are verified in the file system. Returns the set of the items that are not valid.
+def verify_manifest_paths( manifest, items ):
+	invalid = set()
+	others = []
+	for item in set( items ):
+		path, kind, ext = item
+		o, rel_path = manifest_output( manifest, path )
+		if o is None:
+			others.append( item )
+			continue
+		suffix = "." + ext.lower() if ext else ""
+		if kind == 'file':
+			valid = any( f[0] == rel_path for f in o['files'] ) and ( (not ext) or path[ -len(ext): ].lower() == ext.lower() )
+		else:
+			prefix = rel_path + "/" if rel_path != "" else ""
+			exists = (o['type'] == 'dir') and (rel_path == "" or rel_path in o['dirs'])
+			valid = exists and ( (not ext) or any( f[0].startswith( prefix ) and not ("/" in f[0][ len(prefix): ]) and f[0].endswith( suffix ) for f in o['files'] ) )
+			# The files selected through a selection manifest are not in the directory
+			if exists and (not valid) and any( f[0] == prefix + SELECTION_FILENAME for f in o['files'] ):
+				valid = verify_dir_ext( path, ext )
+		if not valid:
+			invalid.add( item )
+	return( invalid | verify_paths( others ) )
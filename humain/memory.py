@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Memory results mode. The directories of the results of a simulation where
+# 				the tasks write their outputs are symbolic links to a RAM-backed directory
+# 				(tmpfs), so the intermediate files never reach the disk. When the simulation
+# 				finishes, only the outputs of the metrics and post-processing scripts, and
+# 				the files that match the persist patterns, are copied to the disk.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, shutil, tempfile, fnmatch, threading, atexit, ntpath
+
+from humain.constants import *
+
+
+class MemoryResults:
+	'Directories of the results of a simulation kept in memory (tmpfs), and the files that are persisted on the disk when it finishes'
+	######################################################################################################################################
+	# Constructor. The patterns (e.g. "consensus_sim/accepted/*") are relative to the results directory of the simulation.
+	def __init__(self, project_results, persist_patterns = None):
+		self.project_results = project_results
+		self.persist_patterns = list( persist_patterns or [] )
+		self.memory_dir = None		# Directory in memory of the simulation (created with the first directory)
+		self.entries = {}			# Directory of the results -> its directory in memory
+		self.kept = []				# Paths that are persisted (outputs of the scripts)
+		self.lock = threading.Lock()
+		self.owner_pid = os.getpid()
+
+	######################################################################################################################################
+	# Moves to memory a directory of the first level of the results directory. A previous (disk) copy of it is deleted.
+	def place_dir(self, dir_name):
+		with self.lock:
+			if dir_name in self.entries:
+				return
+			if self.memory_dir is None:
+				base_dir = MEMORY_RESULTS_DIR if os.path.isdir( MEMORY_RESULTS_DIR ) else tempfile.gettempdir()
+				self.memory_dir = tempfile.mkdtemp( prefix = "humain_" + ntpath.basename( self.project_results ) + "_", dir = base_dir )
+				atexit.register( self.persist )
+			memory_entry = self.memory_dir + "/" + ntpath.basename( dir_name )
+			os.makedirs( memory_entry, exist_ok = True )
+			if os.path.islink( dir_name ):
+				os.unlink( dir_name )
+			elif os.path.isdir( dir_name ):
+				shutil.rmtree( dir_name )
+			os.symlink( memory_entry, dir_name )
+			self.entries[ dir_name ] = memory_entry
+
+	######################################################################################################################################
+	# Moves to memory the directories of the results where the output files and directories are written. The files of the first
+	# level of the results directory, and the outputs outside of it, stay on the disk.
+	def place(self, file_paths, dir_paths = []):
+		for path, is_dir in [ (p, False) for p in file_paths ] + [ (p, True) for p in dir_paths ]:
+			if path.startswith( self.project_results + "/" ):
+				parts = path[ len(self.project_results) + 1: ].split("/")
+				if is_dir or len(parts) > 1:
+					self.place_dir( self.project_results + "/" + parts[0] )
+
+	######################################################################################################################################
+	# Declares outputs (e.g. of the metrics scripts) that are persisted when the simulation finishes
+	def keep(self, paths):
+		with self.lock:
+			self.kept += [ p for p in paths if not (p in self.kept) ]
+
+	######################################################################################################################################
+	# True if the file (path in the results directory) is persisted
+	def is_kept(self, path):
+		relative_path = path[ len(self.project_results) + 1: ]
+		return( any( (path == p) or path.startswith( p + "/" ) for p in self.kept ) or
+			any( fnmatch.fnmatch( relative_path, pattern ) for pattern in self.persist_patterns ) )
+
+	######################################################################################################################################
+	# Replaces the links by directories with only the persisted files, and releases the memory. Only the process that created the
+	# directories does it.
+	def persist(self):
+		with self.lock:
+			if (self.memory_dir is None) or (os.getpid() != self.owner_pid):
+				return
+			for dir_name, memory_entry in self.entries.items():
+				if os.path.islink( dir_name ):
+					os.unlink( dir_name )
+				for root, dirs, files in os.walk( memory_entry ):
+					for filename in files:
+						path = dir_name + root[ len(memory_entry): ] + "/" + filename
+						if self.is_kept( path ):
+							os.makedirs( os.path.dirname( path ), exist_ok = True )
+							shutil.copy2( root + "/" + filename, path )
+			shutil.rmtree( self.memory_dir, ignore_errors = True )
+			self.memory_dir = None
+			self.entries = {}
@@ -19,18 +19,20 @@
 ##########################################################################################
 
 import os, sys, argparse
+import numpy as np
 import pandas as pd
 
 from humain.utils import *
+from humain.specimen_ids import specimen_registry, first_order
 
 
-if __name__ == '__main__':
+def main( argv = None ):
 	""" Computes the per-specimen accumulated metric value in the different tasks of the workflow.
 	"""
 	parser = argparse.ArgumentParser("Computes the per-specimen accumulated metric value in the different tasks of the workflow.")
 	parser.add_argument('-mf', '--mf', action="append", required=True, help="One or more metric files which values will be aggregated.")
 	parser.add_argument('-o', '--output_file', action="store", required=True, help="File with the summed per-specimen metric.")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 
 	# Usage: 
 	# python3 ./add.py -mf ~/Summer2019/HuMaIN_Simulator/humain/selfie/results/event_date_001/ocr_ds/metrics/duration.csv -mf ~/Summer2019/HuMaIN_Simulator/humain/selfie/results/event_date_001/reg_expr_ds/accepted/metrics/duration.csv -mf ~/Summer2019/HuMaIN_Simulator/humain/selfie/results/event_date_001/reg_expr_ds/rejected/metrics/duration.csv -mf ~/Summer2019/HuMaIN_Simulator/humain/selfie/results/event_date_001/crowd_event_date_ds/metrics/duration.csv -mf ~/Summer2019/HuMaIN_Simulator/humain/selfie/results/event_date_001/consensus_ds/accepted/metrics/duration.csv -mf ~/Summer2019/HuMaIN_Simulator/humain/selfie/results/event_date_001/consensus_ds/rejected/metrics/duration.csv -o ~/Summer2019/HuMaIN_Simulator/humain/selfie/results/event_date_001/duration.csv
@@ -47,37 +49,29 @@ if __name__ == '__main__':
 	# args.output_file
 	verify_create_file( args.output_file, 'The output data file, for the metric values, could not be created.', parser, 2 )
 
-	specimen_metric_dict = {}
-	x = 1
+	# The values are added up in an array aligned to the integer IDs of the specimens
+	registry = specimen_registry()
+	file_ids, file_sums = [ np.zeros( 0, dtype = np.int64 ) ], [ np.zeros( 0 ) ]
 	for pathfilename in args.mf:
 		df_mf = pd.DataFrame()
 		try:
 			df_mf = pd.read_csv( pathfilename, header=None )
-			df_mf = df_mf.fillna('')
 		except pd.io.common.EmptyDataError:
 			continue
 
-		n = len(df_mf.columns)
-		for index, row in df_mf.iterrows():
-			# Compute the sum of the duration column(s)
-			new_sum = 0.0
-			i = 1 
-			while i < n:
-				if row[i]:
-					new_sum += float( row[i] )
-				i = i + 1
+		# Compute the sum of the duration column(s) of every row (the empty values are skipped)
+		file_ids.append( registry.intern( df_mf[0].tolist() ) )
+		file_sums.append( df_mf.iloc[:, 1:].fillna(0.0).to_numpy( dtype = float ).sum( axis = 1 ) )
 
-			# Add the (filename,value) to the dictionary or increment the total
-			basename = row[0].split('.')[0]	
-			if basename in specimen_metric_dict.keys():
-				prev_sum = specimen_metric_dict[ basename ]
-				specimen_metric_dict[ basename ] = prev_sum + new_sum
-			else:
-				specimen_metric_dict[ basename ] = new_sum
+	# The specimens are written in the order they were found
+	ids = np.concatenate( file_ids )
+	totals = np.zeros( len(registry) )
+	np.add.at( totals, ids, np.concatenate( file_sums ) )
+	output_file_text = "".join( registry.names[ i ] + "," + str( float( totals[ i ] ) ) + "\n" for i in first_order( ids ) )
 
-	output_file_text = ""
-	for basename in specimen_metric_dict.keys():
-		output_file_text += basename + "," + str(specimen_metric_dict[ basename ]) + "\n"
-	
 	with open( args.output_file, "w+" ) as f_o:
 		f_o.write( output_file_text )
+
+
+if __name__ == '__main__':
+	main()
@@ -23,16 +23,18 @@ import pandas as pd
 from pyxdameraulevenshtein import normalized_damerau_levenshtein_distance
 
 from humain.utils import *
+from humain.store import open_dataset
+from humain.specimen_ids import specimen_registry, first_order, aligned
 
 
-if __name__ == '__main__':
+def main( argv = None ):
 	""" Compute the quality (similarity to the ground truth data) of the extracted term values
 	"""
 	parser = argparse.ArgumentParser("Compute the quality (similarity to the ground truth data) of the extracted term values.")
 	parser.add_argument('-a', '--accepted_file', action="append", required=True, help="One or more values files with accepted term values.")
 	parser.add_argument('-g', '--ground_truth', action="store", required=True, help="Ground truth values for the Specimens' term.")
 	parser.add_argument('-o', '--output_file', action="store", required=True, help="File with the Damerau-Levenshtein similarity to the ground truth data of the accepted values.")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 
 	# Usage: python3 ./quality_measure.py -a ~/Summer2019/HuMaIN_Simulator/humain/selfie/results/event_date_001/reg_expr_ds/accepted/accepted.tsv -a ~/Summer2019/HuMaIN_Simulator/humain/selfie/results/event_date_001/consensus_ds/accepted/accepted.tsv -g ~/Summer2019/HuMaIN_Simulator/datasets/aocr_mix100/gtruth/terms/dwc_eventDate.tsv -o ~/Summer2019/HuMaIN_Simulator/humain/selfie/results/event_date_001/quality.csv
 
@@ -49,23 +51,25 @@ if __name__ == '__main__':
 
 	################################################################################################################################
 	# READ THE GROUND TRUTH DATA AND LOAD THEM IN A DICTIONARY
-	specimen_gt_value = {}
-	with open( args.ground_truth, "r") as f_gt:
+	# The values are kept in arrays aligned to the integer IDs of the specimens (whatever the extension of their filenames)
+	registry = specimen_registry( args.ground_truth )
+	gt_filenames, gt_values = [], []
+	with open_dataset( args.ground_truth ) as f_gt:
 		next(f_gt)
 		for line in f_gt:
 			line = line[:-1] 
 			filename, value_gt = "", ""
 			try:
 				filename, value_gt = line.split("\t")
-				filename = filename[:-4]
 			except ValueError:
 				print("\nERROR: The ground truth file does not have the (filename, value) expected format.\n")
 				sys.exit(4)
-			specimen_gt_value[filename] = value_gt
+			gt_filenames.append( filename )
+			gt_values.append( value_gt )
 
 	################################################################################################################################
 	# READ THE CANDIDATE (ACCEPTED) VALUES AND LOAD THEM IN A DICTIONARY
-	candidate_value = {}
+	candidate_filenames, candidate_values = [], []
 	for pathfilename in args.accepted_file:
 		with open( pathfilename, "r") as f_can:
 			for line in f_can:
@@ -73,28 +77,37 @@ if __name__ == '__main__':
 				filename, ed_value = "", ""
 				try:
 					filename, ed_value = line.split("\t")
-					filename = filename[:-4]
 				except ValueError:
 					print("\nERROR: The accepted values file (" + pathfilename + ") does not have the (filename, value) expected format.\n")
 					print("line: ", line)
 					sys.exit(5)
-				candidate_value[filename] = ed_value
+				candidate_filenames.append( filename )
+				candidate_values.append( ed_value )
+
+	gt_ids = registry.intern( gt_filenames )
+	candidate_ids = registry.intern( candidate_filenames )
+	specimen_gt_value = aligned( gt_ids, gt_values, len(registry), fill = None, dtype = object )
+	candidate_value = aligned( candidate_ids, candidate_values, len(registry), fill = None, dtype = object )
+	# Specimens of the ground truth (in its order) with an accepted value
+	specimens = first_order( gt_ids )
+	specimens = specimens[ registry.mask( candidate_ids )[ specimens ] ]
 
 	################################################################################################################################
 	# COMPARISON: COMPUTATION OF THE DAMERAU-LEVENSTEIN SIMILARITY BETWEEN THE GROUND TRUTH VALUES AND THE ACCEPTED VALUES
 	sim_text = ""
 	pattern = re.compile('[\W_]+')
-	for specimen in specimen_gt_value.keys():
-		if specimen in candidate_value.keys():
-			# Eliminate special characters
-			clean_gt_value = pattern.sub(' ', specimen_gt_value[specimen].lower()).replace('  ', ' ').replace('  ', ' ')
-			clean_candidate_value = pattern.sub(' ', candidate_value[specimen].lower()).replace('  ', ' ').replace('  ', ' ')
-			sim = 1.0 - normalized_damerau_levenshtein_distance( clean_gt_value, clean_candidate_value )
-			sim_text += specimen + "," + str(sim) + "\n"
-		# else:
-		# 	sim_text += specimen + ",0.0\n"
+	for specimen_id in specimens:
+		# Eliminate special characters
+		clean_gt_value = pattern.sub(' ', specimen_gt_value[specimen_id].lower()).replace('  ', ' ').replace('  ', ' ')
+		clean_candidate_value = pattern.sub(' ', candidate_value[specimen_id].lower()).replace('  ', ' ').replace('  ', ' ')
+		sim = 1.0 - normalized_damerau_levenshtein_distance( clean_gt_value, clean_candidate_value )
+		sim_text += registry.names[ specimen_id ] + "," + str(sim) + "\n"
 
 	################################################################################################################################
 	# COMPARISON RESULTS ARE WRITTEN TO THE OUTPUT FILE
 	with open(args.output_file, "w+") as f_out:
 		f_out.write( sim_text )
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	On-disk cache of compiled simulation plans: the workflow, the tasks and
+# 				their (resolved) parameters, and the metrics and post-processing scripts,
+# 				valid while the source files keep their size and modification time.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, json, hashlib
+
+from humain.constants import *
+from humain.utils import *
+
+# Version of the plans' format (plans of other versions are compiled again)
+PLAN_VERSION = 2
+
+##############################################################################################################################
+# Size and modification time of the source files of a plan. None if one of them does not exist.
+def source_stamps( pathfilenames ):
+	stamps = []
+	for pathfilename in pathfilenames:
+		try:
+			st = os.stat( pathfilename )
+		except OSError:
+			return( None )
+		stamps.append( [ pathfilename, st.st_size, st.st_mtime_ns ] )
+	return( stamps )
+
+
+class PlanCache:
+	'Compiled plans of the simulations, indexed by the simulation file and valid while their source files do not change'
+	######################################################################################################################################
+	# Constructor
+	def __init__(self, plans_dir = PLANS_DIR):
+		self.plans_dir = plans_dir
+		verify_create_dir( self.plans_dir, 'The plans directory (' + self.plans_dir + ') could not be created.', None, 52 )
+
+	######################################################################################################################################
+	# File of the plan of a simulation file
+	def plan_pathfilename( self, params_pathfilename ):
+		return( self.plans_dir + "/" + hashlib.blake2b( params_pathfilename.encode('utf8'), digest_size = 16 ).hexdigest() + ".json" )
+
+	######################################################################################################################################
+	# Returns the plan of the simulation, or None if it was not compiled or any of its source files changed
+	def load( self, params_pathfilename, source_files ):
+		pathfilename = self.plan_pathfilename( params_pathfilename )
+		if not os.path.isfile( pathfilename ):
+			return( None )
+		try:
+			with open( pathfilename, "r" ) as f:
+				saved = json.load( f )
+		except ValueError:
+			return( None )
+		if saved.get('version') != PLAN_VERSION or saved.get('base_dir') != BASE_DIR or saved.get('sources') != source_stamps( source_files ):
+			return( None )
+		return( saved['plan'] )
+
+	######################################################################################################################################
+	# Saves the plan of the simulation, with the size and modification time of its source files
+	def save( self, params_pathfilename, source_files, plan ):
+		stamps = source_stamps( source_files )
+		if stamps is None:
+			return
+		pathfilename = self.plan_pathfilename( params_pathfilename )
+		tmp_pathfilename = pathfilename + ".tmp" + str(os.getpid())
+		with open( tmp_pathfilename, "w+" ) as f:
+			json.dump( { 'version': PLAN_VERSION, 'base_dir': BASE_DIR, 'sources': stamps, 'plan': plan }, f )
+		os.replace( tmp_pathfilename, pathfilename )
@@ -23,13 +23,13 @@ import pandas as pd
 from humain.utils import verify_file
 
 
-if __name__ == '__main__':
+def main( argv = None ):
 	""" Computes the mean, median, standard deviation, min, and max of a metric file.
 	"""
 	parser = argparse.ArgumentParser("Computes the mean, median, standard deviation, min, and max of a metric file.")
 	parser.add_argument('-m', '--metric_file', action="store", required=True, help="CSV metric file with the values in the second column.")
 	parser.add_argument('-o', '--output_file', action="store", required=True, help="Output file where the basic statistics will be saved.")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 
 	# Parameters' verification
 	verify_file( args.metric_file, 'The input metric file (' + args.metric_file + ') was not found.', None, 1 )
@@ -51,4 +51,8 @@ if __name__ == '__main__':
 	output_text += "Minimum: " + str(min_val) + "\n"
 	output_text += "Maximum: " + str(max_val) + "\n"
 	with open( args.output_file, "w+") as f_output:
-		f_output.write( output_text )
\ No newline at end of file
+		f_output.write( output_text )
+
+
+if __name__ == '__main__':
+	main()
@@ -18,12 +18,14 @@
 # and limitations under the License.
 ##########################################################################################
 
-import os, sys, re, codecs, time
+import os, sys, re, time
 import argparse, numpy
 import pandas as pd
 
 from pyxdameraulevenshtein import normalized_damerau_levenshtein_distance
 
+from humain.corpus import *
+
 ##############################################################################################################################################################
 if __name__ == '__main__':
 	""" Extraction of the scientific name using a dictionary. Every file is scanned and every pair of words compared to the dictionary entries. """
@@ -127,8 +129,7 @@ if __name__ == '__main__':
 	df_dict.fillna('', inplace= True)
 
 	##########################################################################################
-	filenames = os.listdir( args.input_dir )
-	filename_list = list(f for f in filenames if f.endswith('.txt'))
+	filename_list = list_corpus_files( args.input_dir, 'txt' )
 
 	text_accept = ""
 	text_reject = ""
@@ -139,9 +140,7 @@ if __name__ == '__main__':
 		start_time = time.time()
 
 		# Read the content of the text file, coverting to unicode
-		f = codecs.open(args.input_dir + "/" + src_file, encoding='utf-8', mode='r')
-		data = f.read().replace('\n', ' ').replace('  ', ' ').lower()
-		f.close()
+		data = read_corpus_text( args.input_dir, src_file ).replace('\n', ' ').replace('  ', ' ').lower()
 
 		# Eliminate special characters
 		pattern = re.compile('[\W_]+')
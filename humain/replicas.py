@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Monte Carlo replicas of a simulation: independent copies, each one with its
+# 				own seed and results directory, executed in parallel. The per-iteration
+# 				metrics of the replicas are aggregated (mean and confidence interval).
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, csv, math, time, ntpath, shutil
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from humain.constants import *
+from humain.utils import *
+from humain.sweep import metric_files, summarize_metric
+
+# Normal quantile of the 95% confidence interval of the mean
+Z_95 = 1.96
+
+##############################################################################################################################
+# Creates a simulation file for every replica of the base simulation, with the results in their own directory. Returns their names.
+def generate_replicas( simulations_dir, base_name, n_replicas ):
+	base_pathfilename = simulations_dir + "/" + base_name + ".xml"
+	verify_file( base_pathfilename, 'The base simulation file (' + base_pathfilename + ') was not found.', None, 80 )
+
+	sim_names = []
+	for i in range( n_replicas ):
+		replica_name = base_name + "_replica_" + str(i + 1).rjust(3, '0')
+		tree = ET.parse( base_pathfilename )
+		for element in tree.getroot().iter():
+			if element.text:
+				element.text = element.text.replace( "results/" + base_name + "/", "results/" + replica_name + "/" )
+		tree.write( simulations_dir + "/" + replica_name + ".xml", encoding = "UTF-8", xml_declaration = True )
+		sim_names.append( replica_name )
+	return( sim_names )
+
+##############################################################################################################################
+# Runs a replica with its seed (executed in a worker process). Returns a dictionary with its status and duration. The results of a
+# previous execution of the replica are removed first, so its metrics are only the ones of this execution.
+def run_replica( project, workflow, sim_name, seed, execution_mode = None, queue_dir = None, memory_results = False, persist_patterns = None ):
+	from humain.simulation import Simulation
+	shutil.rmtree( BASE_DIR + "/" + project + "/results/" + sim_name, ignore_errors = True )
+	os.environ[ SEED_ENV ] = str(seed)
+	start = time.time()
+	returncode = 0
+	try:
+		Simulation( project, workflow, sim_name, execution_mode, 1, False, queue_dir, memory_results, persist_patterns ).run()
+	except SystemExit as e:
+		returncode = e.code if isinstance( e.code, int ) else 1
+	return( { 'simulation': sim_name, 'seed': seed, 'returncode': returncode, 'elapsed': time.time() - start } )
+
+##############################################################################################################################
+# Per-iteration metrics of a replica: list of (iteration, metric, n, sum, mean). Iteration 0 for non-iterative simulations.
+def replica_metrics( project, sim_name ):
+	simulations_dir = BASE_DIR + "/" + project + "/simulations"
+	results_subdir = project + "/results/" + sim_name
+	rows = []
+	for pathfilename in metric_files( simulations_dir, sim_name ):
+		metric = ntpath.basename( pathfilename ).split('.')[0]
+		if os.path.isfile( pathfilename ):
+			rows.append( (0, metric) + summarize_metric( pathfilename ) )
+		iteration = 1
+		while True:
+			iteration_pathfilename = pathfilename.replace( results_subdir, results_subdir + "/iteration_" + str(iteration) )
+			if iteration_pathfilename == pathfilename or not os.path.isfile( iteration_pathfilename ):
+				break
+			rows.append( (iteration, metric) + summarize_metric( iteration_pathfilename ) )
+			iteration += 1
+	return( rows )
+
+##############################################################################################################################
+# Mean, standard deviation, and 95% confidence interval of the mean of a list of values
+def mean_ci( values ):
+	n = len(values)
+	mean = sum(values) / n
+	sd = math.sqrt( sum( (v - mean) ** 2 for v in values ) / (n - 1) ) if n > 1 else 0.0
+	half_width = Z_95 * sd / math.sqrt(n)
+	return( mean, sd, mean - half_width, mean + half_width )
+
+##############################################################################################################################
+# Writes the table of the replicas, one row per replica (in the order of sim_names) with its seed, exit code, and duration
+def write_replicas_table( sim_names, results, output_pathfilename ):
+	with open( output_pathfilename, "w+", newline='' ) as f:
+		writer = csv.DictWriter( f, fieldnames = ['simulation', 'seed', 'returncode', 'elapsed_s'] )
+		writer.writeheader()
+		for sim_name in sim_names:
+			writer.writerow( { 'simulation': sim_name, 'seed': results[ sim_name ]['seed'], 'returncode': results[ sim_name ]['returncode'],
+				'elapsed_s': "%.3f" % results[ sim_name ]['elapsed'] } )
+
+##############################################################################################################################
+# Runs the replicas in a pool of processes and writes one table with the mean and 95% confidence interval, over the replicas that
+# finished successfully, of the total (sum) and mean of every metric in every iteration, and the table of the replicas
+# (<output>_replicas.csv, with the exit code of every replica). With queue_dir, the tasks are executed by the workers of the work queue.
+# With memory_results, the outputs of the tasks are written in memory (see memory.py).
+def run_replicas( project, workflow, sim_names, seeds, output_pathfilename, processes = None, execution_mode = None, queue_dir = None, memory_results = False,
+	persist_patterns = None ):
+	if not processes:
+		processes = os.cpu_count() or 1
+	processes = min( processes, len(sim_names) )
+
+	results = {}
+	with ProcessPoolExecutor( max_workers = processes ) as pool:
+		futures = [ pool.submit( run_replica, project, workflow, sim_name, seed, execution_mode, queue_dir, memory_results, persist_patterns ) for sim_name, seed in zip( sim_names, seeds ) ]
+		for future in as_completed( futures ):
+			result = future.result()
+			results[ result['simulation'] ] = result
+			print( "Replica " + result['simulation'] + " (seed " + str(result['seed']) + ") finished (exit code " + str(result['returncode']) + ", %.1f s)." % result['elapsed'] )
+
+	# Values of the replicas per (iteration, metric, statistic). The failed replicas are excluded (their metrics may be incomplete).
+	values = {}
+	for sim_name in [ s for s in sim_names if results[ s ]['returncode'] == 0 ]:
+		for iteration, metric, n, total, mean in replica_metrics( project, sim_name ):
+			values.setdefault( (iteration, metric, 'sum'), [] ).append( total )
+			if mean != '':
+				values.setdefault( (iteration, metric, 'mean'), [] ).append( mean )
+
+	rows = []
+	for (iteration, metric, statistic) in sorted( values ):
+		mean, sd, ci_low, ci_high = mean_ci( values[ (iteration, metric, statistic) ] )
+		rows.append( { 'iteration': iteration, 'metric': metric, 'statistic': statistic, 'replicas': len(values[ (iteration, metric, statistic) ]),
+			'mean': mean, 'sd': sd, 'ci95_low': ci_low, 'ci95_high': ci_high } )
+
+	with open( output_pathfilename, "w+", newline='' ) as f:
+		writer = csv.DictWriter( f, fieldnames = ['iteration', 'metric', 'statistic', 'replicas', 'mean', 'sd', 'ci95_low', 'ci95_high'] )
+		writer.writeheader()
+		for row in rows:
+			writer.writerow( row )
+	write_replicas_table( sim_names, results, output_pathfilename[:-4] + "_replicas.csv" )
+
+	return( results, rows )
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Runs N independent replicas of a simulation (usually a HITL one) in parallel,
+# 				each one with its own seed for the random selection of the subsets and its
+# 				own results directory, and saves the mean and 95% confidence interval of
+# 				the per-iteration metrics over the replicas.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import sys, argparse
+
+from humain.constants import *
+from humain.utils import *
+from humain.replicas import *
+
+
+if __name__ == '__main__':
+	""" Runs seeded replicas of a simulation in parallel and saves the mean and confidence interval of their metrics per iteration.
+	"""
+	parser = argparse.ArgumentParser("Runs seeded replicas of a simulation in parallel and saves the mean and confidence interval of their metrics per iteration.")
+	parser.add_argument('-p', '--project', action="store", required=True, help="Project name (directory name of the project).")
+	parser.add_argument('-w', '--workflow', action="store", required=True, help="Workflow name (name of the workflow file) without .csv.")
+	parser.add_argument('-s', '--sim_file', action="store", required=True, help="Name of the base simulation file (do not require the .xml extension).")
+	parser.add_argument('-r', '--replicas', action="store", required=True, type=int, help="Number of replicas.")
+	parser.add_argument('--seed', action="store", required=False, type=int, default=0, help="Seed of the first replica. The replica i uses seed + i - 1.")
+	parser.add_argument('-o', '--output_file', action="store", required=True, help="Name of the CSV table with the aggregated metrics (saved in the project's results directory).")
+	parser.add_argument('-n', '--processes', action="store", required=False, type=int, default=None, help="Number of replicas executed concurrently (default: number of CPUs).")
+	parser.add_argument('-e', '--execution', action="store", required=False, choices=EXECUTION_MODES, help="Default execution mode of the tasks and scripts (subprocess or in-process).")
+	parser.add_argument('-q', '--queue', action="store", required=False, default=None, help="Coordinator mode: directory of the work queue (shared by the nodes) where the ready tasks are published and executed by run_worker.py.")
+	parser.add_argument('-M', '--memory', action="store_true", help="Write the outputs of the tasks in memory (tmpfs) and save on the disk only the outputs of the metrics and post-processing scripts.")
+	parser.add_argument('--dataset-server', dest="dataset_server", action="store_true", help="Read the datasets of the tasks through the dataset server of the machine (started if it is not running), which keeps one copy of them in shared memory for all the simulations.")
+	parser.add_argument('--persist', action="append", required=False, default=None, help="With --memory, pattern of other results to save on the disk, relative to the results directory of every simulation. One or more.")
+	args = parser.parse_args()
+
+	# Usage example
+	# python3 run_replicas.py -p selfie -w recorded_by_hitl -s recorded_by_hitl -r 100 -o rb_hitl_replicas.csv
+
+	project_dir = BASE_DIR + "/" + args.project
+	verify_dir( project_dir, 'The project directory (' + project_dir + ') was not found: ', parser, 1 )
+	simulations_dir = project_dir + "/simulations"
+	verify_dir( simulations_dir, 'The simulations directory (' + simulations_dir + ') was not found: ', parser, 2 )
+	results_dir = project_dir + "/results"
+	verify_create_dir( results_dir, 'The results directory (' + results_dir + ') was not found and could not be created.', parser, 3 )
+	if args.replicas < 1 or ((not (args.processes is None)) and args.processes < 1):
+		print( "\nERROR: The number of replicas and processes must be greater than zero.\n" )
+		parser.print_help()
+		sys.exit( 4 )
+	if args.memory and args.queue:
+		print( "\nERROR: --memory cannot be used with --queue (the workers of other nodes do not share the memory).\n" )
+		parser.print_help()
+		sys.exit( 5 )
+	if args.persist and not args.memory:
+		print( "\nERROR: --persist requires --memory.\n" )
+		parser.print_help()
+		sys.exit( 6 )
+
+	# The tasks read the datasets through the dataset server (the module is only imported when it is used)
+	if args.dataset_server:
+		from humain.dataset_server import start_dataset_server
+		start_dataset_server()
+
+	sim_names = generate_replicas( simulations_dir, args.sim_file.replace('.xml', ''), args.replicas )
+	seeds = [ args.seed + i for i in range( args.replicas ) ]
+
+	output_pathfilename = results_dir + "/" + ntpath.basename( args.output_file ).replace('.csv', '') + ".csv"
+	results, rows = run_replicas( args.project, args.workflow, sim_names, seeds, output_pathfilename, args.processes, args.execution, args.queue, args.memory,
+		args.persist )
+	failed = [ sim_name for sim_name in sim_names if results[ sim_name ]['returncode'] != 0 ]
+	print( "Metrics of the " + str(len(sim_names) - len(failed)) + " successful replicas saved in " + output_pathfilename )
+	if len(failed) > 0:
+		print( "\nERROR: " + str(len(failed)) + " replicas failed (" + ", ".join( failed ) + "). Their exit codes are in " + output_pathfilename[:-4] + "_replicas.csv\n" )
+		sys.exit( 7 )
@@ -31,12 +31,15 @@ if __name__ == '__main__':
 	parser.add_argument('-p', '--project', action="store", required=True, help="Project name (directory name of the project).")
 	parser.add_argument('-w', '--workflow', action="store", required=True, help="Workflow name (name of the workflow file) without .csv.")
 	parser.add_argument('-s', '--sim_params', action="store", required=True, help="Name of the file with the parameters for the simulation (do not require the .csv extension)")
+	parser.add_argument('-e', '--execution', action="store", required=False, choices=EXECUTION_MODES, help="Default execution mode of the tasks and scripts (subprocess, in-process, or zygote). It overrides the execution tag of the simulation file.")
+	parser.add_argument('-j', '--jobs', action="store", required=False, type=int, default=1, help="Number of ready tasks that can be executed concurrently.")
+	parser.add_argument('--no-cache', dest="use_cache", action="store_false", help="Execute all the tasks, without using the cached results of previous executions.")
 	args = parser.parse_args()
 
 	# Usage example
 	# python3 run_simulation.py -p selfie -w event_date -s event_date_001
 	
-	sim = Simulation( args.project, args.workflow, args.sim_params )
+	sim = Simulation( args.project, args.workflow, args.sim_params, args.execution, args.jobs, args.use_cache )
 	#sim.draw_workflow()
 	
 	sim.run()
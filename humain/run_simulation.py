@@ -28,6 +28,19 @@ if __name__ == '__main__':
 	parser.add_argument('-p', '--project', action="store", required=True, help="Project name (directory name of the project).")
 	parser.add_argument('-w', '--workflow', action="store", required=True, help="Workflow name (name of the workflow file) without .csv.")
 	parser.add_argument('-s', '--sim_file', action="store", required=True, help="Name of the file with the parameters for the simulation (do not require the .csv extension)")
+	parser.add_argument('-e', '--execution', action="store", required=False, choices=EXECUTION_MODES, help="Default execution mode of the tasks and scripts (subprocess, in-process, or zygote). It overrides the execution tag of the simulation file.")
+	parser.add_argument('-j', '--jobs', action="store", required=False, type=int, default=1, help="Number of ready tasks that can be executed concurrently.")
+	parser.add_argument('--no-cache', dest="use_cache", action="store_false", help="Execute all the tasks, without using the cached results of previous executions.")
+	parser.add_argument('-q', '--queue', action="store", required=False, default=None, help="Coordinator mode: directory of the work queue (shared by the nodes) where the ready tasks are published and executed by run_worker.py.")
+	parser.add_argument('--dry-run', dest="dry_run", action="store_true", help="Validate the simulation and show the commands of its tasks, without executing them.")
+	parser.add_argument('--estimate', action="store_true", help="With --dry-run, predict the duration of the tasks and the makespan from the traces of previous executions.")
+	parser.add_argument('--resume', action="store_true", help="Continue the previous execution of the simulation from its checkpoint (the last completed task or iteration).")
+	parser.add_argument('-k', '--shards', action="store", required=False, type=int, default=None, help="Split the list of specimens in K shards and run the shard-safe tasks of every shard in parallel (one process per CPU).")
+	parser.add_argument('--stream', action="store_true", help="Stream the specimens, one at a time, through the tasks whose scripts support it (stream generator); the rest of the workflow runs in batch.")
+	parser.add_argument('-M', '--memory', action="store_true", help="Write the outputs of the tasks in memory (tmpfs) and save on the disk only the outputs of the metrics and post-processing scripts.")
+	parser.add_argument('--selection', action="store", required=False, choices=SELECTION_MODES, default=None, help="How ocr_sim places the selected OCR-ed files in its output directory: copies, hard links, reflinks, or a selection manifest resolved by the next tasks (default: copy).")
+	parser.add_argument('--dataset-server', dest="dataset_server", action="store_true", help="Read the datasets of the tasks through the dataset server of the machine (started if it is not running), which keeps one copy of them in shared memory for all the simulations.")
+	parser.add_argument('--persist', action="append", required=False, default=None, help="With --memory, pattern of other results to save on the disk, relative to the results directory of the simulation (e.g. 'consensus_sim/accepted/*'). One or more.")
 	args = parser.parse_args()
 
 	# Usage example
@@ -36,8 +49,75 @@ if __name__ == '__main__':
 	# python3 run_simulation.py -p selfie -w recorded_by -s recorded_by
 	# python3 run_simulation.py -p selfie -w recorded_by_hitl -s recorded_by_hitl
 	# python3 run_simulation.py -p selfie -w rb_classifier -s rb_class_comfort
+	# python3 run_simulation.py -p selfie -w recorded_by_hitl -s recorded_by_hitl -e in-process
+	# python3 run_simulation.py -p selfie -w scientific_name -s scientific_name -j 4
+	# python3 run_simulation.py -p selfie -w recorded_by_hitl -s recorded_by_hitl --resume
+	# python3 run_simulation.py -p selfie -w scientific_name -s scientific_name -j 8 -q /shared/humain_queue
+	# python3 run_simulation.py -p selfie -w scientific_name -s scientific_name -j 4 --dry-run --estimate
+	# python3 run_simulation.py -p selfie -w scientific_name -s scientific_name -k 4
+	# python3 run_simulation.py -p selfie -w event_date -s event_date --stream
+	# python3 run_simulation.py -p selfie -w scientific_name -s scientific_name -M --persist "sn_dict_extr_sim/accepted/*"
+	# python3 run_simulation.py -p selfie -w scientific_name -s scientific_name --dataset-server
 	
-	sim = Simulation( args.project, args.workflow, args.sim_file )
+	if args.estimate and not args.dry_run:
+		print( "\nERROR: --estimate requires --dry-run.\n" )
+		parser.print_help()
+		sys.exit( 1 )
+
+	if args.shards and args.resume:
+		print( "\nERROR: --shards and --resume cannot be used together.\n" )
+		parser.print_help()
+		sys.exit( 1 )
+
+	if args.stream and (args.shards or args.resume):
+		print( "\nERROR: --stream cannot be used with --shards or --resume.\n" )
+		parser.print_help()
+		sys.exit( 1 )
+
+	if args.memory and (args.shards or args.resume or args.queue):
+		print( "\nERROR: --memory cannot be used with --shards, --resume, or --queue.\n" )
+		parser.print_help()
+		sys.exit( 1 )
+
+	if args.persist and not args.memory:
+		print( "\nERROR: --persist requires --memory.\n" )
+		parser.print_help()
+		sys.exit( 1 )
+
+	# The tasks read the datasets through the dataset server (the module is only imported when it is used)
+	if args.dataset_server:
+		from humain.dataset_server import start_dataset_server
+		start_dataset_server()
+
+	# The tasks (and the workers of the work queue) get the selection mode from the environment
+	if args.selection:
+		os.environ[ SELECTION_ENV ] = args.selection
+
+	sim = Simulation( args.project, args.workflow, args.sim_file, args.execution, args.jobs, args.use_cache, args.queue, args.memory, args.persist )
 	#sim.draw_workflow()
+
+	# Commands of the tasks (in the order of a sequential execution) and, with --estimate, their predicted durations
+	if args.dry_run:
+		for task_name in sequential_order( sim.workflow, sim.next_task ):
+			command = [ sim.workflow.node[ task_name ]['script'] ]
+			for p_name, p_type, p_value in sim.resolve_parameters( task_name ):
+				command += [ "--" + p_name, p_value ]
+			print( task_name + " (" + sim.get_execution_mode( task_name ) + "): " + " ".join( command ) )
+		if args.estimate:
+			from humain.estimate import load_history, estimate_simulation, estimate_report
+			print( "\n" + estimate_report( args.sim_file, estimate_simulation( sim, load_history( sim.project_dir ) ) ) )
+		sys.exit( 0 )
+
+	# Sharded execution (the shards module is only imported when it is used)
+	if args.shards:
+		from humain.shard import run_sharded
+		run_sharded( sim, args.project, args.workflow, args.sim_file, args.shards, None, args.execution, args.use_cache, args.queue )
+		sys.exit( 0 )
+
+	# Streaming execution (the streaming module is only imported when it is used)
+	if args.stream:
+		from humain.streaming import run_streaming
+		run_streaming( sim )
+		sys.exit( 0 )
 	
-	sim.run()
+	sim.run( args.resume )
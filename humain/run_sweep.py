@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Runs, in parallel, a family of simulation files (a list or glob pattern, or
+# 				the variants of a base file over a grid of parameter values), and saves a
+# 				table with the duration and quality metrics of every simulation.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import sys, argparse
+
+from humain.constants import *
+from humain.utils import *
+from humain.sweep import *
+
+
+if __name__ == '__main__':
+	""" Runs, in parallel, a family of simulation files and saves a table with the metrics of every simulation.
+	"""
+	parser = argparse.ArgumentParser("Runs, in parallel, a family of simulation files and saves a table with the metrics of every simulation.")
+	parser.add_argument('-p', '--project', action="store", required=True, help="Project name (directory name of the project).")
+	parser.add_argument('-w', '--workflow', action="store", required=True, help="Workflow name (name of the workflow file) without .csv.")
+	parser.add_argument('-s', '--sim_file', action="append", required=True, help="Simulation file name or glob pattern (one or more). With --grid, the single base simulation file.")
+	parser.add_argument('-g', '--grid', action="append", required=False, help="Values of a parameter of the base simulation: task.parameter=value1,value2,... (one or more). A variant is run for every combination.")
+	parser.add_argument('-o', '--output_file', action="store", required=True, help="Name of the CSV table with the metrics of the simulations (saved in the project's results directory).")
+	parser.add_argument('-n', '--processes', action="store", required=False, type=int, default=None, help="Number of simulations executed concurrently (default: number of CPUs).")
+	parser.add_argument('-e', '--execution', action="store", required=False, choices=EXECUTION_MODES, help="Default execution mode of the tasks and scripts (subprocess, in-process, or zygote).")
+	parser.add_argument('-j', '--jobs', action="store", required=False, type=int, default=1, help="Number of ready tasks that can be executed concurrently in each simulation.")
+	parser.add_argument('-d', '--dedup', action="store_true", help="Execute only once the tasks that the simulations have in common (same script, parameters, and inputs), and copy their outputs.")
+	parser.add_argument('-q', '--queue', action="store", required=False, default=None, help="Coordinator mode: directory of the work queue (shared by the nodes) where the ready tasks are published and executed by run_worker.py.")
+	parser.add_argument('--dry-run', dest="dry_run", action="store_true", help="Show the simulations of the sweep, without executing them.")
+	parser.add_argument('--estimate', action="store_true", help="With --dry-run, predict the duration of every simulation and of the sweep from the traces of previous executions.")
+	parser.add_argument('--no-cache', dest="use_cache", action="store_false", help="Execute all the tasks, without using the cached results of previous executions.")
+	parser.add_argument('-M', '--memory', action="store_true", help="Write the outputs of the tasks in memory (tmpfs) and save on the disk only the outputs of the metrics and post-processing scripts.")
+	parser.add_argument('--dataset-server', dest="dataset_server", action="store_true", help="Read the datasets of the tasks through the dataset server of the machine (started if it is not running), which keeps one copy of them in shared memory for all the simulations.")
+	parser.add_argument('--persist', action="append", required=False, default=None, help="With --memory, pattern of other results to save on the disk, relative to the results directory of every simulation. One or more.")
+	args = parser.parse_args()
+
+	# Usage examples
+	# python3 run_sweep.py -p selfie -w scientific_name -s "scientific_name_[5-9]*" -o sn_thresholds.csv
+	# python3 run_sweep.py -p selfie -w scientific_name -s scientific_name -g sn_dict_extr_sim.dict_extr_dir=datasets/aocr_mix100/sn_dict_extr/gc-ocr_50,datasets/aocr_mix100/sn_dict_extr/gc-ocr_99 -o sn_grid.csv
+	# python3 run_sweep.py -p selfie -w scientific_name -s "scientific_name_[5-9]*" -o sn_thresholds.csv -d -n 4
+
+	project_dir = BASE_DIR + "/" + args.project
+	verify_dir( project_dir, 'The project directory (' + project_dir + ') was not found: ', parser, 1 )
+	simulations_dir = project_dir + "/simulations"
+	verify_dir( simulations_dir, 'The simulations directory (' + simulations_dir + ') was not found: ', parser, 2 )
+	results_dir = project_dir + "/results"
+	verify_create_dir( results_dir, 'The results directory (' + results_dir + ') was not found and could not be created.', parser, 3 )
+	if (not (args.processes is None)) and args.processes < 1:
+		print( "\nERROR: The number of processes must be greater than zero.\n" )
+		parser.print_help()
+		sys.exit( 4 )
+	if args.memory and args.queue:
+		print( "\nERROR: --memory cannot be used with --queue (the workers of other nodes do not share the memory).\n" )
+		parser.print_help()
+		sys.exit( 6 )
+	if args.persist and not args.memory:
+		print( "\nERROR: --persist requires --memory.\n" )
+		parser.print_help()
+		sys.exit( 7 )
+
+	# The tasks read the datasets through the dataset server (the module is only imported when it is used)
+	if args.dataset_server:
+		from humain.dataset_server import start_dataset_server
+		start_dataset_server()
+
+	# Simulation files of the sweep. The variants of a grid are written only when the sweep is executed.
+	variants = None
+	if args.grid:
+		if len(args.sim_file) != 1:
+			print( "\nERROR: A grid requires a single base simulation file.\n" )
+			parser.print_help()
+			sys.exit( 5 )
+		variants = variant_trees( simulations_dir, args.sim_file[0].replace('.xml', ''), parse_grid( args.grid ) )
+		sim_names = list(variants)
+	else:
+		sim_names = find_simulations( simulations_dir, args.sim_file )
+
+	if args.dry_run:
+		print( "Simulations of the sweep: " + ", ".join( sim_names ) )
+		if args.estimate:
+			print( "\n" + estimate_sweep( args.project, args.workflow, sim_names, args.processes, args.execution, args.jobs, args.use_cache, variants ) )
+		sys.exit( 0 )
+	if variants:
+		write_variants( simulations_dir, variants )
+
+	output_pathfilename = results_dir + "/" + ntpath.basename( args.output_file ).replace('.csv', '') + ".csv"
+	run_sweep( args.project, args.workflow, sim_names, output_pathfilename, args.processes, args.execution, args.jobs, args.use_cache, args.dedup, args.queue, args.memory, args.persist )
+	print( "Metrics of the " + str(len(sim_names)) + " simulations saved in " + output_pathfilename )
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Worker mode of the simulator. Starts one or more worker processes that
+# 				execute the tasks published in a work queue (a directory shared by the
+# 				nodes) by the coordinators (run_simulation.py, run_sweep.py, or
+# 				run_replicas.py with -q).
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+
+import sys, argparse
+
+from humain.constants import *
+from humain.workqueue import *
+
+
+if __name__ == '__main__':
+	""" Executes the tasks published in a work queue by the coordinators.
+	"""
+	parser = argparse.ArgumentParser("Executes the tasks published in a work queue by the coordinators.")
+	parser.add_argument('-q', '--queue', action="store", required=True, help="Directory of the work queue (shared by the nodes).")
+	parser.add_argument('-n', '--workers', action="store", required=False, type=int, default=1, help="Number of worker processes started in this node.")
+	parser.add_argument('-i', '--idle_timeout', action="store", required=False, type=float, default=None, help="The workers finish when no task is published during this number of seconds (default: they never finish).")
+	parser.add_argument('--dataset-server', dest="dataset_server", action="store_true", help="Read the datasets of the tasks through the dataset server of the machine (started if it is not running), which keeps one copy of them in shared memory for all the simulations.")
+	args = parser.parse_args()
+
+	# Usage examples (in every node)
+	# python3 run_worker.py -q /shared/humain_queue -n 8
+	# python3 run_worker.py -q /shared/humain_queue -n 2 -i 60
+
+	if args.workers < 1:
+		print( "\nERROR: The number of workers must be greater than zero.\n" )
+		parser.print_help()
+		sys.exit( 1 )
+
+	# The tasks read the datasets through the dataset server (the module is only imported when it is used)
+	if args.dataset_server:
+		from humain.dataset_server import start_dataset_server
+		start_dataset_server()
+
+	if args.workers == 1:
+		n_tasks = run_queue_worker( args.queue, args.idle_timeout )
+	else:
+		from concurrent.futures import ProcessPoolExecutor
+		with ProcessPoolExecutor( max_workers = args.workers ) as pool:
+			futures = [ pool.submit( run_queue_worker, args.queue, args.idle_timeout ) for i in range( args.workers ) ]
+			n_tasks = sum( future.result() for future in futures )
+	print( "The workers executed " + str(n_tasks) + " tasks." )
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Concurrent execution of the ready tasks of a workflow. Subprocess tasks
+# 				run in a pool of threads and in-process tasks in a pool of processes.
+# 				It also computes the critical path and the queue wait of the tasks.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from humain.constants import *
+from humain.utils import *
+from humain.execution import *
+from humain.state import *
+from humain.manifest import run_and_record
+
+
+##############################################################################################################################
+# Future that already has its result (e.g. a task executed synchronously or restored from the cache)
+def completed_future( result ):
+	future = Future()
+	future.set_result( result )
+	return( future )
+
+
+class WorkerPool:
+	'Pool of workers where the tasks are executed. With a single job, the tasks are executed immediately in the calling thread.'
+	######################################################################################################################################
+	# Constructor
+	def __init__(self, jobs = 1):
+		if jobs < 1:
+			print( "\nERROR: The number of jobs must be greater than zero (" + str(jobs) + ").\n" )
+			sys.exit( 42 )
+		self.jobs = jobs
+		self.thread_pool = None		# Subprocess tasks (the thread just waits for the child process)
+		self.process_pool = None	# In-process tasks (each worker process imports the scripts only once)
+
+	######################################################################################################################################
+	# Starts the execution of a script. Returns a Future with the exit code and the resource usage of the execution. The files of the
+	# iteration state that the script reads (input_paths; all if it runs in another process or they are unknown) are written first.
+	# With manifest_pathfilename, the worker records the manifest of the outputs (output_paths) when the script succeeds, and with
+	# input_paths it counts the files and units of the inputs and outputs of the trace.
+	def submit(self, script_filename, args_list, execution_mode, input_paths = None, output_paths = None, manifest_pathfilename = None):
+		in_process = (execution_mode == 'in-process') and supports_in_process( script_filename )
+		iteration_state.flush( input_paths if (in_process and self.jobs == 1) else None )
+		run = run_in_process_measured if in_process else run_subprocess_measured
+		if execution_mode == 'zygote':
+			# The zygote is only imported when it is used (startup time)
+			from humain.zygote import run_zygote_measured
+			run = run_zygote_measured
+		output_paths = list(output_paths or [])
+		input_paths = None if (input_paths is None) else list(input_paths)
+		if self.jobs == 1:
+			return( completed_future( run_and_record( run, script_filename, args_list, output_paths, manifest_pathfilename, input_paths ) ) )
+
+		if in_process:
+			if self.process_pool is None:
+				# multiprocessing is only imported when it is needed (startup time)
+				from concurrent.futures import ProcessPoolExecutor
+				self.process_pool = ProcessPoolExecutor( max_workers = self.jobs )
+			return( self.process_pool.submit( run_and_record, run, script_filename, args_list, output_paths, manifest_pathfilename, input_paths ) )
+
+		if self.thread_pool is None:
+			self.thread_pool = ThreadPoolExecutor( max_workers = self.jobs )
+		return( self.thread_pool.submit( run_and_record, run, script_filename, args_list, output_paths, manifest_pathfilename, input_paths ) )
+
+	######################################################################################################################################
+	# Waits until at least one of the futures finishes. Returns the set of finished futures.
+	def wait_any(self, futures):
+		done, not_done = wait( futures, return_when = FIRST_COMPLETED )
+		return( done )
+
+	######################################################################################################################################
+	# Waits for the running tasks and releases the workers
+	def shutdown(self):
+		for pool in [self.thread_pool, self.process_pool]:
+			if not (pool is None):
+				pool.shutdown( wait = True )
+		self.thread_pool = None
+		self.process_pool = None
+
+
+##############################################################################################################################
+# Pool where the tasks of a simulation are executed: the local workers, or the workers of a work queue (coordinator mode)
+def create_pool( jobs = 1, queue_dir = None ):
+	if queue_dir:
+		# The work queue is only imported when it is used (startup time)
+		from humain.workqueue import QueuePool
+		return( QueuePool( queue_dir, jobs ) )
+	return( WorkerPool( jobs ) )
+
+
+class OrderedLog:
+	'Log messages of the tasks, written in the order of a sequential execution regardless of the order in which the tasks finish'
+	######################################################################################################################################
+	# Constructor
+	def __init__(self, log_pathfilename):
+		self.log_pathfilename = log_pathfilename
+		self.order = []			# Tasks in the order of a sequential execution
+		self.messages = {}		# Task -> list of messages, for the tasks that already finished
+
+	######################################################################################################################################
+	# Sets the order in which the messages of the next tasks will be written
+	def set_order(self, order):
+		self.flush( force = True )
+		self.order = list(order)
+		self.messages = {}
+
+	######################################################################################################################################
+	# Saves the messages of a finished task and writes all the messages that are already in order
+	def add(self, task_name, msg_list):
+		self.messages[ task_name ] = list(msg_list)
+		self.flush()
+
+	######################################################################################################################################
+	# Writes the messages of the finished tasks at the beginning of the order. If force, the pending messages are written too.
+	def flush(self, force = False):
+		while len(self.order) > 0 and (self.order[0] in self.messages):
+			for msg in self.messages.pop( self.order[0] ):
+				write_log( self.log_pathfilename, msg )
+			del self.order[0]
+		if force:
+			for task_name in self.order:
+				for msg in self.messages.pop( task_name, [] ):
+					write_log( self.log_pathfilename, msg )
+			self.order = []
+
+	######################################################################################################################################
+	# True if there are no tasks which messages are expected
+	def empty(self):
+		return( len(self.order) == 0 )
+
+
+##############################################################################################################################
+# Order in which a sequential (FIFO) execution would run the tasks, from the ready tasks and the executed ones
+def sequential_order( workflow, ready_tasks ):
+	executed = set( t for t in workflow if workflow.node[ t ]['executed'] )
+	queue = list(ready_tasks)
+	order = []
+	while len(queue) > 0:
+		task_name = queue.pop(0)
+		order.append( task_name )
+		executed.add( task_name )
+		for successor_task in workflow.successors( task_name ):
+			if all( (p in executed) for p in workflow.predecessors( successor_task ) ) and not (successor_task in queue):
+				queue.append( successor_task )
+	return( order )
+
+##############################################################################################################################
+# Longest chain of dependent tasks, weighted by the duration of the tasks. Returns (list of tasks, total duration)
+def critical_path( workflow, durations ):
+	finish = {}		# Task -> (accumulated duration, predecessor in the longest chain)
+	pending = [ t for t in workflow if t in durations ]
+	while len(pending) > 0:
+		n_pending = len(pending)
+		for task_name in list(pending):
+			predecessors = [ p for p in workflow.predecessors( task_name ) if p in durations ]
+			if all( (p in finish) for p in predecessors ):
+				best = None
+				for p in predecessors:
+					if (best is None) or (finish[ p ][0] > finish[ best ][0]):
+						best = p
+				accumulated = durations[ task_name ]
+				if not (best is None):
+					accumulated += finish[ best ][0]
+				finish[ task_name ] = ( accumulated, best )
+				pending.remove( task_name )
+		# A cycle in the workflow
+		if len(pending) == n_pending:
+			break
+
+	if len(finish) == 0:
+		return( [], 0.0 )
+
+	task_name = max( finish, key = lambda t: finish[ t ][0] )
+	total = finish[ task_name ][0]
+	path = []
+	while not (task_name is None):
+		path.insert( 0, task_name )
+		task_name = finish[ task_name ][1]
+	return( path, total )
+
+##############################################################################################################################
+# Dependencies between scripts inferred from their paths: a script depends on a previous one (in the list) if it reads what the previous
+# one writes, writes what it reads, or writes the same output. Returns, for every script, the list of the scripts it depends on.
+def path_dependencies( inputs_list, outputs_list ):
+	dependencies = []
+	for j in range( len(inputs_list) ):
+		dependencies.append( [ i for i in range(j)
+			if any( path_overlaps( p, outputs_list[ i ] ) for p in inputs_list[ j ] + outputs_list[ j ] ) or any( path_overlaps( p, inputs_list[ i ] ) for p in outputs_list[ j ] ) ] )
+	return( dependencies )
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Specimen-sharded execution of a simulation. The list of specimens is split
+# 				in K shards, the shard-safe part of the workflow runs once per shard in
+# 				parallel, and the outputs of the shards are merged. The tasks declared with
+# 				shard="no" in tasks.xml (and the tasks after them), the metrics, and the
+# 				post-processing scripts run afterwards on the merged outputs.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, sys, shutil, time, ntpath
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from humain.constants import *
+from humain.utils import *
+from humain.cache import related_paths
+
+##############################################################################################################################
+# Tasks that run in the shards: the shard-safe tasks whose predecessors also run in the shards (the tasks with shard="no" are a merge
+# barrier). Returns (tasks in the order of the workflow, list of (task, parameter) of the specimen lists to split).
+def shard_plan( sim ):
+	sharded = []
+	changed = True
+	while changed:
+		changed = False
+		for task_name in sim.workflow:
+			node = sim.workflow.node[ task_name ]
+			if (not (task_name in sharded)) and node.get('shardable', True) and all( p in sharded for p in sim.workflow.predecessors( task_name ) ):
+				sharded.append( task_name )
+				changed = True
+	sharded = [ t for t in sim.workflow if t in sharded ]
+
+	lists = []
+	for task_name in sharded:
+		if len(list( sim.workflow.predecessors( task_name ) )) == 0:
+			lists += [ ( task_name, p_name ) for p_name in sim.workflow.node[ task_name ].get('shard_lists', []) ]
+	return( sharded, lists )
+
+##############################################################################################################################
+# Splits the lines of a list of specimens in consecutive parts of (almost) the same size, one per shard, saved with the same name
+# in the directories of the shards
+def split_list( list_pathfilename, shard_dirs ):
+	with open( list_pathfilename, "r" ) as f:
+		specimens = [ line.strip() for line in f if line.strip() != "" ]
+	n_shards = len(shard_dirs)
+	start = 0
+	for i, shard_dir in enumerate( shard_dirs ):
+		end = start + len(specimens) // n_shards + ( 1 if i < len(specimens) % n_shards else 0 )
+		os.makedirs( shard_dir, exist_ok = True )
+		with open( shard_dir + "/" + ntpath.basename( list_pathfilename ), "w+" ) as f:
+			f.write( "".join( s + "\n" for s in specimens[ start:end ] ) )
+		start = end
+
+##############################################################################################################################
+# Directory of the shards of a simulation (their workflow, simulation files, and results), inside the results of the simulation
+def shards_dir( sim ):
+	return( sim.project_results + "/" + SHARDS_DIRNAME )
+
+##############################################################################################################################
+# Path of the result of a shard that corresponds to a path of the results of the simulation
+def shard_path( path, sim_name, shard_name ):
+	return( path.replace( "results/" + sim_name + "/", "results/" + sim_name + "/" + SHARDS_DIRNAME + "/" + shard_name + "/", 1 ) )
+
+##############################################################################################################################
+# Writes the workflow and the simulation file of every shard in the directory of the shards: only the sharded tasks, their results in
+# the directory of the shard, the lists of specimens of the shard, and without metrics and post-processing. Returns (workflow of the
+# shards, simulation files of the shards, sharded tasks); the files are absolute paths.
+def generate_shards( sim, project, workflow, sim_name, n_shards ):
+	sharded, lists = shard_plan( sim )
+	if len(lists) == 0:
+		print( "\nERROR: No task of the simulation " + sim_name + " has a list of specimens to split (parameter with shard=\"list\" in tasks.xml).\n" )
+		sys.exit( 121 )
+
+	# The shards of a previous execution are discarded
+	shutil.rmtree( shards_dir( sim ), ignore_errors = True )
+	verify_create_dir( shards_dir( sim ), 'The directory of the shards (' + shards_dir( sim ) + ') could not be created.', None, 124 )
+
+	# Workflow of the shards
+	shard_workflow = shards_dir( sim ) + "/" + ntpath.basename( workflow ).replace('.csv', '') + "_shard.csv"
+	lines = [ ", ".join( [ t ] + list( sim.workflow.predecessors( t ) ) ) + "\n" for t in sharded ]
+	with open( shard_workflow, "w+" ) as f:
+		f.write( "".join( lines ) )
+
+	shard_names = [ sim_name + "_shard_" + str(i + 1).rjust(3, '0') for i in range( n_shards ) ]
+	list_values = {}		# (task, parameter) -> values of the lists
+	for task_name, p_name in lists:
+		list_values[ ( task_name, p_name ) ] = sim.workflow.node[ task_name ]['param_values'][ p_name ]
+		for p_value in list_values[ ( task_name, p_name ) ]:
+			split_list( BASE_DIR + "/" + p_value, [ shards_dir( sim ) + "/" + shard_name + "/lists" for shard_name in shard_names ] )
+
+	shard_files = []
+	for shard_name in shard_names:
+		tree = ET.parse( sim.params_pathfilename )
+		root = tree.getroot()
+		for tasks in root.findall('tasks'):
+			for task in tasks.findall('task'):
+				if not (task.get('name') in sharded):
+					tasks.remove( task )
+					continue
+				for parameter in task.findall('parameter'):
+					if ( task.get('name'), parameter.get('name') ) in list_values:
+						parameter.text = shard_path( project + "/results/" + sim_name + "/", sim_name, shard_name ) + "lists/" + ntpath.basename( str(parameter.text) )
+					elif parameter.text:
+						parameter.text = shard_path( parameter.text, sim_name, shard_name )
+		for section_name in ["metrics", "post-processing"]:
+			for section in root.findall( section_name ):
+				for script in section.findall('script'):
+					section.remove( script )
+		shard_files.append( shards_dir( sim ) + "/" + shard_name + ".xml" )
+		tree.write( shard_files[-1], encoding = "UTF-8", xml_declaration = True )
+	return( shard_workflow, shard_files, sharded )
+
+##############################################################################################################################
+# Runs the shard-safe part of the workflow for a shard (executed in a worker process). Returns a dictionary with its status and duration.
+def run_shard( project, shard_workflow, shard_file, execution_mode = None, use_cache = True, queue_dir = None ):
+	from humain.simulation import Simulation
+	start = time.time()
+	returncode = 0
+	try:
+		Simulation( project, shard_workflow, shard_file, execution_mode, 1, use_cache, queue_dir ).run()
+	except SystemExit as e:
+		returncode = e.code if isinstance( e.code, int ) else 1
+	return( { 'shard': ntpath.basename( shard_file )[:-4], 'returncode': returncode, 'elapsed': time.time() - start } )
+
+##############################################################################################################################
+# Appends the content of a text file to another (the tables of the tasks have no header: one line per specimen)
+def append_file( src_pathfilename, dst_pathfilename ):
+	with open( dst_pathfilename, "rb+" ) as dst:
+		dst.seek( 0, os.SEEK_END )
+		if dst.tell() > 0:
+			dst.seek( -1, os.SEEK_END )
+			if dst.read( 1 ) != b"\n":
+				dst.write( b"\n" )
+		with open( src_pathfilename, "rb" ) as src:
+			shutil.copyfileobj( src, dst )
+
+##############################################################################################################################
+# Merges an output (file or directory) of the shards: the files that exist in several shards (tables, metrics, and lists of accepted
+# and rejected specimens) are concatenated in the order of the shards, and the others (one per specimen) are copied.
+def merge_output( src_paths, dst_path ):
+	if os.path.isdir( dst_path ):
+		shutil.rmtree( dst_path )
+	elif os.path.isfile( dst_path ):
+		os.remove( dst_path )
+
+	for src_path in src_paths:
+		if os.path.isfile( src_path ):
+			os.makedirs( os.path.dirname( dst_path ), exist_ok = True )
+			if os.path.isfile( dst_path ):
+				append_file( src_path, dst_path )
+			else:
+				shutil.copyfile( src_path, dst_path )
+		elif os.path.isdir( src_path ):
+			for root, dirs, files in os.walk( src_path ):
+				dst_root = dst_path + root[ len(src_path): ]
+				os.makedirs( dst_root, exist_ok = True )
+				for filename in files:
+					if os.path.isfile( dst_root + "/" + filename ):
+						append_file( root + "/" + filename, dst_root + "/" + filename )
+					else:
+						shutil.copyfile( root + "/" + filename, dst_root + "/" + filename )
+
+##############################################################################################################################
+# Merges the outputs (and their metrics directories) of the sharded tasks in the results directory of the simulation
+def merge_shards( sim, sim_name, shard_names, sharded ):
+	for task_name in sharded:
+		for output_path in sim.get_task_outputs( task_name ):
+			# The metrics directories of the outputs are found in the results of the first shard
+			for path in related_paths( shard_path( output_path, sim_name, shard_names[0] ) ):
+				path = path.replace( shard_path( "results/" + sim_name + "/", sim_name, shard_names[0] ), "results/" + sim_name + "/", 1 )
+				merge_output( [ shard_path( path, sim_name, shard_name ) for shard_name in shard_names ], path )
+
+##############################################################################################################################
+# Runs the simulation (sim) split in n_shards shards of its list of specimens, in a pool of processes (one per CPU by default). The
+# rest of the workflow, the metrics, and the post-processing run on the merged outputs. The directory of the shards is removed once
+# they are merged (it is kept after an error).
+def run_sharded( sim, project, workflow, sim_name, n_shards, processes = None, execution_mode = None, use_cache = True, queue_dir = None ):
+	if n_shards < 1:
+		print( "\nERROR: The number of shards must be greater than zero (" + str(n_shards) + ").\n" )
+		sys.exit( 120 )
+	if sim.iterative:
+		print( "\nERROR: The iterative (HITL) simulations cannot be sharded.\n" )
+		sys.exit( 122 )
+
+	start = time.time()
+	sim_name = ntpath.basename( sim_name ).replace('.xml', '')
+	shard_workflow, shard_files, sharded = generate_shards( sim, project, workflow, sim_name, n_shards )
+	shard_names = [ ntpath.basename( f )[:-4] for f in shard_files ]
+	print( "Shards: " + str(n_shards) + " shards of the tasks " + ", ".join( sharded ) + "." )
+	if not processes:
+		processes = os.cpu_count() or 1
+	processes = min( processes, n_shards )
+
+	results = []
+	with ProcessPoolExecutor( max_workers = processes ) as pool:
+		futures = [ pool.submit( run_shard, project, shard_workflow, shard_file, execution_mode, use_cache, queue_dir ) for shard_file in shard_files ]
+		for future in as_completed( futures ):
+			result = future.result()
+			results.append( result )
+			print( "Shard " + result['shard'] + " finished (exit code " + str(result['returncode']) + ", %.1f s)." % result['elapsed'] )
+	failed = [ r for r in results if r['returncode'] != 0 ]
+	if len(failed) > 0:
+		print( "\nERROR: The shard " + failed[0]['shard'] + " generated an error (exit code " + str(failed[0]['returncode']) + "). Its results are in " + shards_dir( sim ) + ".\n" )
+		sys.exit( 123 )
+
+	merge_shards( sim, sim_name, shard_names, sharded )
+	shutil.rmtree( shards_dir( sim ), ignore_errors = True )
+	print( "Shards executed and merged in %.1f s." % (time.time() - start) )
+
+	# The sharded tasks are already done: the rest of the workflow, the metrics, and the post-processing run on the merged outputs
+	sim.skip_tasks( sharded )
+	sim.run()
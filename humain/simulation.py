@@ -19,20 +19,29 @@
 # and limitations under the License.
 ##########################################################################################
 
-import sys, networkx as nx
-import matplotlib.pyplot as plt
-import ntpath, subprocess, re
+import os, sys
+import ntpath, subprocess, re, time
 import xml.etree.ElementTree as ET
 
 from humain.constants import *
 from humain.utils import *
+from humain.execution import *
+from humain.scheduler import *
+from humain.cache import *
+from humain.manifest import *
+from humain.trace import *
+from humain.plan import *
+from humain.checkpoint import *
+from humain.graph import *
 
 
 class Simulation:
 	'Sequence of tasks to execute'
 	######################################################################################################################################
-	# Constructor
-	def __init__(self, prj_name, wfw_name, sim_par_name):
+	# Constructor. With params_root (the parsed simulation file, e.g. a variant of a sweep that was not written), the simulation file and its
+	# results directory are not required: the simulation can be estimated, but not executed.
+	def __init__(self, prj_name, wfw_name, sim_par_name, execution_mode = None, jobs = 1, use_cache = True, queue_dir = None, memory_results = False, persist_patterns = None,
+		params_root = None):
 		##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##--
 		# Project's Directory
 		self.project_dir = BASE_DIR + "/" + prj_name
@@ -42,8 +51,10 @@ class Simulation:
 		self.workflows_dir = self.project_dir + "/workflows" 
 		verify_dir( self.workflows_dir, 'The workflows directory (' + self.workflows_dir + ') was not found: ', None, 2 )
 
-		# Workflow Definition File
+		# Workflow Definition File (an absolute path is used as it is, e.g. the workflow of the shards, in the results of the simulation)
 		self.workflow_pathfilename = self.workflows_dir + "/" + ntpath.basename( wfw_name ).replace('.csv', '') + ".csv"
+		if os.path.isabs( wfw_name ):
+			self.workflow_pathfilename = wfw_name.replace('.csv', '') + ".csv"
 		verify_file( self.workflow_pathfilename, 'The workflow file (' + self.workflow_pathfilename + ') was not found.', None, 3 )
 
 		# Tasks Directory 
@@ -54,38 +65,97 @@ class Simulation:
 		self.simulations_dir = self.project_dir + "/simulations"
 		verify_dir( self.simulations_dir, 'The simulations directory (' + self.simulations_dir + ') was not found: ', None, 5 )
 
-		# File with the simulation parameters of the workflow
+		# File with the simulation parameters of the workflow (an absolute path is used as it is, and the results are saved next to it)
 		self.params_pathfilename = self.simulations_dir + "/" + ntpath.basename( sim_par_name ).replace('.xml', '') + ".xml"
-		verify_file( self.params_pathfilename, 'The simulation parameters file (' + self.params_pathfilename + ') was not found.', None, 6 )
+		if os.path.isabs( sim_par_name ):
+			self.params_pathfilename = sim_par_name.replace('.xml', '') + ".xml"
+		if params_root is None:
+			verify_file( self.params_pathfilename, 'The simulation parameters file (' + self.params_pathfilename + ') was not found.', None, 6 )
 
 		# Results directory: self.project_results
 		results_dir = self.project_dir + "/results"
 		verify_create_dir( results_dir, 'The results directory (' + results_dir + ') was not found and could not be created.', None, 7 )
 		self.project_results = results_dir + "/" + ntpath.basename(sim_par_name).replace('.xml', '')
-		verify_create_dir( self.project_results, 'The directory to store the execution results(' + self.project_results + ') and could not be created.', None, 8 )
+		if os.path.isabs( sim_par_name ):
+			self.project_results = self.params_pathfilename[:-4]
+		if params_root is None:
+			verify_create_dir( self.project_results, 'The directory to store the execution results(' + self.project_results + ') and could not be created.', None, 8 )
 
 		# Execution Log 
 		self.log_pathfilename = self.project_results + "/" + ntpath.basename( sim_par_name ) + ".log"
 
+		# Performance trace (JSONL) and its export to the Chrome trace format
+		self.trace_pathfilename = self.project_results + "/" + ntpath.basename( sim_par_name ).replace('.xml', '') + ".trace.jsonl"
+		self.chrome_trace_pathfilename = self.project_results + "/" + ntpath.basename( sim_par_name ).replace('.xml', '') + ".trace.json"
+		self.trace = None
+
+		# Checkpoint of the scheduler's state, saved after every task (run_simulation.py --resume)
+		self.checkpoint_pathfilename = self.project_results + "/" + ntpath.basename( sim_par_name ).replace('.xml', '') + ".checkpoint.json"
+
 		##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##--
 		##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##-------##--
 
 		# Workflow = Graph
-		self.workflow = nx.DiGraph()
+		self.workflow = TaskGraph()
 		self.iterative = False			# Yes -> HITL execution
 		self.stop_task = None			# Task that will decide when to stop the simulation
+		self.execution_mode = DEFAULT_EXECUTION_MODE	# subprocess, in-process, or zygote (it can be changed per task)
 
 		# Task(s) to be executed next
 		self.next_task = []
 
-		# Load the structure of tasks
-		self.load_tasks( )
+		# Workers where the ready tasks are executed (local, or the workers of a work queue), and (ready, start, end) times of every task
+		self.pool = create_pool( jobs, queue_dir )
+		self.task_times = {}
+
+		# Workers of the metrics and post-processing scripts, and scripts running in background (HITL: during the next iteration)
+		self.script_pool = WorkerPool( max( jobs, os.cpu_count() or 1 ) )
+		self.background = None
+		self.background_scripts = {}		# Future -> iteration number of the scripts
+
+		# Metrics and post-processing scripts: section -> list of (script's file, execution mode, list of (parameter, value))
+		self.scripts = {}
+
+		# The workflow, tasks, and simulation files are parsed and validated only once, while they do not change (compiled plan)
+		source_files = [ self.workflow_pathfilename, self.project_dir + "/tasks.xml", self.params_pathfilename ]
+		self.plans = PlanCache() if (use_cache and params_root is None) else None
+		plan = self.plans.load( self.params_pathfilename, source_files ) if self.plans else None
+		if plan is None:
+			root_sim = ET.parse( self.params_pathfilename ).getroot() if params_root is None else params_root
+
+			# Load the structure of tasks
+			self.load_tasks( )
+
+			# Load the parameters of every tasks of the workflow
+			self.load_parameters( root_sim )
+
+			# Load the values for each of the Tasks' parameters
+			self.load_values( root_sim )
+
+			# Load the metrics and post-processing scripts
+			self.load_scripts( root_sim )
+
+			if self.plans:
+				self.plans.save( self.params_pathfilename, source_files, self.compile_plan() )
+		else:
+			self.apply_plan( plan )
+		self.checkpoint = Checkpoint( self.checkpoint_pathfilename, source_files )
+
+		# Cache of results. Iterative simulations depend on the previous iterations and on random subsets, so they are not cached.
+		# In the memory results mode, the intermediate outputs are not kept (neither in the cache).
+		self.cache = None
+		if use_cache and not (self.iterative or memory_results):
+			self.cache = ResultCache()
 
-		# Load the parameters of every tasks of the workflow
-		self.load_parameters( )
+		# Memory results mode: the outputs of the tasks are written in memory, and only the final results are saved on the disk
+		self.memory = None
+		if memory_results:
+			from humain.memory import MemoryResults
+			self.memory = MemoryResults( self.project_results, persist_patterns )
 
-		# Load the values for each of the Tasks' parameters
-		self.load_values( )
+		# The execution mode specified in the command line has priority over the one of the simulation file
+		if execution_mode:
+			self.execution_mode = self.validate_execution_mode( execution_mode, "the command line" )
 
 	######################################################################################################################################
 	# Load the nodes (tasks) and structure of the IE workflow
@@ -111,20 +181,21 @@ class Simulation:
 						i = i + 1
 	
 	######################################################################################################################################
-	# Draw the graph of tasks and the order of execution
+	# Draw the graph of tasks and the order of execution (networkx and matplotlib are only imported here)
 	def draw_workflow(self):
-		pos = nx.circular_layout(self.workflow)    
-		nx.draw(self.workflow, pos, with_labels = True, edge_color = 'b')  
-		#node_labels = nx.get_node_attributes(self.workflow, 'param_types')
-		node_labels = nx.get_node_attributes(self.workflow, 'param_values')
-		nx.draw_networkx_labels(self.workflow, pos, labels = node_labels)
+		import networkx as nx
+		import matplotlib.pyplot as plt
+		workflow = self.workflow.to_networkx()
+		pos = nx.circular_layout(workflow)    
+		nx.draw(workflow, pos, with_labels = True, edge_color = 'b')  
+		#node_labels = nx.get_node_attributes(workflow, 'param_types')
+		node_labels = nx.get_node_attributes(workflow, 'param_values')
+		nx.draw_networkx_labels(workflow, pos, labels = node_labels)
 		plt.show()
 	
 	######################################################################################################################################
 	# Load inputs and outputs of every (tasks) and save them as nodes' attributes in the graph
-	def load_parameters(self):
-		# Load the content of the xml simulation file, creates element tree object, and get the root
-		root_sim = ET.parse( self.params_pathfilename ).getroot()
+	def load_parameters(self, root_sim):
 		# Read the type of workflow and its parameters
 		for s in root_sim.findall('simulation'):
 			iterative_tag = s.find('iterative')
@@ -138,6 +209,10 @@ class Simulation:
 				stop_task_tag = s.find('stop_task')
 				if not (stop_task_tag is None):
 					self.stop_task = str(stop_task_tag.text)
+			# execution Tag
+			execution_tag = s.find('execution')
+			if not (execution_tag is None):
+				self.execution_mode = self.validate_execution_mode( str(execution_tag.text).strip(), "the simulation file" )
 
 		# Load the content of the tasks.xml file
 		tasks_xml = self.project_dir + "/tasks.xml"
@@ -157,6 +232,7 @@ class Simulation:
 
 				para_type_dict = {}
 				para_value_dict = {}
+				shard_lists = []
 				# Process every parameter
 				for parameter in task.findall('parameter'):
 					para_name = parameter.get('name')
@@ -167,16 +243,24 @@ class Simulation:
 						sys.exit( 11 )
 					para_type_dict[ para_name ] = para_type
 					para_value_dict[ para_name ] = None
+					# Parameters with shard="list": lists of specimens (one per line) that are split among the shards
+					if str(parameter.get('shard')).lower() == 'list':
+						shard_lists.append( para_name )
 
 				# The validated list of parameters is added as an attribute to the node
 				self.workflow.node[ task_name ]['param_types'] = para_type_dict
 				self.workflow.node[ task_name ]['param_values'] = para_value_dict
+				# Execution mode of the task (None -> the one of the simulation)
+				self.workflow.node[ task_name ]['execution'] = None
+				# Tasks with cache="no" (e.g. random or dependent on previous iterations) are always executed
+				self.workflow.node[ task_name ]['cacheable'] = ( str(task.get('cache')).lower() != 'no' )
+				# Tasks with shard="no" (e.g. they build a dictionary or a model from all the specimens) run after the shards are merged
+				self.workflow.node[ task_name ]['shardable'] = ( str(task.get('shard')).lower() != 'no' )
+				self.workflow.node[ task_name ]['shard_lists'] = shard_lists
 
 	######################################################################################################################################
 	# Load the values for each of the Tasks' parameters
-	def load_values(self):
-		# Create element tree object and get the root
-		root = ET.parse( self.params_pathfilename ).getroot()
+	def load_values(self, root):
 		# Process every task
 		for task in root.findall('tasks/task'):
 			task_name = task.get('name')
@@ -185,6 +269,10 @@ class Simulation:
 				print( "\nERROR: The task " + task_name + " was not defined in the workflow.\n" )
 				sys.exit( 12 )
 
+			# Optional execution mode of the task
+			if not (task.get('execution') is None):
+				self.workflow.node[ task_name ]['execution'] = self.validate_execution_mode( task.get('execution'), "Task " + task_name )
+
 			# Process every parameter
 			for parameter in task.findall('parameter'):
 				para_name = parameter.get('name')
@@ -208,8 +296,87 @@ class Simulation:
 					sys.exit( 14 )
 
 	######################################################################################################################################
-	# Returns the parameters to run the especified Task
-	def get_execution_parameters(self, task_name ):
+	# Load the metrics and post-processing scripts of the simulation file, with their execution mode and parameters
+	def load_scripts(self, root):
+		for section_name in ["metrics", "post-processing"]:
+			# Directory where the scripts to be executed must be located
+			scripts_dir = BASE_DIR + "/humain/" + section_name + "/"
+			self.scripts[ section_name ] = []
+			for script in root.findall( section_name + '/script'):
+				script_name = script.get('name')
+				# Verify the existence of the script
+				script_filename = scripts_dir + script_name
+				verify_file( script_filename, "The script " + script_filename + " was not found.", None, 31 )
+				# Execution mode of the script (None -> the one of the simulation)
+				execution_mode = None
+				if not (script.get('execution') is None):
+					execution_mode = self.validate_execution_mode( script.get('execution'), "script " + script_name )
+				parameters = [ [ parameter.get('name'), parameter.text ] for parameter in script.findall( 'parameter') ]
+				self.scripts[ section_name ].append( [ script_filename, execution_mode, parameters ] )
+
+	######################################################################################################################################
+	# Returns the compiled plan of the simulation: the parsed and validated workflow, tasks' parameters, and scripts
+	def compile_plan(self):
+		nodes = []
+		for task_name in list(self.workflow):
+			attributes = dict( self.workflow.node[ task_name ] )
+			attributes['executed'] = False
+			attributes['resolved'] = self.resolve_parameters( task_name )
+			nodes.append( [ task_name, attributes ] )
+		return( { 'nodes': nodes, 'edges': [ list(e) for e in self.workflow.edges ], 'next_task': list(self.next_task), 'iterative': self.iterative,
+			'stop_task': self.stop_task, 'execution_mode': self.execution_mode, 'scripts': self.scripts } )
+
+	######################################################################################################################################
+	# Loads a compiled plan. Only the existence of the scripts is verified again.
+	def apply_plan(self, plan):
+		for task_name, attributes in plan['nodes']:
+			self.workflow.add_node( task_name, **attributes )
+			verify_file( attributes['script'], 'The Python script for the task (' + task_name + ') was not found.', None, 10 )
+		for u, v in plan['edges']:
+			self.workflow.add_edge( u, v )
+		self.next_task = list(plan['next_task'])
+		self.iterative = plan['iterative']
+		self.stop_task = plan['stop_task']
+		self.execution_mode = plan['execution_mode']
+		self.scripts = plan['scripts']
+		for section_name in self.scripts:
+			for script_filename, execution_mode, parameters in self.scripts[ section_name ]:
+				verify_file( script_filename, "The script " + script_filename + " was not found.", None, 31 )
+
+	######################################################################################################################################
+	# Returns the parameters of the Task as a list of (name, type, value), with the paths already resolved (computed once per iteration)
+	def resolve_parameters(self, task_name ):
+		node = self.workflow.node[ task_name ]
+		if node.get('resolved') is None:
+			resolved = []
+			for p_name, p_type in node['param_types'].items():
+				for p_value in ( node['param_values'][ p_name ] or [] ):
+					if p_type in ['INT', 'FLOAT', 'STRING']:
+						resolved.append( [ p_name, p_type, p_value ] )
+					else:
+						resolved.append( [ p_name, p_type, BASE_DIR + "/" + p_value ] )
+			node['resolved'] = resolved
+		return( node['resolved'] )
+
+	######################################################################################################################################
+	# Verifies that the execution mode exists
+	def validate_execution_mode(self, execution_mode, source ):
+		if not (execution_mode in EXECUTION_MODES):
+			print( "\nERROR: Invalid execution mode (" + execution_mode + ") in " + source + ". Valid modes: " + ", ".join(EXECUTION_MODES) + ".\n" )
+			sys.exit( 41 )
+		return( execution_mode )
+
+	######################################################################################################################################
+	# Returns the execution mode (subprocess, in-process, or zygote) of the especified Task
+	def get_execution_mode(self, task_name ):
+		execution_mode = self.workflow.node[ task_name ].get('execution')
+		if execution_mode is None:
+			execution_mode = self.execution_mode
+		return( execution_mode )
+
+	######################################################################################################################################
+	# Returns the parameters to run the especified Task. The warnings are added to msg_list (if given) instead of written in the log.
+	def get_execution_parameters(self, task_name, msg_list = None ):
 		args_list = []
 		if task_name in list(self.workflow):
 			param_types = self.workflow.node[ task_name ]['param_types']
@@ -223,38 +390,34 @@ class Simulation:
 					print( "\nERROR: The parameter " + p_name + " has no assigned value for Task " + task_name + ".\n" )
 					sys.exit( 16 )
 
-				p_value_list = param_values[ p_name ]
-				for p_value in p_value_list:
-					args_list.append("--" + p_name)
-					# Directory
-					if p_type in ['D_JPG', 'D_TXT', 'D_JSON']:
-						dir_name = BASE_DIR + "/" + p_value
-						ext = p_type.split('_')[-1]
-						if not( verify_dir_ext( dir_name, ext ) ):
-							# print( "\nWARNING: Execution of " + task_name + ". Directory " + dir_name + " does not exist or does not contain " + ext + " files.\n" )
-							# sys.exit( 17 )
-							write_log(self.log_pathfilename, "WARNING: Execution of " + task_name + ". Directory " + dir_name + " does not exist or does not contain " + ext + " files.")
-						#
-						args_list.append(dir_name)
-					# File
-					elif p_type in ['TXT', 'JPG', 'TSV']:
-						filename = BASE_DIR + "/" + p_value
-						ext = p_type.split('_')[-1]
-						if not( verify_file_ext( filename, ext ) ):
-							print( "\nERROR: Execution of " + task_name + ". File " + filename + " does not exist or does not have " + ext + " extension.\n" )
-							sys.exit( 18 )
-						# 
-						args_list.append(filename)
-					elif p_type in ['INT', 'FLOAT']:
-						if not (p_value.replace('.','',1).isdigit()):
-							print( "\nERROR: Execution of " + task_name + ". " + p_name + "'s value is not numeric: " + str(p_value) + ".\n" )
-							sys.exit( 19 )
-						# 
-						args_list.append(p_value)
-					elif (p_type in OUTPUT_TYPES) or (p_type in ['D_AR']):
-						args_list.append(BASE_DIR + "/" + p_value)
-					else:
-						args_list.append(p_value)
+			# The paths of the values were resolved once (plan); only the existence of the inputs is verified here, all of them in one pass
+			resolved = self.resolve_parameters( task_name )
+			invalid = verify_paths( [ ( p_value, 'dir' if p_type.startswith('D_') else 'file', p_type.split('_')[-1] ) for p_name, p_type, p_value in resolved
+				if p_type in ['D_JPG', 'D_TXT', 'D_JSON', 'TXT', 'JPG', 'TSV'] ] )
+			for p_name, p_type, p_value in resolved:
+				args_list.append("--" + p_name)
+				# Directory
+				if p_type in ['D_JPG', 'D_TXT', 'D_JSON']:
+					ext = p_type.split('_')[-1]
+					if ( p_value, 'dir', ext ) in invalid:
+						# print( "\nWARNING: Execution of " + task_name + ". Directory " + p_value + " does not exist or does not contain " + ext + " files.\n" )
+						# sys.exit( 17 )
+						msg = "WARNING: Execution of " + task_name + ". Directory " + p_value + " does not exist or does not contain " + ext + " files."
+						if msg_list is None:
+							write_log(self.log_pathfilename, msg)
+						else:
+							msg_list.append( msg )
+				# File
+				elif p_type in ['TXT', 'JPG', 'TSV']:
+					ext = p_type.split('_')[-1]
+					if ( p_value, 'file', ext ) in invalid:
+						print( "\nERROR: Execution of " + task_name + ". File " + p_value + " does not exist or does not have " + ext + " extension.\n" )
+						sys.exit( 18 )
+				elif p_type in ['INT', 'FLOAT']:
+					if not (p_value.replace('.','',1).isdigit()):
+						print( "\nERROR: Execution of " + task_name + ". " + p_name + "'s value is not numeric: " + str(p_value) + ".\n" )
+						sys.exit( 19 )
+				args_list.append(p_value)
 		else:
 			print( "\nERROR: The Task " + task_name + " has not been defined in the Graph (get_execution_parameters).\n" )
 			sys.exit( 22 )
@@ -262,11 +425,40 @@ class Simulation:
 		return(args_list)
 
 	#############################################################################################################
-	# Verify Output of an Task
-	def verifyTaskOutput( self, task_name ):
+	# Returns the complete paths of the parameters' values of the especified types
+	def get_task_paths( self, task_name, types_list ):
+		paths = []
+		param_types = self.workflow.node[ task_name ]['param_types']
+		param_values = self.workflow.node[ task_name ]['param_values']
+		for p_name, p_type in param_types.items():
+			if p_type in types_list:
+				for p_value in param_values[ p_name ]:
+					paths.append( BASE_DIR + "/" + p_value )
+		return( paths )
+
+	#############################################################################################################
+	# Returns the input files and directories of the Task
+	def get_task_inputs( self, task_name ):
+		return( self.get_task_paths( task_name, ['JPG', 'TXT', 'TSV', 'D_JPG', 'D_TXT', 'D_AR', 'D_JSON'] ) )
+
+	#############################################################################################################
+	# Returns the output files and directories of the Task
+	def get_task_outputs( self, task_name ):
+		return( self.get_task_paths( task_name, OUTPUT_TYPES ) )
+
+	#############################################################################################################
+	# Path of the manifest of the outputs of the Task, in the results directory of the simulation (or of the iteration)
+	def manifest_pathfilename( self, task_name, iteration_subdir = None ):
+		results_dir = self.project_results if iteration_subdir is None else self.project_dir + "/" + iteration_subdir
+		return( results_dir + "/manifests/" + task_name + ".json" )
+
+	#############################################################################################################
+	# Verify Output of an Task. With the manifest of its outputs, the file system is not read again.
+	def verifyTaskOutput( self, task_name, manifest = None ):
 		if task_name in list(self.workflow):
 			param_types = self.workflow.node[ task_name ]['param_types']
 			param_values = self.workflow.node[ task_name ]['param_values']
+			outputs = []		# (parameter's type, value, list of the paths to verify)
 			for p_name, p_type in param_types.items():
 				if p_type in OUTPUT_TYPES:
 					# Validate existence of the parameter and its value
@@ -277,31 +469,38 @@ class Simulation:
 						print( "\nERROR: The parameter " + p_name + " has no assigned value for Task " + task_name + ".\n" )
 						sys.exit( 21)
 
-					p_value_list = param_values[ p_name ]
-					for p_value in p_value_list:
+					for p_value in param_values[ p_name ]:
 						complete_value = BASE_DIR + "/" + p_value
-						# Directory
+						ext = p_type.split('_')[-1]
 						if p_type in ['O_D_JPG', 'O_D_TXT', 'O_D_TSV']:
-							ext = p_type.split('_')[-1]
-							if not( verify_dir_ext( complete_value, ext ) ):
-								print( "\nERROR: Verification of " + task_name + ". Output directory " + p_value + " does not exist or does not contain " + ext + " files.\n" )
-								sys.exit( 22 )
-						# File
+							outputs.append( ( p_type, p_value, [ ( complete_value, 'dir', ext ) ] ) )
 						elif p_type in ['O_TXT', 'O_JPG']:
-							ext = p_type.split('_')[-1]
-							if not( verify_file_ext( complete_value, ext ) ):
-								print( "\nERROR: Verification of " + task_name + ". Output file " + p_value + " does not exist or does not have " + ext + " extension.\n" )
-								sys.exit( 23 )
-						# Directory of Accepted and Rejected values
+							outputs.append( ( p_type, p_value, [ ( complete_value, 'file', ext ) ] ) )
 						elif p_type in ['O_D_AR']:
-							accepted_dir = complete_value + "/accepted"
-							verify_dir( accepted_dir, "The output accepted directory was not found (" + accepted_dir + ")", None, 24 )
-							rejected_dir = complete_value + "/rejected"
-							verify_dir( accepted_dir, "The output accepted directory was not found (" + accepted_dir + ")", None, 25 )
-							accepted_file = accepted_dir + "/accepted.tsv"
-							verify_file( accepted_file, "The output accepted file was not found (" + accepted_file + ")", None, 26 )
-							rejected_file = rejected_dir + "/rejected.txt"
-							verify_file( rejected_file, "The output rejected file was not found (" + rejected_file + ")", None, 27 )
+							outputs.append( ( p_type, p_value, [ ( complete_value + "/accepted", 'dir', None ), ( complete_value + "/rejected", 'dir', None ),
+								( complete_value + "/accepted/accepted.tsv", 'file', None ), ( complete_value + "/rejected/rejected.txt", 'file', None ) ] ) )
+
+			# All the outputs are verified in one pass
+			all_items = [ item for p_type, p_value, items in outputs for item in items ]
+			invalid = verify_manifest_paths( manifest, all_items ) if manifest else verify_paths( all_items )
+			for p_type, p_value, items in outputs:
+				# Directory
+				if p_type in ['O_D_JPG', 'O_D_TXT', 'O_D_TSV']:
+					if items[0] in invalid:
+						print( "\nERROR: Verification of " + task_name + ". Output directory " + p_value + " does not exist or does not contain " + items[0][2] + " files.\n" )
+						sys.exit( 22 )
+				# File
+				elif p_type in ['O_TXT', 'O_JPG']:
+					if items[0] in invalid:
+						print( "\nERROR: Verification of " + task_name + ". Output file " + p_value + " does not exist or does not have " + items[0][2] + " extension.\n" )
+						sys.exit( 23 )
+				# Directory of Accepted and Rejected values
+				elif p_type in ['O_D_AR']:
+					for k, (msg, error_code) in enumerate( [ ("The output accepted directory was not found", 24), ("The output rejected directory was not found", 25),
+						("The output accepted file was not found", 26), ("The output rejected file was not found", 27) ] ):
+						if items[ k ] in invalid:
+							print( "\nERROR: " + msg + " (" + items[ k ][0] + ")\n" )
+							sys.exit( error_code )
 		else:
 			print( "\nERROR: The Task " + task_name + " has not been defined in the Graph (verifyTaskOutput).\n" )
 			sys.exit( 28 )
@@ -322,137 +521,315 @@ class Simulation:
 				# If all the predecessors were already executed, the task can now be executed
 				if prereq_done:
 					self.next_task.append( successor_task )
-			# The executed task is deleted from next_task
-			del self.next_task[0]
+					self.mark_ready( [ successor_task ] )
+			# The executed task is deleted from next_task (if it was not removed when it was launched)
+			if executed_task in self.next_task:
+				self.next_task.remove( executed_task )
 		else:
 			print( "\nERROR: The Task " + executed_task + " has not been defined in the Graph (updateGraphAfterExecution).\n" )
 			sys.exit( 29 )
 		# When an iterative workflow is being run, the states are updated in every iteration
 
 	######################################################################################################################################
-	# Execution of the Simulation process
-	def run( self ):
-		# Init log
-		write_log(self.log_pathfilename, "Simulation starts.", init = True)
+	# Marks the tasks as executed (e.g. their outputs were merged from the shards of the simulation) and updates next_task
+	def skip_tasks( self, task_list ):
+		for task_name in task_list:
+			self.workflow.node[ task_name ]['executed'] = True
+		self.next_task = [ t for t in self.workflow if (not self.workflow.node[ t ]['executed']) and
+			all( self.workflow.node[ p ]['executed'] for p in self.workflow.predecessors( t ) ) ]
 
-		# Write in the log the parameters of the simulation
-		self.save_basic_info()
+	######################################################################################################################################
+	# Saves the time when the tasks became ready to be executed (all their predecessors finished)
+	def mark_ready( self, task_list ):
+		for task_name in task_list:
+			self.task_times[ task_name ] = [ time.time(), None, None ]	# ready, start, end
+
+	######################################################################################################################################
+	# Starts a new iteration (HITL): creates the iteration directory and updates the paths of the parameters. Returns the new iteration number and subdirectory.
+	def start_iteration( self, iteration_number, iteration_subdir ):
+		# Starts a new iteration
+		iteration_number += 1
+		iteration_dir = self.project_results + "/iteration_" + str(iteration_number)
+		# The new simulation directory is created
+		if self.memory:
+			self.memory.place_dir( iteration_dir )
+		verify_create_dir( iteration_dir, 'The directory for the new iteration (' + iteration_dir + ') could not be created (run).', None, 30 )
+
+		# Set the state of the tasks as Not executed
+		for task_name in self.workflow:
+			self.workflow.node[ task_name ][ 'executed' ] = False
+
+		new_iteration_subdir = ""
+		if iteration_number == 1:
+			new_iteration_subdir = iteration_subdir + "/iteration_1"
+		else:
+			new_iteration_subdir = '_'.join(iteration_subdir.split('_')[:-1]) + "_" + str(iteration_number)
+
+		# The directory values of the parameters are updated accordingly
+		for task_name in self.workflow:
+			for para_name in self.workflow.node[ task_name ]['param_values']:
+				new_values_list = []
+				# Every value is a list (hence, we treat each possible value)
+				value_list = self.workflow.node[ task_name ]['param_values'][ para_name ]
+				for para_value in value_list:
+					new_values_list += [ str(para_value).replace( iteration_subdir, new_iteration_subdir ) ]
+				#
+				self.workflow.node[ task_name ]['param_values'][ para_name ] = new_values_list
+			# The paths must be resolved again
+			self.workflow.node[ task_name ]['resolved'] = None
+
+		# A new iteration will start
+		msg = "STARTS ITERATION " + str(iteration_number) + ":"
+		write_log(self.log_pathfilename, msg)
+
+		return( iteration_number, new_iteration_subdir )
+
+	######################################################################################################################################
+	# Writes in the log the makespan, the critical path, and the duration and queue wait of the executed tasks
+	def write_schedule_report( self ):
+		durations = {}
+		report = ""
+		for task_name in list(self.workflow):
+			if task_name in self.task_times and not (self.task_times[ task_name ][2] is None):
+				ready_t, start_t, end_t = self.task_times[ task_name ]
+				durations[ task_name ] = end_t - start_t
+				report += "\t\t" + task_name + ": duration %.3f s, queue wait %.3f s\n" % (end_t - start_t, start_t - ready_t)
+		if len(durations) == 0:
+			return
+
+		makespan = max( self.task_times[t][2] for t in durations ) - min( self.task_times[t][0] for t in durations )
+		path, path_duration = critical_path( self.workflow, durations )
+		msg = "Schedule (" + str(self.pool.jobs) + " jobs): makespan %.3f s, critical path " % makespan
+		msg += " -> ".join(path) + " (%.3f s).\n" % path_duration + report
+		write_log(self.log_pathfilename, msg)
+
+	######################################################################################################################################
+	# Saves the state of the scheduler. The running tasks are saved as next tasks (they will be executed again when resuming), and the
+	# iterations whose scripts have not finished successfully in background, as iterations whose scripts must be executed again.
+	def save_checkpoint( self, iteration_number, iteration_subdir, running_tasks ):
+		state = { 'iteration_number': iteration_number, 'iteration_subdir': iteration_subdir,
+			'next_task': list(running_tasks) + [ t for t in self.next_task if not (t in running_tasks) ],
+			'scripts': [ n for f, n in self.background_scripts.items() if not (f.done() and f.result() == 0) ],
+			'executed': { t: self.workflow.node[ t ]['executed'] for t in self.workflow },
+			'param_values': { t: { p: list(v) for p, v in self.workflow.node[ t ]['param_values'].items() } for t in self.workflow } }
+		self.checkpoint.save( state )
+
+	######################################################################################################################################
+	# Restores the state of the scheduler saved in the checkpoint. Returns the iteration number and subdirectory.
+	def restore_checkpoint( self, state ):
+		for task_name in self.workflow:
+			self.workflow.node[ task_name ]['executed'] = state['executed'].get( task_name, False )
+			self.workflow.node[ task_name ]['param_values'] = { p: list(v) for p, v in state['param_values'][ task_name ].items() }
+			self.workflow.node[ task_name ]['resolved'] = None
+		self.next_task = list( state['next_task'] )
+
+		if self.iterative:
+			# The checkpoint was saved at the end of an iteration: the next one starts with the stop task
+			if len(self.next_task) == 0:
+				self.next_task.append( self.stop_task )
+		else:
+			# The tasks whose outputs were deleted after the checkpoint are executed again, together with the tasks that depend on them
+			missing = [ t for t in self.workflow if self.workflow.node[ t ]['executed'] and not all( os.path.exists( p ) for p in self.get_task_outputs( t ) ) ]
+			while len(missing) > 0:
+				task_name = missing.pop()
+				if self.workflow.node[ task_name ]['executed']:
+					self.workflow.node[ task_name ]['executed'] = False
+					missing += list( self.workflow.successors( task_name ) )
+			self.next_task = [ t for t in self.workflow if (not self.workflow.node[ t ]['executed']) and
+				all( self.workflow.node[ p ]['executed'] for p in self.workflow.predecessors( t ) ) ]
+
+		msg = "Simulation resumes from the checkpoint (" + str(sum( 1 for t in self.workflow if self.workflow.node[ t ]['executed'] )) + " tasks executed"
+		if self.iterative:
+			msg += ", iteration " + str(state['iteration_number'])
+		msg += "). Next tasks: " + ", ".join( self.next_task ) + "."
+		write_log(self.log_pathfilename, msg)
+		return( state['iteration_number'], state['iteration_subdir'] )
+
+	######################################################################################################################################
+	# Execution of the Simulation process. In the memory results mode, the final results are saved on the disk when it finishes (also
+	# after an error), and so are the digests of the files computed for the cache.
+	def run( self, resume = False ):
+		self.place_results_in_memory()
+		try:
+			return( self.run_workflow( resume ) )
+		finally:
+			if self.memory:
+				self.memory.persist()
+			if self.cache:
+				self.cache.save_fingerprints()
+
+	######################################################################################################################################
+	# Memory results mode: the directories where the tasks write their outputs are moved to memory (before the tasks are executed)
+	def place_results_in_memory( self ):
+		if self.memory:
+			dir_types = [ t for t in OUTPUT_TYPES if t.startswith('O_D_') ]
+			self.memory.place( [ p for task_name in self.workflow for p in self.get_task_paths( task_name, [ t for t in OUTPUT_TYPES if not (t in dir_types) ] ) ],
+				[ p for task_name in self.workflow for p in self.get_task_paths( task_name, dir_types ) ] )
+
+	######################################################################################################################################
+	# Executes the tasks of the workflow, and the metrics and post-processing scripts. Every task whose predecessors have finished is
+	# executed as soon as there is a free worker.
+	def run_workflow( self, resume = False ):
+		# With resume, the execution continues from the checkpoint of a previous execution (if there is one)
+		state = self.checkpoint.load() if resume else None
+		if state is None:
+			self.checkpoint.clear()
+
+		# Init log, and write in it the parameters of the simulation
+		if state is None:
+			write_log(self.log_pathfilename, "Simulation starts.", init = True)
+			self.save_basic_info()
+		self.trace = TaskTrace( self.trace_pathfilename, append = not (state is None) )
+		# HITL: the in-process tasks keep their state in memory between iterations, and their files are written in background
+		iteration_state.start( asynchronous = self.iterative )
 
 		#*********************************************************************
 		# Simulation path in case of an iterative execution
 		iteration_number = 0
 		iteration_subdir = "/".join(self.project_results.split('/')[-2:]) # e.g. results/recorded_by_hitl
 		#*********************************************************************
+		if not (state is None):
+			iteration_number, iteration_subdir = self.restore_checkpoint( state )
+			# The scripts of the iterations that had not finished in background are executed again
+			for script_iteration in state.get( 'scripts', [] ):
+				self.start_scripts( script_iteration )
+
+		# The messages of the tasks are written in the order of a sequential execution
+		ordered_log = OrderedLog( self.log_pathfilename )
+		running = {}		# Future -> Task
+		self.task_times = {}
+		self.mark_ready( self.next_task )
 
 		# Start To_Run Tasks
-		while len(self.next_task) > 0:
-			current_task = self.next_task[0]
+		while (len(self.next_task) > 0) or (len(running) > 0):
+			# HITL: the simulation stops as soon as the scripts of a previous iteration fail
+			if self.check_scripts() != 0:
+				ordered_log.flush( force = True )
+				self.pool.shutdown()
+				self.wait_scripts()
 
-			#*********************************************************************
-			# If iterative, update paths and study simulation process
-			if self.iterative and current_task == self.stop_task:
-				# Starts a new iteration
-				iteration_number += 1
-				iteration_dir = self.project_results + "/iteration_" + str(iteration_number)
-				# The new simulation directory is created
-				verify_create_dir( iteration_dir, 'The directory for the new iteration (' + iteration_dir + ') could not be created (run).', None, 30 )
-
-				# Set the state of the tasks as Not executed
-				for task_name in self.workflow:
-					self.workflow.node[ task_name ][ 'executed' ] = False
-
-				new_iteration_subdir = ""
-				if iteration_number == 1:
-					new_iteration_subdir = iteration_subdir + "/iteration_1"
-				else:
-					new_iteration_subdir = '_'.join(iteration_subdir.split('_')[:-1]) + "_" + str(iteration_number)
-
-				# The directory values of the parameters are updated accordingly
-				for task_name in self.workflow:
-					for para_name in self.workflow.node[ task_name ]['param_values']:
-						new_values_list = []
-						# Every value is a list (hence, we treat each possible value)
-						value_list = self.workflow.node[ task_name ]['param_values'][ para_name ]
-						for para_value in value_list:
-							new_values_list += [ str(para_value).replace( iteration_subdir, new_iteration_subdir ) ]
-						#
-						self.workflow.node[ task_name ]['param_values'][ para_name ] = new_values_list
-
-				iteration_subdir = new_iteration_subdir
-
-				# A new iteration will start
-				msg = "STARTS ITERATION " + str(iteration_number) + ":"
-				write_log(self.log_pathfilename, msg)
+			# Launch the ready tasks while there are free workers
+			while (len(self.next_task) > 0) and (len(running) < self.pool.jobs):
+				current_task = self.next_task[0]
 
-			#*********************************************************************
-
-			# Verify the required parameters and data sources of current_task
-			execution_parameters = self.get_execution_parameters( current_task )
-
-			# Run the Task
-			script_filename = self.workflow.node[ current_task ]['script']
-			cmd = [script_filename] + execution_parameters
-			output = subprocess.run(args=cmd)
-
-			if output.returncode == 0: # Success
-				msg = "Task " + current_task + " was successfully executed."
-				write_log(self.log_pathfilename, msg)
-			else: # Error or Stop iterative execution
 				#*********************************************************************
-				# Stop the iterative execution
-				if self.iterative and (self.stop_task == current_task):
-					# Finish log
-					write_log(self.log_pathfilename, "Simulation finishes.")
-					return(0)
+				# If iterative, update paths and study simulation process
+				if self.iterative and current_task == self.stop_task:
+					iteration_number, iteration_subdir = self.start_iteration( iteration_number, iteration_subdir )
 				#*********************************************************************
-				# Error
-				else:
-					msg = "ERROR: Task " + current_task + " generated an error:\n"
-					msg += "\t" + str(output.stderr) + "\n"
-					write_log(self.log_pathfilename, msg)
-					sys.exit(output.returncode)
 
-			# Verify the output data sources generated by the current task
-			if (not self.iterative) and self.verifyTaskOutput( current_task ):
-				write_log(self.log_pathfilename, "The output of the " + current_task  + " Task has been successfully verified.")
-
-			# Update self.next_task
-			self.updateGraphAfterExecution( current_task )
+				if ordered_log.empty():
+					ordered_log.set_order( sequential_order( self.workflow, self.next_task ) )
+				del self.next_task[0]
+
+				# Verify the required parameters and data sources of current_task
+				msg_list = []
+				execution_parameters = self.get_execution_parameters( current_task, msg_list )
+
+				# Run the Task, unless its results (same script, arguments, and inputs) are in the cache
+				script_filename = self.workflow.node[ current_task ]['script']
+				self.task_times[ current_task ][1] = time.time()
+				cache_key = None
+				manifest_pathfilename = self.manifest_pathfilename( current_task, iteration_subdir )
+				if self.cache and self.workflow.node[ current_task ]['cacheable']:
+					start_ns = time.time_ns()
+					cache_key = self.cache.task_key( script_filename, execution_parameters, self.get_task_inputs( current_task ) )
+					if self.cache.restore( cache_key, self.get_task_outputs( current_task ) ):
+						msg_list.append( "Task " + current_task + " was restored from the cache." )
+						running[ completed_future( (0, usage_record( start_ns, time.time_ns() )) ) ] = ( current_task, msg_list, None, True, manifest_pathfilename )
+						continue
+				future = self.pool.submit( script_filename, execution_parameters, self.get_execution_mode( current_task ), self.get_task_inputs( current_task ),
+					self.get_task_outputs( current_task ), manifest_pathfilename )
+				running[ future ] = ( current_task, msg_list, cache_key, False, manifest_pathfilename )
+
+			# Wait until (at least) one of the running tasks finishes
+			for future in self.pool.wait_any( list(running) ):
+				current_task, msg_list, cache_key, restored, manifest_pathfilename = running.pop( future )
+				returncode, usage = future.result()
+				self.task_times[ current_task ][2] = time.time()
+				self.trace.add( current_task, 'task', 'cache' if restored else self.get_execution_mode( current_task ), iteration_number, returncode, usage,
+					self.get_task_inputs( current_task ), self.get_task_outputs( current_task ) )
+
+				if returncode == 0: # Success
+					if not restored:
+						msg_list.append( "Task " + current_task + " was successfully executed" + ( " by the worker " + usage['worker'] if 'worker' in usage else "" ) + "." )
+						manifest = read_manifest( manifest_pathfilename )
+					else:
+						manifest = record_manifest( manifest_pathfilename, self.get_task_outputs( current_task ) )
+					if self.cache and manifest:
+						self.cache.add_manifest( manifest )
+				else: # Error or Stop iterative execution
+					#*********************************************************************
+					# Stop the iterative execution
+					if self.iterative and (self.stop_task == current_task):
+						ordered_log.add( current_task, msg_list )
+						ordered_log.flush( force = True )
+						self.pool.shutdown()
+						self.wait_scripts()
+						self.trace.export_chrome( self.chrome_trace_pathfilename )
+						self.checkpoint.clear()
+						# Finish log
+						write_log(self.log_pathfilename, "Simulation finishes.")
+						return(0)
+					#*********************************************************************
+					# Error
+					else:
+						msg_list.append( "ERROR: Task " + current_task + " generated an error (exit code " + str(returncode) + ").\n" )
+						ordered_log.add( current_task, msg_list )
+						ordered_log.flush( force = True )
+						self.pool.shutdown()
+						self.wait_scripts()
+						self.trace.export_chrome( self.chrome_trace_pathfilename )
+						sys.exit(returncode)
+
+				# Verify the output data sources generated by the current task
+				if (not self.iterative) and self.verifyTaskOutput( current_task, manifest ):
+					msg_list.append( "The output of the " + current_task  + " Task has been successfully verified." )
+					# The verified outputs are saved in the cache
+					if not (cache_key is None):
+						self.cache.store( cache_key, current_task, self.get_task_outputs( current_task ) )
+				ordered_log.add( current_task, msg_list )
+
+				# Update self.next_task
+				self.updateGraphAfterExecution( current_task )
+				self.save_checkpoint( iteration_number, iteration_subdir, [ r[0] for r in running.values() ] )
 
 			#*********************************************************************
 			# Verify if a new iteration must be started (If iterative)
-			if self.iterative and (len(self.next_task) == 0):
-				# Run the metrics scripts
-				self.run_scripts('metrics', iteration_number)
-				# Run the post-processing scripts
-				self.run_scripts('post-processing', iteration_number)
+			if self.iterative and (len(self.next_task) == 0) and (len(running) == 0):
+				ordered_log.flush( force = True )
+				self.write_schedule_report()
+				# The metrics and post-processing scripts run in background, while the next iteration starts
+				self.start_scripts( iteration_number )
 				# Ends the iteration
 				msg = "ENDS ITERATION " + str(iteration_number) + ".\n"
 				write_log(self.log_pathfilename, msg)
 				# We set the next task for the new iteration (The task that select the subset)
 				self.next_task.append( self.stop_task )
-			#*********************************************************************				
+				self.mark_ready( [ self.stop_task ] )
+				# The iteration is saved as finished, with its scripts pending (executed again when resuming until they finish)
+				self.save_checkpoint( iteration_number, iteration_subdir, [] )
+			#*********************************************************************
+
+		ordered_log.flush( force = True )
+		self.pool.shutdown()
 
 		################################################################
-		# Run the metrics scripts
+		# Run the metrics and post-processing scripts
 		if not self.iterative:
-			self.run_scripts('metrics')
-			# Run the post-processing scripts
-			self.run_scripts('post-processing')
+			self.write_schedule_report()
+			self.run_scripts( ['metrics', 'post-processing'] )
+		self.wait_scripts()
+		self.trace.export_chrome( self.chrome_trace_pathfilename )
+		self.checkpoint.clear()
 
 		# Finish log
 		write_log(self.log_pathfilename, "Simulation finishes.")
 
 	######################################################################################################################################
-	# Execute the metrics and post-processing scripts
-	def run_scripts(self, section_name, iteration_number = 0):
-		if not (section_name in ["metrics", "post-processing"]):
-			print( "\nERROR: Unknown section name (" + section_name + ").\n" )
-			sys.exit(30)
-
-		# Directory where the scripts to be executed must be located
-		scripts_dir = BASE_DIR + "/humain/" + section_name + "/"
-
+	# Commands of the scripts of the sections, in the order of the simulation file: list of (section, script's file, parameters, execution mode).
+	# In an iterative execution, the paths are the ones of the iteration.
+	def script_commands(self, section_names, iteration_number = 0):
 		# If it is an iterative execution
 		original_subdir = ""
 		iteration_subdir = ""
@@ -460,42 +837,129 @@ class Simulation:
 			original_subdir = "/".join(self.project_results.split('/')[-2:]) # e.g. results/recorded_by_hitl
 			iteration_subdir = original_subdir + "/iteration_" + str(iteration_number)
 
-		# Create element tree object and get the root
-		root = ET.parse( self.params_pathfilename ).getroot()
-		# Process every task
-		for script in root.findall( section_name + '/script'):
-			script_name = script.get('name')
-			# Verify the existence of the script
-			script_filename = scripts_dir + script_name
-			verify_file( script_filename, "The script " + script_filename + " was not found.", None, 31 )
-
-			parameters_list = []
-			# Create the list of parameters for the script
-			for parameter in script.findall( 'parameter'):
-				para_text = parameter.text
-				if iteration_number > 0:
-					para_text = para_text.replace(original_subdir,iteration_subdir)
-				parameters_list.append( "--" + parameter.get('name') )
-				parameters_list.append( BASE_DIR + "/" + para_text )
-
-			# Execution of the script
-			cmd = [script_filename] + parameters_list
-			output = subprocess.run(args=cmd)
-
-			if output.returncode == 0: # Success
-				msg = "The script " + script_filename + " was sucessfully executed."
-				write_log(self.log_pathfilename, msg)
-			else: # Error
-				msg = "The script " + script_filename + " generated an execution error:\n"
-				msg += "\t" + str(output.stderr) + "\n"
-				write_log(self.log_pathfilename, msg)
-				sys.exit(32)
+		commands = []
+		for section_name in section_names:
+			if not (section_name in ["metrics", "post-processing"]):
+				print( "\nERROR: Unknown section name (" + section_name + ").\n" )
+				sys.exit(30)
+			# Process every script (loaded with the plan)
+			for script_filename, script_execution, parameters in self.scripts.get( section_name, [] ):
+				parameters_list = []
+				# Create the list of parameters for the script
+				for para_name, para_text in parameters:
+					if iteration_number > 0:
+						para_text = para_text.replace(original_subdir,iteration_subdir)
+					parameters_list.append( "--" + para_name )
+					parameters_list.append( BASE_DIR + "/" + para_text )
+				execution_mode = self.execution_mode if script_execution is None else script_execution
+				commands.append( ( section_name, script_filename, parameters_list, execution_mode ) )
+		return( commands )
+
+	######################################################################################################################################
+	# Dependencies between the commands of the scripts, from their input and output (output_* parameters) paths
+	def script_dependencies(self, commands):
+		inputs_list, outputs_list = [], []
+		for section_name, script_filename, parameters_list, execution_mode in commands:
+			names, values = parameters_list[0::2], parameters_list[1::2]
+			outputs_list.append( [ v for n, v in zip(names, values) if n.startswith( "--output" ) ] )
+			inputs_list.append( [ v for n, v in zip(names, values) if not n.startswith( "--output" ) ] )
+		return( path_dependencies( inputs_list, outputs_list ) )
+
+	######################################################################################################################################
+	# Executes the scripts of the sections. A script waits only for the previous scripts whose outputs (output_* parameters) it reads or
+	# writes; the independent scripts run concurrently. After an error, no more scripts are started. Returns 0 or the exit code of the error.
+	def run_script_graph(self, section_names, iteration_number = 0):
+		commands = self.script_commands( section_names, iteration_number )
+		dependencies = self.script_dependencies( commands )
+		# The outputs of the scripts are the results persisted in the memory results mode
+		if self.memory:
+			for section_name, script_filename, parameters_list, execution_mode in commands:
+				self.memory.keep( [ v for n, v in zip( parameters_list[0::2], parameters_list[1::2] ) if n.startswith( "--output" ) ] )
+
+		# The messages are written in the order of the simulation file
+		ordered_log = OrderedLog( self.log_pathfilename )
+		ordered_log.set_order( range(len(commands)) )
+		pending = list( range(len(commands)) )
+		done = set()
+		running = {}		# Future -> index of the command
+		error = 0
+		while len(running) > 0 or (error == 0 and any( all( (d in done) for d in dependencies[ k ] ) for k in pending )):
+			# Launch the scripts whose dependencies finished, while there are free workers
+			for k in list(pending):
+				if error != 0 or len(running) >= self.script_pool.jobs:
+					break
+				if all( (d in done) for d in dependencies[ k ] ):
+					pending.remove( k )
+					section_name, script_filename, parameters_list, execution_mode = commands[ k ]
+					running[ self.script_pool.submit( script_filename, parameters_list, execution_mode ) ] = k
+
+			# Wait until (at least) one of the running scripts finishes
+			for future in self.script_pool.wait_any( list(running) ):
+				k = running.pop( future )
+				section_name, script_filename, parameters_list, execution_mode = commands[ k ]
+				returncode, usage = future.result()
+				if self.trace:
+					self.trace.add( ntpath.basename( script_filename ), section_name, execution_mode, iteration_number, returncode, usage )
+				if returncode == 0: # Success
+					ordered_log.add( k, [ "The script " + script_filename + " was sucessfully executed." ] )
+					done.add( k )
+				else: # Error
+					ordered_log.add( k, [ "The script " + script_filename + " generated an execution error (exit code " + str(returncode) + ").\n" ] )
+					error = error or returncode
+		ordered_log.flush( force = True )
+		return( error )
+
+	######################################################################################################################################
+	# Execute the metrics and post-processing scripts of one or more sections
+	def run_scripts(self, section_names, iteration_number = 0):
+		if isinstance( section_names, str ):
+			section_names = [ section_names ]
+		if self.run_script_graph( section_names, iteration_number ) != 0:
+			sys.exit(32)
+
+	######################################################################################################################################
+	# Starts the metrics and post-processing scripts of an iteration in background (one iteration after the other)
+	def start_scripts(self, iteration_number):
+		if self.background is None:
+			self.background = ThreadPoolExecutor( max_workers = 1 )
+		self.background_scripts[ self.background.submit( self.run_script_graph, ['metrics', 'post-processing'], iteration_number ) ] = iteration_number
+
+	######################################################################################################################################
+	# Forgets the scripts that finished successfully in background. Returns 0, or the exit code of the first failed script (kept to be
+	# reported by wait_scripts).
+	def check_scripts(self):
+		for future in [ f for f in self.background_scripts if f.done() ]:
+			if future.result() != 0:
+				return( future.result() )
+			del self.background_scripts[ future ]
+		return( 0 )
+
+	######################################################################################################################################
+	# Waits for the scripts running in background, and for the files of the iteration state, and releases the workers of the scripts.
+	# Exits if any of the scripts failed.
+	def wait_scripts(self):
+		errors = [ future.result() for future in self.background_scripts ]
+		self.background_scripts = {}
+		if not (self.background is None):
+			self.background.shutdown( wait = True )
+			self.background = None
+		self.script_pool.shutdown()
+		iteration_state.flush()
+		if any( e != 0 for e in errors ):
+			sys.exit(32)
 
 	######################################################################################################################################
 	# Save in the log file the project, workflow, and simulation parameters file used in the simulation
 	def save_basic_info(self):
 		basic_info = "Simulation Parameters:\n\t\tProject Directory: " + self.project_dir + "\n\t\tWorkflow Definition File: " + self.workflow_pathfilename
 		basic_info += "\n\t\tSimulation Parameters File: " + self.params_pathfilename
+		basic_info += "\n\t\tExecution Mode: " + self.execution_mode
+		basic_info += "\n\t\tJobs: " + str(self.pool.jobs)
+		if hasattr( self.pool, 'queue_dir' ):
+			basic_info += "\n\t\tWork Queue: " + self.pool.queue_dir
+		basic_info += "\n\t\tCache: " + ( self.cache.cache_dir if self.cache else "disabled" )
+		if self.memory:
+			basic_info += "\n\t\tMemory Results: persisted the outputs of the scripts" + "".join( ", " + p for p in self.memory.persist_patterns )
 		basic_info += "\n\t\tParameters per Task:\n"
 
 		# Collect the information, one by one, of the tasks and their parameters:		
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Specimen registry of a collection of datasets. The canonical name of a
+# 				specimen (its filename without directory and extension, so EMEC1.jpg and
+# 				EMEC1.txt are the same specimen) is interned to a dense integer ID, and the
+# 				tables of the tasks are joined, filtered, and added up as NumPy arrays of
+# 				IDs and masks (one boolean per ID) instead of comparing filename strings.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, threading
+import numpy as np
+
+from humain.constants import *
+
+##############################################################################################################################
+# Canonical name of a specimen: the filename without its directory and extension(s)
+def specimen_key( filename ):
+	return( str(filename).split("/")[-1].split(".")[0] )
+
+
+class SpecimenRegistry:
+	'Dense integer IDs (0, 1, ...) of the canonical names of the specimens, in the order they were interned'
+	######################################################################################################################################
+	# Constructor. The names (e.g. the list of specimens of the collection) get the first IDs.
+	def __init__(self, names = ()):
+		self.ids = {}			# Canonical name -> ID
+		self.names = []			# ID -> canonical name
+		self.lock = threading.Lock()
+		self.intern( names )
+
+	def __len__(self):
+		return( len(self.names) )
+
+	######################################################################################################################################
+	# IDs of the specimens of a list of filenames (array of int64). The new specimens get the next IDs.
+	def intern(self, filenames):
+		with self.lock:
+			ids = self.ids
+			result = np.empty( len(filenames), dtype = np.int64 )
+			for i, filename in enumerate( filenames ):
+				key = specimen_key( filename )
+				specimen_id = ids.get( key )
+				if specimen_id is None:
+					specimen_id = len(self.names)
+					ids[ key ] = specimen_id
+					self.names.append( key )
+				result[i] = specimen_id
+		return( result )
+
+	######################################################################################################################################
+	# Mask (array of booleans, one per ID) of a set of IDs
+	def mask(self, ids):
+		mask = np.zeros( len(self.names), dtype = bool )
+		mask[ ids ] = True
+		return( mask )
+
+	######################################################################################################################################
+	# For every filename of a list, True if its specimen is one of the specimens of another list (vectorized "filename in specimens")
+	def isin(self, filenames, specimens):
+		ids = self.intern( filenames )
+		return( self.mask( self.intern( specimens ) )[ ids ] )
+
+
+# Registries of the process: collection directory -> registry (None: the registry of the files outside the datasets)
+registries = {}
+registries_lock = threading.Lock()
+
+##############################################################################################################################
+# Registry of the collection of a path of DATASETS_DIR, whose first IDs are the specimens of its SPECIMEN_LIST_FILENAME. The paths
+# outside the datasets (or None) share the registry of the process. The same registry must be used for all the tables of a join.
+def specimen_registry( path = None ):
+	collection_dir = None
+	if path is not None:
+		path = os.path.abspath( path )
+		if path.startswith( DATASETS_DIR + "/" ):
+			collection_dir = DATASETS_DIR + "/" + path[ len(DATASETS_DIR) + 1: ].split("/")[0]
+	with registries_lock:
+		if not (collection_dir in registries):
+			names = []
+			if collection_dir is not None and os.path.isfile( collection_dir + "/" + SPECIMEN_LIST_FILENAME ):
+				with open( collection_dir + "/" + SPECIMEN_LIST_FILENAME, "r" ) as f:
+					names = [ line.strip() for line in f if line.strip() != "" ]
+			registries[ collection_dir ] = SpecimenRegistry( names )
+		return( registries[ collection_dir ] )
+
+##############################################################################################################################
+# Distinct IDs of an array, in the order of their first appearance
+def first_order( ids ):
+	unique_ids, first = np.unique( ids, return_index = True )
+	return( ids[ np.sort( first ) ] )
+
+##############################################################################################################################
+# Array of n elements (one per ID, fill for the IDs without value) with the values of the IDs. When an ID is repeated, its last value
+# is kept (as in a dictionary).
+def aligned( ids, values, n, fill = np.nan, dtype = None ):
+	values = np.asarray( values, dtype = dtype )
+	result = np.full( n, fill, dtype = values.dtype if dtype is None else dtype )
+	unique_ids, last = np.unique( ids[::-1], return_index = True )
+	result[ unique_ids ] = values[ len(ids) - 1 - last ]
+	return( result )
+
+##############################################################################################################################
+# Inner join of two arrays of IDs: (left rows, right rows) of the matching pairs, in the order of the left rows, and of the right rows
+# for the same left row (as pandas.merge( how = 'inner' ))
+def join_rows( left_ids, right_ids ):
+	n = int( max( left_ids.max( initial = -1 ), right_ids.max( initial = -1 ) ) ) + 1
+	right_order = np.argsort( right_ids, kind = 'stable' )
+	counts = np.bincount( right_ids, minlength = n )
+	starts = np.cumsum( counts ) - counts
+	matches = counts[ left_ids ]
+	left_rows = np.repeat( np.arange( len(left_ids) ), matches )
+	offsets = np.arange( matches.sum() ) - np.repeat( np.cumsum( matches ) - matches, matches )
+	right_rows = right_order[ np.repeat( starts[ left_ids ], matches ) + offsets ]
+	return( left_rows, right_rows )
+
+##############################################################################################################################
+# Merge of two tables on the specimen of a column (as pandas.merge( left, right, on = on ), with the left values of the column)
+def merge_specimens( registry, left, right, on = 'filename' ):
+	left = left if hasattr( left, 'columns' ) else left.to_frame()
+	left_rows, right_rows = join_rows( registry.intern( left[ on ].tolist() ), registry.intern( right[ on ].tolist() ) )
+	df = left.iloc[ left_rows ].reset_index( drop = True )
+	df_right = right.drop( columns = [ on ] ).iloc[ right_rows ].reset_index( drop = True )
+	for column in df_right.columns:
+		df[ column ] = df_right[ column ]
+	return( df )
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	State of an iterative (HITL) simulation kept in memory between iterations.
+# 				In-process tasks save their results (e.g. the dictionary or the trained
+# 				model) with the path of their file, and the next iterations get the object
+# 				directly. The files are written in background (asynchronous checkpoints).
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, re, threading
+from concurrent.futures import ThreadPoolExecutor
+
+##############################################################################################################################
+# True if the path is equal to, or inside of, one of the paths of the list
+def path_overlaps( path, paths ):
+	return( any( (path == p) or path.startswith( p + "/" ) or p.startswith( path + "/" ) for p in paths ) )
+
+##############################################################################################################################
+# Path without the number of its iteration directory (the same for the file of a task in every iteration)
+def iteration_pattern( path ):
+	return( re.sub( r"/iteration_[0-9]+(/|$)", r"/iteration_*\1", path ) )
+
+
+class IterationState:
+	'Objects of the tasks indexed by the path of their file. The files are written in background only when the engine runs the tasks in its own process.'
+	######################################################################################################################################
+	# Constructor
+	def __init__(self):
+		self.objects = {}			# Path -> object
+		self.pending = {}			# Path -> Future of the writing of its file
+		self.asynchronous = False	# False -> the files are written immediately (e.g. the task runs in a subprocess or in a worker process)
+		self.writer = None
+		self.lock = threading.Lock()
+
+	######################################################################################################################################
+	# In a forked worker process, the state starts empty (the writing thread of the parent does not exist in the child)
+	def reset(self):
+		self.objects = {}
+		self.pending = {}
+		self.asynchronous = False
+		self.writer = None
+		self.lock = threading.Lock()
+
+	######################################################################################################################################
+	# Starts a new simulation: the objects of the previous one are discarded. With asynchronous, the files are written in background.
+	def start(self, asynchronous = False):
+		self.flush()
+		with self.lock:
+			self.objects = {}
+			self.asynchronous = asynchronous
+
+	######################################################################################################################################
+	# Returns the object saved with the path, or the one read from the file (reader( path )) if it is not in memory. The pending
+	# writing of the file finishes first, so the caller can modify the object.
+	def get(self, path, reader):
+		self.flush( [ path ] )
+		with self.lock:
+			if path in self.objects:
+				return( self.objects[ path ] )
+		return( reader( path ) )
+
+	######################################################################################################################################
+	# Returns the object saved with the path (or the one read from the file), and removes it from memory. The caller can modify it and
+	# save it with another path (e.g. the model of the previous iteration, trained again) without changing the object of the path.
+	def pop(self, path, reader):
+		self.flush( [ path ] )
+		with self.lock:
+			if path in self.objects:
+				return( self.objects.pop( path ) )
+		return( reader( path ) )
+
+	######################################################################################################################################
+	# Saves the object in memory and writes its file (writer( path, obj )), in background if the state is asynchronous. Only the last
+	# iteration of a file is kept in memory: the objects of the same file in the other iterations are discarded.
+	def put(self, path, obj, writer):
+		self.flush( [ path ] )
+		pattern = iteration_pattern( path )
+		with self.lock:
+			if pattern != path:
+				for p in [ p for p in self.objects if p != path and iteration_pattern( p ) == pattern ]:
+					del self.objects[ p ]
+			self.objects[ path ] = obj
+			if not self.asynchronous:
+				writer( path, obj )
+				return
+			if self.writer is None:
+				self.writer = ThreadPoolExecutor( max_workers = 1 )
+			self.pending[ path ] = self.writer.submit( writer, path, obj )
+
+	######################################################################################################################################
+	# Waits for the writing of the files of the paths (or inside the directories of the list). All the files if paths is None.
+	def flush(self, paths = None):
+		with self.lock:
+			futures = [ (p, f) for p, f in self.pending.items() if (paths is None) or path_overlaps( p, paths ) ]
+		for p, future in futures:
+			future.result()
+			with self.lock:
+				if self.pending.get( p ) is future:
+					del self.pending[ p ]
+
+
+# State of the current process
+iteration_state = IterationState()
+if hasattr( os, 'register_at_fork' ):
+	os.register_at_fork( after_in_child = iteration_state.reset )
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Specimen store of a collection of datasets. One SQLite file (WAL) per
+# 				collection keeps the content of its files (OCR-ed texts, crowdsourced
+# 				data, metrics, regular expressions, and ground truth) and the lines of its
+# 				tables indexed by specimen, so the tasks fetch the rows and columns they
+# 				need without opening thousands of small files. A file is read from the
+# 				store only while it has the same size and modification time as when the
+# 				store was created, otherwise it is read from the disk.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, io, shutil, sqlite3, threading
+
+from humain.constants import *
+from humain.utils import list_files_ext
+
+# Maximum number of specimens per query (SQLite limit of variables)
+QUERY_SPECIMENS = 500
+
+##############################################################################################################################
+# Key (specimen) of a line of a table: its first field, without quotes
+def line_key( line, sep ):
+	key = line.rstrip( b"\r\n" ).split( sep.encode('utf8'), 1 )[0].strip()
+	if len(key) > 1 and key.startswith( b'"' ) and key.endswith( b'"' ):
+		key = key[1:-1]
+	return( key.decode( 'utf8', errors = 'replace' ) )
+
+##############################################################################################################################
+# True if every line of the table is a complete row (no quoted field spans several lines), so its lines can be selected by specimen
+def is_line_table( data ):
+	return( all( line.count( b'"' ) % 2 == 0 for line in data.splitlines() ) )
+
+##############################################################################################################################
+# Selects the header lines (n_header) and the lines of the specimens of a table, in the order of the file. Returns None when the table
+# cannot be split in lines.
+def select_lines( data, specimens, n_header, sep ):
+	if not is_line_table( data ):
+		return( None )
+	specimens = set( specimens )
+	lines = data.splitlines( True )
+	return( b"".join( lines[ :n_header ] + [ line for line in lines[ n_header: ] if line_key( line, sep ) in specimens ] ) )
+
+##############################################################################################################################
+# Separator of the fields of a table file (by extension), None if it is not a table
+def table_separator( filename ):
+	if filename.endswith(".tsv"):
+		return( "\t" )
+	if filename.endswith(".csv"):
+		return( "," )
+	return( None )
+
+##############################################################################################################################
+# Creates the store of a collection (directory of DATASETS_DIR). The new store replaces the previous one when it is complete.
+# Returns (number of files, number of indexed lines).
+def create_store( collection_dir ):
+	store_pathfilename = collection_dir + "/" + STORE_FILENAME
+	tmp_pathfilename = store_pathfilename + ".tmp" + str(os.getpid())
+	for path in [ tmp_pathfilename, tmp_pathfilename + "-wal", tmp_pathfilename + "-shm" ]:
+		if os.path.exists( path ):
+			os.remove( path )
+
+	n_files, n_lines = 0, 0
+	connection = sqlite3.connect( tmp_pathfilename )
+	try:
+		connection.execute( "PRAGMA journal_mode=WAL" )
+		connection.execute( "CREATE TABLE dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER)" )
+		connection.execute( "CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, dir TEXT, name TEXT, size INTEGER, mtime_ns INTEGER, content BLOB)" )
+		connection.execute( "CREATE TABLE lines (file_id INTEGER, line_no INTEGER, specimen TEXT, text BLOB, PRIMARY KEY (file_id, line_no))" )
+		for root, dirs, files in os.walk( collection_dir ):
+			dirs.sort()
+			rel_dir = os.path.relpath( root, collection_dir )
+			connection.execute( "INSERT INTO dirs VALUES (?, ?)", ( rel_dir, os.stat( root ).st_mtime_ns ) )
+			# The files are kept in the order of the directory (the same as the listings of the tasks)
+			with os.scandir( root ) as it:
+				filenames = [ entry.name for entry in it if entry.is_file() and entry.name.endswith( ('.txt', '.tsv', '.csv') ) ]
+			for filename in filenames:
+				pathfilename = root + "/" + filename
+				st = os.stat( pathfilename )
+				with open( pathfilename, "rb" ) as f:
+					data = f.read()
+				cursor = connection.execute( "INSERT INTO files (path, dir, name, size, mtime_ns, content) VALUES (?, ?, ?, ?, ?, ?)",
+					( os.path.normpath( rel_dir + "/" + filename ), rel_dir, filename, st.st_size, st.st_mtime_ns, data ) )
+				n_files += 1
+				sep = table_separator( filename )
+				if (sep is None) or not is_line_table( data ):
+					continue
+				rows = [ ( cursor.lastrowid, i, line_key( line, sep ), line ) for i, line in enumerate( data.splitlines( True ) ) ]
+				connection.executemany( "INSERT INTO lines VALUES (?, ?, ?, ?)", rows )
+				n_lines += len(rows)
+		connection.execute( "CREATE INDEX lines_specimen ON lines (file_id, specimen)" )
+		connection.execute( "CREATE INDEX files_dir ON files (dir)" )
+		connection.commit()
+	finally:
+		connection.close()
+	os.replace( tmp_pathfilename, store_pathfilename )
+	return( n_files, n_lines )
+
+
+class SpecimenStore:
+	'Store of a collection of datasets (SQLite), read only'
+	######################################################################################################################################
+	# Constructor
+	def __init__(self, store_pathfilename, collection_dir):
+		self.collection_dir = collection_dir
+		self.connection = sqlite3.connect( "file:" + store_pathfilename + "?mode=ro", uri = True, check_same_thread = False )
+		self.lock = threading.Lock()
+
+	######################################################################################################################################
+	# Identifier of a file of the collection, if the store has its current version. None otherwise.
+	def file_id(self, pathfilename):
+		try:
+			st = os.stat( pathfilename )
+		except OSError:
+			return( None )
+		with self.lock:
+			row = self.connection.execute( "SELECT id, size, mtime_ns FROM files WHERE path = ?",
+				( os.path.relpath( pathfilename, self.collection_dir ), ) ).fetchone()
+		if (row is None) or row[1] != st.st_size or row[2] != st.st_mtime_ns:
+			return( None )
+		return( row[0] )
+
+	######################################################################################################################################
+	# Content of a file (bytes), None if the store does not have its current version
+	def read(self, pathfilename):
+		f_id = self.file_id( pathfilename )
+		if f_id is None:
+			return( None )
+		with self.lock:
+			return( self.connection.execute( "SELECT content FROM files WHERE id = ?", ( f_id, ) ).fetchone()[0] )
+
+	######################################################################################################################################
+	# Header lines (n_header) and lines of the specimens of a table, in the order of the file. None if the store does not have its
+	# current version or its lines are not indexed.
+	def read_lines(self, pathfilename, specimens, n_header):
+		f_id = self.file_id( pathfilename )
+		if f_id is None:
+			return( None )
+		specimens = list( dict.fromkeys( specimens ) )
+		with self.lock:
+			if self.connection.execute( "SELECT 1 FROM lines WHERE file_id = ? LIMIT 1", ( f_id, ) ).fetchone() is None:
+				return( None )
+			rows = self.connection.execute( "SELECT line_no, text FROM lines WHERE file_id = ? AND line_no < ?", ( f_id, n_header ) ).fetchall()
+			for i in range( 0, len(specimens), QUERY_SPECIMENS ):
+				part = specimens[ i:i + QUERY_SPECIMENS ]
+				rows += self.connection.execute( "SELECT line_no, text FROM lines WHERE file_id = ? AND line_no >= ? AND specimen IN (" +
+					",".join( "?" * len(part) ) + ")", [ f_id, n_header ] + part ).fetchall()
+		return( b"".join( text for line_no, text in sorted( rows ) ) )
+
+	######################################################################################################################################
+	# Files of a directory with the extension, in the order of the directory. None if the directory changed after the creation of
+	# the store.
+	def list_files(self, dir_name, ext):
+		try:
+			mtime_ns = os.stat( dir_name ).st_mtime_ns
+		except OSError:
+			return( None )
+		rel_dir = os.path.relpath( dir_name, self.collection_dir )
+		with self.lock:
+			row = self.connection.execute( "SELECT mtime_ns FROM dirs WHERE path = ?", ( rel_dir, ) ).fetchone()
+			if (row is None) or row[0] != mtime_ns:
+				return( None )
+			names = [ r[0] for r in self.connection.execute( "SELECT name FROM files WHERE dir = ? ORDER BY id", ( rel_dir, ) ) ]
+		suffix = "." + ext.lower()
+		return( [ name for name in names if name.endswith( suffix ) ] )
+
+
+# Opened stores of the process: collection directory -> (modification time of the store file, store)
+stores = {}
+stores_lock = threading.Lock()
+
+##############################################################################################################################
+# Store of the collection of a file or directory of DATASETS_DIR, None if it is not in a collection with a store
+def dataset_store( path ):
+	path = os.path.abspath( path )
+	if not path.startswith( DATASETS_DIR + "/" ):
+		return( None )
+	collection_dir = DATASETS_DIR + "/" + path[ len(DATASETS_DIR) + 1: ].split("/")[0]
+	store_pathfilename = collection_dir + "/" + STORE_FILENAME
+	try:
+		mtime_ns = os.stat( store_pathfilename ).st_mtime_ns
+	except OSError:
+		return( None )
+	with stores_lock:
+		entry = stores.get( collection_dir )
+		if (entry is None) or entry[0] != mtime_ns:
+			try:
+				store = SpecimenStore( store_pathfilename, collection_dir )
+				store.connection.execute( "SELECT 1 FROM files LIMIT 1" )
+				entry = ( mtime_ns, store )
+			except sqlite3.Error:
+				entry = ( mtime_ns, None )
+			stores[ collection_dir ] = entry
+	return( entry[1] )
+
+##############################################################################################################################
+# Segment of a dataset file mapped from the dataset server (see dataset_server.py), None if the engine did not start the server
+def server_segment( pathfilename ):
+	if not os.environ.get( DATASET_SERVER_ENV ):
+		return( None )
+	# The client of the server is only imported when it is used
+	from humain.dataset_server import dataset_segment
+	return( dataset_segment( pathfilename ) )
+
+##############################################################################################################################
+# Content (bytes) of a file, from the dataset server or the store of its collection when possible
+def read_dataset( pathfilename ):
+	segment = server_segment( pathfilename )
+	if segment is not None:
+		return( bytes( segment.data ) )
+	store = dataset_store( pathfilename )
+	data = store.read( pathfilename ) if store else None
+	if data is None:
+		with open( pathfilename, "rb" ) as f:
+			data = f.read()
+	return( data )
+
+##############################################################################################################################
+# Opens a text file for reading (as open( pathfilename, "r" )), from the dataset server or the store of its collection when possible
+def open_dataset( pathfilename ):
+	segment = server_segment( pathfilename )
+	if segment is not None:
+		return( io.TextIOWrapper( io.BytesIO( segment.data ) ) )
+	store = dataset_store( pathfilename )
+	data = store.read( pathfilename ) if store else None
+	if data is None:
+		return( open( pathfilename, "r" ) )
+	return( io.TextIOWrapper( io.BytesIO( data ) ) )
+
+##############################################################################################################################
+# Copies a file (as shutil.copyfile), from the dataset server or the store of its collection when possible
+def copy_dataset_file( src, dst ):
+	segment = server_segment( src )
+	store = dataset_store( src ) if segment is None else None
+	data = segment.data if segment is not None else ( store.read( src ) if store else None )
+	if data is None:
+		shutil.copyfile( src, dst )
+		return
+	with open( dst, "wb" ) as f:
+		f.write( data )
+
+##############################################################################################################################
+# Files of a directory with the extension (as list_files_ext), from the store of its collection when possible
+def list_dataset_files( dir_name, ext ):
+	store = dataset_store( dir_name )
+	filenames = store.list_files( dir_name, ext ) if store else None
+	return( list_files_ext( dir_name, ext ) if filenames is None else filenames )
+
+##############################################################################################################################
+# Reads a table (as pandas.read_csv) with only the rows of the specimens (first field of the lines; all when None) and the columns
+# (usecols) requested. The rows and the file come from the dataset server or the store of its collection when possible.
+def read_table( pathfilename, specimens = None, columns = None, **kwargs ):
+	import pandas as pd
+	if columns is not None:
+		kwargs['usecols'] = columns
+
+	segment = server_segment( pathfilename )
+	store = dataset_store( pathfilename ) if segment is None else None
+	if specimens is None:
+		data = segment.data if segment is not None else ( store.read( pathfilename ) if store else None )
+		return( pd.read_csv( pathfilename if data is None else io.BytesIO( data ), **kwargs ) )
+
+	# Lines of the header (the first one, unless the names are given), as pandas.read_csv
+	header = kwargs.get( 'header', 'infer' )
+	if header == 'infer':
+		n_header = 0 if kwargs.get('names') is not None else 1
+	else:
+		n_header = 0 if header is None else max( [ header ] if isinstance( header, int ) else header ) + 1
+	if segment is not None:
+		data = segment.select_lines( specimens, n_header )
+	else:
+		data = store.read_lines( pathfilename, specimens, n_header ) if store else None
+	if data is None:
+		data = select_lines( read_dataset( pathfilename ), specimens, n_header, kwargs.get( 'sep', ',' ) )
+	if data is not None:
+		return( pd.read_csv( io.BytesIO( data ), **kwargs ) )
+
+	# Tables with fields in several lines: the rows are selected after reading the whole table
+	kwargs.pop( 'usecols', None )
+	df = pd.read_csv( pathfilename, **kwargs )
+	df = df[ df.iloc[:, 0].astype(str).isin( set( specimens ) ) ]
+	if columns is not None:
+		df = df[ [ df.columns[ c ] if isinstance( c, int ) else c for c in columns ] ]
+	return( df )
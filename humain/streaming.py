@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Streaming execution of a simulation. The tasks whose script has a stream
+# 				generator process the specimens one at a time: every specimen goes through
+# 				the workflow as soon as the previous task saved it, and leaves it when no
+# 				next task reads the output where it was saved (e.g. an accepted value).
+# 				The rest of the workflow, the metrics, and the post-processing run in batch.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+# Interface of the scripts of the tasks (same arguments as their main function):
+#   stream( argv ): generator. It validates the arguments and creates the outputs, receives the specimens (filenames) with send(),
+#                   and yields for every one the list of outputs where it was saved. Its outputs are closed with close().
+#   specimens( argv ): specimens of the input, in order (only the first tasks of the workflow).
+
+import sys, time, traceback
+
+from humain.execution import load_script_module, exit_code
+from humain.manifest import record_manifest
+
+##############################################################################################################################
+# Module of the script of a task if it can be streamed (it defines a stream generator), None otherwise. The source is read first, so
+# the scripts without it are never imported.
+def stream_module( script_filename ):
+	try:
+		with open( script_filename, "r" ) as f:
+			if not ("def stream(" in f.read()):
+				return( None )
+		module = load_script_module( script_filename )
+	except Exception:
+		return( None )
+	return( module if callable( getattr(module, 'stream', None) ) else None )
+
+##############################################################################################################################
+# Tasks that are streamed: the tasks with a stream generator whose predecessors are also streamed (the first tasks also need the
+# specimens function). Returns (tasks in topological order, task -> module).
+def stream_plan( sim ):
+	streamed = []
+	modules = {}
+	changed = True
+	while changed:
+		changed = False
+		for task_name in sim.workflow:
+			predecessors = list( sim.workflow.predecessors( task_name ) )
+			if (task_name in streamed) or not all( p in streamed for p in predecessors ):
+				continue
+			module = stream_module( sim.workflow.node[ task_name ]['script'] )
+			if (module is None) or ( len(predecessors) == 0 and not callable( getattr(module, 'specimens', None) ) ):
+				continue
+			streamed.append( task_name )
+			modules[ task_name ] = module
+			changed = True
+	return( streamed, modules )
+
+##############################################################################################################################
+# True if one of the outputs where a specimen was saved is an input of the task (or it is inside of an input directory)
+def is_routed( outputs, input_paths ):
+	return( any( (o == p) or o.startswith( p + "/" ) for o in outputs for p in input_paths ) )
+
+##############################################################################################################################
+# Ends the execution when a task (or its generator of specimens) fails
+def stream_error( task_name, e, specimen = None ):
+	returncode = exit_code( e.code ) if isinstance( e, SystemExit ) else 1
+	if not isinstance( e, SystemExit ):
+		traceback.print_exc()
+	where = "" if specimen is None else " while streaming the specimen " + str(specimen)
+	print( "\nERROR: Task " + task_name + " generated an error" + where + " (exit code " + str(returncode) + ").\n" )
+	sys.exit( returncode if returncode != 0 else 131 )
+
+##############################################################################################################################
+# Runs the simulation (sim) streaming the specimens through the tasks that support it. The rest of the workflow, the metrics, and
+# the post-processing run afterwards on their outputs.
+def run_streaming( sim ):
+	if sim.iterative:
+		print( "\nERROR: The iterative (HITL) simulations cannot be streamed.\n" )
+		sys.exit( 130 )
+
+	start = time.time()
+	streamed, modules = stream_plan( sim )
+	if len(streamed) == 0:
+		print( "Streaming: no task of the workflow can be streamed, the simulation runs in batch." )
+		sim.run()
+		return
+	print( "Streaming: tasks " + ", ".join( streamed ) + "." )
+
+	# In the memory results mode, the streamed outputs are also written in memory
+	sim.place_results_in_memory()
+
+	# The stages are started in topological order: each one creates its outputs, which are the inputs of the next ones
+	args = {}
+	stages = {}
+	for task_name in streamed:
+		args[ task_name ] = sim.get_execution_parameters( task_name )
+		try:
+			stages[ task_name ] = modules[ task_name ].stream( args[ task_name ] )
+			next( stages[ task_name ] )
+		except (Exception, SystemExit) as e:
+			stream_error( task_name, e )
+	successors = { t: [ s for s in sim.workflow.successors( t ) if s in stages ] for t in streamed }
+	inputs = { t: sim.get_task_inputs( t ) for t in streamed }
+
+	received = dict.fromkeys( streamed, 0 )		# Specimens processed by every task
+	left = dict.fromkeys( streamed, 0 )			# Specimens that left the workflow in every task
+	n_specimens = 0
+	for root in [ t for t in streamed if len(list( sim.workflow.predecessors( t ) )) == 0 ]:
+		root_specimens = modules[ root ].specimens( args[ root ] )
+		while True:
+			try:
+				specimen = next( root_specimens )
+			except StopIteration:
+				break
+			except (Exception, SystemExit) as e:
+				stream_error( root, e )
+			pending = [ root ]
+			while len(pending) > 0:
+				task_name = pending.pop()
+				try:
+					outputs = stages[ task_name ].send( specimen )
+				except (Exception, SystemExit) as e:
+					stream_error( task_name, e, specimen )
+				received[ task_name ] += 1
+				next_tasks = [ s for s in successors[ task_name ] if is_routed( outputs or [], inputs[ s ] ) ]
+				if len(next_tasks) == 0:
+					left[ task_name ] += 1
+				pending += next_tasks
+			n_specimens += 1
+			if n_specimens == 1:
+				print( "Streaming: first specimen finished after %.2f s." % (time.time() - start) )
+
+	for task_name in streamed:
+		stages[ task_name ].close()
+	print( "Streaming: " + str(n_specimens) + " specimens in %.1f s. Specimens processed (and leaving the workflow) per task: " % (time.time() - start) +
+		", ".join( t + " " + str(received[ t ]) + " (" + str(left[ t ]) + ")" for t in streamed ) + "." )
+
+	# The outputs of the streamed tasks are verified and recorded as if they had been executed in batch
+	for task_name in streamed:
+		sim.verifyTaskOutput( task_name )
+		record_manifest( sim.manifest_pathfilename( task_name ), sim.get_task_outputs( task_name ) )
+
+	# The rest of the workflow, the metrics, and the post-processing run on the outputs of the streamed tasks
+	sim.skip_tasks( streamed )
+	sim.run()
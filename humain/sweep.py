@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Parameter sweeps: generation of the variants of a simulation file from a
+# 				grid of parameter values, parallel execution of a family of simulations,
+# 				and consolidation of their metrics in a single table.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, sys, glob, csv, time, itertools, ntpath
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from humain.constants import *
+from humain.utils import *
+
+##############################################################################################################################
+# Simulation files (names without .xml) that match the list of names or glob patterns, in the simulations directory
+def find_simulations( simulations_dir, patterns ):
+	sim_names = []
+	for pattern in patterns:
+		pattern = ntpath.basename( pattern ).replace('.xml', '') + ".xml"
+		matches = sorted( glob.glob( simulations_dir + "/" + pattern ) )
+		if len(matches) == 0:
+			print( "\nERROR: No simulation file matches " + pattern + " in " + simulations_dir + ".\n" )
+			sys.exit( 60 )
+		for pathfilename in matches:
+			sim_name = ntpath.basename( pathfilename )[:-4]
+			if not (sim_name in sim_names):
+				sim_names.append( sim_name )
+	return( sim_names )
+
+##############################################################################################################################
+# Parses the grid arguments (task.parameter=value1,value2,...). Returns a list of ((task, parameter), [values]).
+def parse_grid( grid_args ):
+	grid = []
+	for g in grid_args:
+		try:
+			name, values = g.split('=', 1)
+			task_name, para_name = name.split('.', 1)
+		except ValueError:
+			print( "\nERROR: Invalid grid parameter (" + g + "). The format is task.parameter=value1,value2,...\n" )
+			sys.exit( 61 )
+		grid.append( ( (task_name.strip(), para_name.strip()), [ v.strip() for v in values.split(',') ] ) )
+	return( grid )
+
+##############################################################################################################################
+# Builds, in memory, the simulation file of every combination of values of the grid. The results directory of each variant is renamed
+# after the variant. Returns a dictionary variant name -> XML tree, in the order of the combinations.
+def variant_trees( simulations_dir, base_name, grid ):
+	base_pathfilename = simulations_dir + "/" + base_name + ".xml"
+	verify_file( base_pathfilename, 'The base simulation file (' + base_pathfilename + ') was not found.', None, 62 )
+
+	variants = {}
+	combinations = list( itertools.product( *[ values for name, values in grid ] ) )
+	for i, combination in enumerate( combinations ):
+		variant_name = base_name + "_sweep_" + str(i + 1).rjust(2, '0')
+		tree = ET.parse( base_pathfilename )
+		root = tree.getroot()
+		for ( (task_name, para_name), values ), value in zip( grid, combination ):
+			task = root.find( "tasks/task[@name='" + task_name + "']" )
+			if task is None:
+				print( "\nERROR: The task " + task_name + " is not defined in " + base_pathfilename + ".\n" )
+				sys.exit( 63 )
+			parameters = task.findall( "parameter[@name='" + para_name + "']" )
+			if len(parameters) == 0:
+				print( "\nERROR: The parameter " + para_name + " of the task " + task_name + " is not defined in " + base_pathfilename + ".\n" )
+				sys.exit( 64 )
+			# A single value replaces all the values of the parameter
+			parameters[0].text = value
+			for parameter in parameters[1:]:
+				task.remove( parameter )
+
+		# Results of the variant in its own directory
+		for element in root.iter():
+			if element.text:
+				element.text = element.text.replace( "results/" + base_name + "/", "results/" + variant_name + "/" )
+
+		variants[ variant_name ] = tree
+	return( variants )
+
+##############################################################################################################################
+# Writes the simulation files of the variants (variant name -> XML tree). Returns their names.
+def write_variants( simulations_dir, variants ):
+	for variant_name, tree in variants.items():
+		tree.write( simulations_dir + "/" + variant_name + ".xml", encoding = "UTF-8", xml_declaration = True )
+	return( list(variants) )
+
+##############################################################################################################################
+# Creates a simulation file for every combination of values of the grid. Returns the names of the new simulation files.
+def generate_variants( simulations_dir, base_name, grid ):
+	return( write_variants( simulations_dir, variant_trees( simulations_dir, base_name, grid ) ) )
+
+##############################################################################################################################
+# Runs a complete simulation (executed in a worker process of the sweep). Returns a dictionary with its status and duration.
+def run_variant( project, workflow, sim_name, execution_mode = None, jobs = 1, use_cache = True, queue_dir = None, memory_results = False, persist_patterns = None ):
+	from humain.simulation import Simulation
+	start = time.time()
+	returncode = 0
+	try:
+		sim = Simulation( project, workflow, sim_name, execution_mode, jobs, use_cache, queue_dir, memory_results, persist_patterns )
+		sim.run()
+	except SystemExit as e:
+		returncode = e.code if isinstance( e.code, int ) else 1
+	return( { 'simulation': sim_name, 'returncode': returncode, 'elapsed': time.time() - start } )
+
+##############################################################################################################################
+# Output files of the metrics scripts of a simulation file (e.g. duration.csv and quality.csv)
+def metric_files( simulations_dir, sim_name ):
+	root = ET.parse( simulations_dir + "/" + sim_name + ".xml" ).getroot()
+	files = []
+	for script in root.findall( 'metrics/script' ):
+		for parameter in script.findall( "parameter[@name='output_file']" ):
+			files.append( BASE_DIR + "/" + parameter.text )
+	return( files )
+
+##############################################################################################################################
+# Number of specimens, sum, and mean of a metric file (specimen,value lines)
+def summarize_metric( pathfilename ):
+	n, total = 0, 0.0
+	if os.path.isfile( pathfilename ):
+		with open( pathfilename, "r" ) as f:
+			for row in csv.reader( f ):
+				if len(row) > 1 and row[1] != '':
+					n += 1
+					total += float( row[1] )
+	mean = total / n if n > 0 else ''
+	return( n, total, mean )
+
+##############################################################################################################################
+# Runs the simulations in a pool of processes and writes one table with the status, duration, and metrics of each one. With dedup,
+# the simulations are executed as a batch where the tasks they have in common run only once (processes concurrent tasks). With queue_dir,
+# the tasks are executed by the workers of the work queue. With memory_results, the outputs of the tasks are written in memory (see memory.py).
+def run_sweep( project, workflow, sim_names, output_pathfilename, processes = None, execution_mode = None, jobs = 1, use_cache = True, dedup = False, queue_dir = None,
+	memory_results = False, persist_patterns = None ):
+	if not processes:
+		processes = os.cpu_count() or 1
+
+	if dedup:
+		from humain.batch import Batch
+		results = Batch( project, workflow, sim_names, execution_mode, processes, use_cache, queue_dir, memory_results, persist_patterns ).run()
+		for sim_name in sim_names:
+			print( "Simulation " + sim_name + " finished (exit code " + str(results[ sim_name ]['returncode']) + ", %.1f s)." % results[ sim_name ]['elapsed'] )
+		return( write_sweep_table( project, sim_names, results, output_pathfilename ) )
+
+	processes = min( processes, len(sim_names) )
+	results = {}
+	with ProcessPoolExecutor( max_workers = processes ) as pool:
+		futures = [ pool.submit( run_variant, project, workflow, sim_name, execution_mode, jobs, use_cache, queue_dir, memory_results, persist_patterns ) for sim_name in sim_names ]
+		for future in as_completed( futures ):
+			result = future.result()
+			results[ result['simulation'] ] = result
+			print( "Simulation " + result['simulation'] + " finished (exit code " + str(result['returncode']) + ", %.1f s)." % result['elapsed'] )
+
+	return( write_sweep_table( project, sim_names, results, output_pathfilename ) )
+
+##############################################################################################################################
+# Report of the predicted duration of every simulation (see estimate.py) and of the sweep, with processes simulations at the same time.
+# The tasks shared by the simulations (dedup) are counted in every simulation, so the estimate is an upper bound in that case. The
+# variants of a grid that were not written (variant name -> XML tree) are estimated from their trees.
+def estimate_sweep( project, workflow, sim_names, processes = None, execution_mode = None, jobs = 1, use_cache = True, variants = None ):
+	from humain.simulation import Simulation
+	from humain.graph import TaskGraph
+	from humain.estimate import load_history, estimate_simulation, estimate_report, schedule_makespan
+	if not processes:
+		processes = os.cpu_count() or 1
+
+	history = load_history( BASE_DIR + "/" + project )
+	report = ""
+	sims_graph = TaskGraph()
+	durations = {}
+	for sim_name in sim_names:
+		params_root = variants[ sim_name ].getroot() if (variants and sim_name in variants) else None
+		estimate = estimate_simulation( Simulation( project, workflow, sim_name, execution_mode, jobs, use_cache, params_root = params_root ), history )
+		report += estimate_report( sim_name, estimate ) + "\n"
+		sims_graph.add_node( sim_name )
+		durations[ sim_name ] = estimate['total_s']
+	report += "Estimated sweep duration with " + str(processes) + " processes: %.2f s (%d simulations)\n" % ( schedule_makespan( sims_graph, sim_names, durations, processes ), len(sim_names) )
+	return( report )
+
+##############################################################################################################################
+# Writes the consolidated table, one row per simulation (in the order of sim_names)
+def write_sweep_table( project, sim_names, results, output_pathfilename ):
+	simulations_dir = BASE_DIR + "/" + project + "/simulations"
+	metric_names = []
+	rows = []
+	for sim_name in sim_names:
+		row = { 'simulation': sim_name, 'returncode': results[ sim_name ]['returncode'], 'elapsed_s': "%.3f" % results[ sim_name ]['elapsed'] }
+		for pathfilename in metric_files( simulations_dir, sim_name ):
+			metric = ntpath.basename( pathfilename ).split('.')[0]
+			if not (metric in metric_names):
+				metric_names.append( metric )
+			row[ metric + "_n" ], row[ metric + "_sum" ], row[ metric + "_mean" ] = summarize_metric( pathfilename )
+		rows.append( row )
+
+	fieldnames = ['simulation', 'returncode', 'elapsed_s']
+	for metric in metric_names:
+		fieldnames += [ metric + "_n", metric + "_sum", metric + "_mean" ]
+	with open( output_pathfilename, "w+", newline='' ) as f:
+		writer = csv.DictWriter( f, fieldnames = fieldnames, restval = '' )
+		writer.writeheader()
+		for row in rows:
+			writer.writerow( row )
+
+	return( rows )
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Performance trace of a simulation. One JSON line per executed task or
+# 				script (wall-clock interval, CPU time, peak RSS, bytes read and written,
+# 				and number of input and output files), exported to the Chrome/Perfetto
+# 				trace format (chrome://tracing or https://ui.perfetto.dev).
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, json
+
+# Number of files and units of the inputs already counted in this process: path -> (modification time (ns), files, units)
+input_counts = {}
+
+##############################################################################################################################
+# Number of files of a list of files and directories (recursively)
+def count_files( paths ):
+	n = 0
+	for path in paths:
+		if os.path.isfile( path ):
+			n += 1
+		elif os.path.isdir( path ):
+			for root, dirs, files in os.walk( path ):
+				n += len(files)
+	return( n )
+
+##############################################################################################################################
+# Size of the inputs of a task in units of work (e.g. specimens): the lines of the text files and the files of the directories
+def count_units( paths ):
+	n = 0
+	for path in paths:
+		if os.path.isdir( path ):
+			n += count_files( [ path ] )
+		elif os.path.isfile( path ):
+			if path.lower().endswith( ('.txt', '.tsv', '.csv') ):
+				with open( path, "rb" ) as f:
+					n += sum( chunk.count( b"\n" ) for chunk in iter( lambda: f.read( 1 << 20 ), b"" ) )
+			else:
+				n += 1
+	return( n )
+
+##############################################################################################################################
+# Number of files and units of an input, counted once per process while it does not change (e.g. the dataset read by every task)
+def input_count( path ):
+	try:
+		mtime_ns = os.stat( path ).st_mtime_ns
+	except OSError:
+		return( 0, 0 )
+	known = input_counts.get( path )
+	if known and known[0] == mtime_ns:
+		return( known[1], known[2] )
+	input_counts[ path ] = ( mtime_ns, count_files( [ path ] ), count_units( [ path ] ) )
+	return( input_counts[ path ][1], input_counts[ path ][2] )
+
+##############################################################################################################################
+# Number of input files, input units, and output files of an execution. The output files are taken from the manifest of the outputs
+# when it is given.
+def io_counts( input_paths, output_paths, manifest = None ):
+	counts = [ input_count( path ) for path in input_paths ]
+	if manifest:
+		output_files = sum( len(o['files']) for o in manifest['outputs'] if o['path'] in output_paths )
+	else:
+		output_files = count_files( output_paths )
+	return( { 'input_files': sum( c[0] for c in counts ), 'input_units': sum( c[1] for c in counts ), 'output_files': output_files } )
+
+
+class TaskTrace:
+	'Trace of the executions of the tasks and scripts of a simulation (JSONL file), exportable to the Chrome trace format'
+	######################################################################################################################################
+	# Constructor. The previous trace of the simulation is deleted, unless append is True (e.g. the simulation is resumed).
+	def __init__(self, trace_pathfilename, append = False):
+		self.trace_pathfilename = trace_pathfilename
+		input_counts.clear()
+		open( self.trace_pathfilename, "a" if append else "w+" ).close()
+
+	######################################################################################################################################
+	# Appends the record of an execution: name, kind (task, metrics, post-processing), mode, iteration, exit code, and usage. The files
+	# and units of the inputs and outputs are counted here only if the worker did not count them (e.g. a task restored from the cache).
+	def add(self, name, kind, mode, iteration, returncode, usage, input_paths = [], output_paths = []):
+		record = { 'name': name, 'kind': kind, 'mode': mode, 'iteration': iteration, 'returncode': returncode }
+		if not ('input_files' in usage):
+			record.update( io_counts( input_paths, output_paths ) )
+		record.update( usage )
+		record['wall_s'] = ( usage['end_ns'] - usage['start_ns'] ) / 1e9
+		with open( self.trace_pathfilename, "a" ) as f:
+			f.write( json.dumps( record ) + "\n" )
+
+	######################################################################################################################################
+	# Records of the trace
+	def records(self):
+		with open( self.trace_pathfilename, "r" ) as f:
+			return( [ json.loads( line ) for line in f if line.strip() != "" ] )
+
+	######################################################################################################################################
+	# Writes the trace in the Chrome trace event format. The overlapping executions are placed in different rows (threads).
+	def export_chrome(self, chrome_pathfilename):
+		records = sorted( self.records(), key = lambda r: r['start_ns'] )
+		events = []
+		rows_end = []		# End time of the last execution of every row
+		origin = records[0]['start_ns'] if len(records) > 0 else 0
+		for record in records:
+			row = 0
+			while row < len(rows_end) and rows_end[ row ] > record['start_ns']:
+				row += 1
+			if row == len(rows_end):
+				rows_end.append( 0 )
+				events.append( { 'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': row, 'args': { 'name': 'worker ' + str(row) } } )
+			rows_end[ row ] = record['end_ns']
+			args = { k: v for k, v in record.items() if not (k in ['name', 'kind', 'start_ns', 'end_ns']) }
+			events.append( { 'name': record['name'], 'cat': record['kind'], 'ph': 'X', 'pid': 1, 'tid': row,
+				'ts': ( record['start_ns'] - origin ) / 1000.0, 'dur': ( record['end_ns'] - record['start_ns'] ) / 1000.0, 'args': args } )
+
+		with open( chrome_pathfilename, "w+" ) as f:
+			json.dump( { 'traceEvents': events, 'displayTimeUnit': 'ms' }, f )
@@ -17,8 +17,18 @@
 # and limitations under the License.
 ##########################################################################################
 
-import os, sys, shutil, errno
-import datetime, re
+import os, sys, shutil, errno, stat
+import datetime, re, time
+
+from humain.constants import SELECTION_FILENAME
+
+# Directories already scanned: path -> [ (device, inode, modification time), {extension: has files}, {extension: filenames} ].
+# An entry is valid while the directory keeps its inode and modification time (files added, removed, or renamed change it).
+dir_cache = {}
+# The scans of directories modified less than RACY_NS nanoseconds before are not cached (granularity of the file system's timestamps)
+RACY_NS = 2 * 10**9
+# Selection manifests already read: path -> [ (size, modification time), {filename: source directory} ]
+selection_cache = {}
 
 ##############################################################################################################################
 # 
@@ -91,15 +101,120 @@ def verify_file_ext( pathfilename, ext ):
 	return(True)
 
 ##############################################################################################################################
-#
+# Cache entry of the directory, valid for its current metadata. Returns (entry, cacheable), or (None, False) if it is not a directory.
+def dir_cache_entry( dir_name ):
+	try:
+		st = os.stat( dir_name )
+	except OSError:
+		return( None, False )
+	if not stat.S_ISDIR( st.st_mode ):
+		return( None, False )
+	key = ( st.st_dev, st.st_ino, st.st_mtime_ns )
+	entry = dir_cache.get( dir_name )
+	if (entry is None) or entry[0] != key:
+		entry = [ key, {}, {} ]
+	return( entry, ( time.time_ns() - st.st_mtime_ns ) > RACY_NS )
+
+##############################################################################################################################
+# Files of a directory selected through its selection manifest (SELECTION_FILENAME) instead of copied: filename -> source directory,
+# in the order of the manifest. Empty if the directory has no manifest.
+def read_selection( dir_name ):
+	pathfilename = dir_name + "/" + SELECTION_FILENAME
+	try:
+		st = os.stat( pathfilename )
+	except OSError:
+		return( {} )
+	key = ( st.st_size, st.st_mtime_ns )
+	entry = selection_cache.get( pathfilename )
+	if (entry is not None) and entry[0] == key:
+		return( entry[1] )
+
+	sources = {}
+	with open( pathfilename, "r" ) as f:
+		for line in f:
+			parts = line.rstrip("\n").split("\t")
+			if len(parts) == 2:
+				sources[ parts[1] ] = parts[0]
+	if ( time.time_ns() - st.st_mtime_ns ) > RACY_NS:
+		selection_cache[ pathfilename ] = [ key, sources ]
+	return( sources )
+
+##############################################################################################################################
+# True if the directory contains at least one file with the extension, or selects one in its selection manifest
 def verify_dir_ext( dir_name, ext ):
-	if ( not os.path.isdir( dir_name ) ):
-		return(False)
-	filenames = os.listdir(dir_name)
-	filename_list = list(f for f in filenames if f.endswith( "." + ext.lower() ) )
-	if len(filename_list) == 0:
+	if dir_has_ext( dir_name, ext ):
+		return( True )
+	suffix = "." + ext.lower()
+	return( os.path.isdir( dir_name ) and any( filename.endswith( suffix ) for filename in read_selection( dir_name ) ) )
+
+##############################################################################################################################
+# True if the directory contains at least one file with the extension. The scan stops at the first one.
+def dir_has_ext( dir_name, ext ):
+	entry, cacheable = dir_cache_entry( dir_name )
+	if entry is None:
 		return(False)
-	return(True)
+	suffix = "." + ext.lower()
+	if suffix in entry[1]:
+		return( entry[1][ suffix ] )
+	if suffix in entry[2]:
+		return( len(entry[2][ suffix ]) > 0 )
+
+	found = False
+	with os.scandir( dir_name ) as it:
+		for dir_entry in it:
+			if dir_entry.name.endswith( suffix ):
+				found = True
+				break
+	if cacheable:
+		entry[1][ suffix ] = found
+		dir_cache[ dir_name ] = entry
+	return( found )
+
+##############################################################################################################################
+# Names of the files of the directory with the extension (in the order of the directory, like os.listdir), followed by the ones
+# selected in its selection manifest
+def list_files_ext( dir_name, ext ):
+	filenames = dir_files_ext( dir_name, ext )
+	selection = read_selection( dir_name )
+	if len(selection) > 0:
+		suffix = "." + ext.lower()
+		present = set( filenames )
+		filenames += [ filename for filename in selection if filename.endswith( suffix ) and not (filename in present) ]
+	return( filenames )
+
+##############################################################################################################################
+# Names of the files of the directory with the extension (in the order of the directory, like os.listdir)
+def dir_files_ext( dir_name, ext ):
+	entry, cacheable = dir_cache_entry( dir_name )
+	if entry is None:
+		# The same error as os.listdir
+		return( os.listdir( dir_name ) )
+	suffix = "." + ext.lower()
+	if suffix in entry[2]:
+		return( list( entry[2][ suffix ] ) )
+
+	with os.scandir( dir_name ) as it:
+		filenames = [ dir_entry.name for dir_entry in it if dir_entry.name.endswith( suffix ) ]
+	if cacheable:
+		entry[2][ suffix ] = filenames
+		entry[1][ suffix ] = len(filenames) > 0
+		dir_cache[ dir_name ] = entry
+	return( list( filenames ) )
+
+##############################################################################################################################
+# Verifies a list of paths at once: (path, 'file' or 'dir', extension or None). Every distinct path is checked only once, with a
+# single stat, and the directories with the cached scans. Returns the set of the items that are not valid.
+def verify_paths( items ):
+	invalid = set()
+	for item in set( items ):
+		path, kind, ext = item
+		if kind == 'dir':
+			valid = verify_dir_ext( path, ext ) if ext else os.path.isdir( path )
+		else:
+			valid = verify_file_ext( path, ext ) if ext else os.path.isfile( path )
+		if not valid:
+			invalid.add( item )
+	return( invalid )
 
 ##############################################################################################################################
 #
@@ -143,3 +258,51 @@ def delete_files_folders(folder):
         for d in dirs:
             shutil.rmtree(os.path.join(root, d))
 
+
+##############################################################################################################################
+# Reads a wordcount dictionary (TSV file with the unnamed columns 'word', 'count'). Returns a dictionary word -> count.
+def read_wordcount_dict( dict_filename ):
+	import pandas as pd
+	df_dict = pd.read_csv( dict_filename, sep='\t', names = ['word', 'count'], encoding='utf8', dtype = {'word':str, 'count':int} )
+	df_dict = df_dict.fillna('')
+	return( { word: int(count) for word, count in zip( df_dict['word'], df_dict['count'] ) } )
+
+##############################################################################################################################
+# Saves a wordcount dictionary (word -> count) as a TSV file
+def write_wordcount_dict( dict_filename, dictionary ):
+	dict_text = ""
+	for key in dictionary.keys():
+		dict_text += key + "\t" + str(dictionary[key]) + "\n"
+	with open( dict_filename, "w+" ) as f:
+		f.write( dict_text )
+
+##############################################################################################################################
+# Saves a list of specimens (one per line)
+def write_specimen_list( pathfilename, specimens ):
+	with open( pathfilename, "w+" ) as f:
+		f.write( "".join( specimen + "\n" for specimen in specimens ) )
+
+##############################################################################################################################
+# Set of the specimens of a table (one specimen per line, its filename in the first field)
+def read_specimen_set( pathfilename, sep = "\t" ):
+	with open( pathfilename, "r" ) as f:
+		return( set( line.split( sep )[0].strip() for line in f if line.strip() != "" ) )
+
+##############################################################################################################################
+# Copies the lines of a table (one specimen per line, its filename in the first field) whose specimen is in the set
+def copy_specimen_lines( src_pathfilename, dst_pathfilename, specimens, sep = "\t" ):
+	with open( src_pathfilename, "r" ) as src, open( dst_pathfilename, "w+" ) as dst:
+		for line in src:
+			if line.split( sep )[0].strip() in specimens:
+				dst.write( line if line.endswith("\n") else line + "\n" )
+
+##############################################################################################################################
+# Lines of a table, as DataFrame.to_csv writes them (without index nor header), indexed by the value of its first column
+def index_table_lines( df, sep ):
+	lines = {}
+	if len(df) == 0:
+		return( lines )
+	text = df.to_csv( sep = sep, index = False, header = False )
+	for key, line in zip( df.iloc[:, 0], text.splitlines( True ) ):
+		lines.setdefault( key, [] ).append( line )
+	return( lines )
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Work queue of the coordinator and worker mode. The coordinator (a simulation
+# 				run with a queue directory) publishes the ready tasks, with their arguments
+# 				already resolved, as JSON files in a shared directory. Workers on the same
+# 				or other nodes (run_worker.py) claim them by renaming the files, execute
+# 				them, and report their exit code, resource usage, and output manifest.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+
+import os, sys, json, time, socket, threading, ntpath
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+
+from humain.constants import *
+from humain.utils import *
+from humain.execution import *
+from humain.state import iteration_state
+from humain.manifest import record_manifest, manifest_summary
+
+# Subdirectories of a work queue: published tasks, claimed tasks (<task>@<worker>.json), results, workers' heartbeats, and partial files
+QUEUE_SUBDIRS = ['pending', 'running', 'done', 'workers', 'tmp']
+
+##############################################################################################################################
+# Creates (if they do not exist) the subdirectories of the work queue
+def create_queue_dirs( queue_dir ):
+	for subdir in QUEUE_SUBDIRS:
+		verify_create_dir( queue_dir + "/" + subdir, 'The work queue directory (' + queue_dir + "/" + subdir + ') could not be created.', None, 95 )
+
+##############################################################################################################################
+# Writes the object as a JSON file of the queue. The file appears complete (it is written in tmp and then renamed).
+def write_queue_file( queue_dir, pathfilename, obj ):
+	tmp_pathfilename = queue_dir + "/tmp/" + ntpath.basename( pathfilename ) + "." + socket.gethostname() + "." + str(os.getpid())
+	with open( tmp_pathfilename, "w+" ) as f:
+		json.dump( obj, f )
+	os.replace( tmp_pathfilename, pathfilename )
+
+##############################################################################################################################
+# Manifest of the outputs of a task: for every output file or directory, whether it exists, and its number of files and bytes
+def output_manifest( paths ):
+	manifest = []
+	for path in paths:
+		n, size = 0, 0
+		if os.path.isfile( path ):
+			n, size = 1, os.path.getsize( path )
+		elif os.path.isdir( path ):
+			for root, dirs, files in os.walk( path ):
+				n += len(files)
+				size += sum( os.path.getsize( os.path.join( root, name ) ) for name in files )
+		manifest.append( { 'path': path, 'exists': os.path.exists( path ), 'files': n, 'bytes': size } )
+	return( manifest )
+
+
+class QueuePool:
+	'Workers of other processes or nodes, reached through a work queue. It has the interface of WorkerPool (submit, wait_any, shutdown).'
+	######################################################################################################################################
+	# Constructor. jobs is the maximum number of tasks of the simulation published at the same time.
+	def __init__(self, queue_dir, jobs = 1):
+		if jobs < 1:
+			print( "\nERROR: The number of jobs must be greater than zero (" + str(jobs) + ").\n" )
+			sys.exit( 96 )
+		create_queue_dirs( queue_dir )
+		self.queue_dir = queue_dir
+		self.jobs = jobs
+		self.futures = {}		# Task id -> Future of its result
+		self.n_tasks = 0
+		self.id_suffix = "-" + socket.gethostname() + "-" + str(os.getpid()) + "-"		# Part of the ids of the tasks of this pool
+		self.poller = None		# Thread that collects the results of the workers
+		self.lock = threading.Lock()
+
+	######################################################################################################################################
+	# Publishes the execution of a script. Returns a Future with the exit code and the resource usage of the execution (including the
+	# worker and the manifest of the output_paths). The workers read the files from the disk, so all the pending files are written first.
+	# With manifest_pathfilename, the worker records the manifest (with the content hashes) of the outputs when the script succeeds.
+	def submit(self, script_filename, args_list, execution_mode, input_paths = None, output_paths = None, manifest_pathfilename = None):
+		iteration_state.flush()
+		self.n_tasks += 1
+		task_id = str(time.time_ns()) + self.id_suffix + str(self.n_tasks)
+		task = { 'id': task_id, 'script': script_filename, 'args': list(args_list), 'mode': execution_mode, 'outputs': list(output_paths or []),
+			'seed': os.environ.get( SEED_ENV ), 'selection': os.environ.get( SELECTION_ENV ), 'manifest': manifest_pathfilename }
+
+		future = Future()
+		with self.lock:
+			self.futures[ task_id ] = future
+			write_queue_file( self.queue_dir, self.queue_dir + "/pending/" + task_id + ".json", task )
+			if self.poller is None:
+				self.poller = threading.Thread( target = self.poll, daemon = True )
+				self.poller.start()
+		return( future )
+
+	######################################################################################################################################
+	# Collects the results of the published tasks, until there are no tasks waiting for their result. The results of the tasks of this
+	# pool that are not waited for anymore (e.g. executed again after they were published again) are removed.
+	def poll(self):
+		while True:
+			with self.lock:
+				if len(self.futures) == 0:
+					self.poller = None
+					return
+				task_ids = list(self.futures)
+			finished = set( name[:-5] for name in os.listdir( self.queue_dir + "/done" ) if name.endswith(".json") )
+			for task_id in finished:
+				if (self.id_suffix in task_id) and not (task_id in task_ids):
+					try:
+						os.remove( self.queue_dir + "/done/" + task_id + ".json" )
+					except OSError:
+						pass
+			for task_id in task_ids:
+				if task_id in finished:
+					done_pathfilename = self.queue_dir + "/done/" + task_id + ".json"
+					with open( done_pathfilename, "r" ) as f:
+						result = json.load( f )
+					os.remove( done_pathfilename )
+					usage = result['usage']
+					usage['worker'] = result['worker']
+					usage['output_manifest'] = result['outputs']
+					with self.lock:
+						future = self.futures.pop( task_id )
+					future.set_result( (result['returncode'], usage) )
+			self.requeue_lost_tasks()
+			time.sleep( QUEUE_POLL_INTERVAL )
+
+	######################################################################################################################################
+	# Publishes again the tasks claimed by workers that stopped sending their heartbeat (e.g. the node failed)
+	def requeue_lost_tasks(self):
+		now = time.time()
+		for name in os.listdir( self.queue_dir + "/running" ):
+			task_id, worker_id = name[:-5].split('@', 1)
+			if not (task_id in self.futures):
+				continue
+			try:
+				alive = ( now - os.path.getmtime( self.queue_dir + "/workers/" + worker_id ) ) < WORKER_TIMEOUT
+			except OSError:
+				alive = False
+			if not alive:
+				try:
+					os.rename( self.queue_dir + "/running/" + name, self.queue_dir + "/pending/" + task_id + ".json" )
+				except OSError:
+					pass
+
+	######################################################################################################################################
+	# Waits until at least one of the futures finishes. Returns the set of finished futures.
+	def wait_any(self, futures):
+		done, not_done = wait( futures, return_when = FIRST_COMPLETED )
+		return( done )
+
+	######################################################################################################################################
+	# Waits for the published tasks
+	def shutdown(self):
+		with self.lock:
+			futures = list( self.futures.values() )
+		wait( futures )
+
+
+class QueueWorker:
+	'Process that executes the tasks published in a work queue'
+	######################################################################################################################################
+	# Constructor
+	def __init__(self, queue_dir):
+		create_queue_dirs( queue_dir )
+		self.queue_dir = queue_dir
+		self.worker_id = socket.gethostname() + "-" + str(os.getpid())
+		self.heartbeat_pathfilename = queue_dir + "/workers/" + self.worker_id
+		self.stopped = threading.Event()
+
+	######################################################################################################################################
+	# Updates the heartbeat file of the worker every WORKER_HEARTBEAT seconds, until the worker stops. An error (e.g. of a network file
+	# system) does not stop the heartbeat: it is reported, and the file is updated (or created again) in the next beat.
+	def heartbeat(self):
+		while not self.stopped.wait( WORKER_HEARTBEAT ):
+			try:
+				open( self.heartbeat_pathfilename, "a" ).close()
+				os.utime( self.heartbeat_pathfilename )
+			except OSError as e:
+				print( "\nWARNING: The heartbeat of the worker " + self.worker_id + " could not be updated (" + str(e) + ").\n", file = sys.stderr )
+
+	######################################################################################################################################
+	# Claims the oldest published task (only one worker can rename its file). Returns (task, claimed file), or (None, None) if there are none.
+	def claim(self):
+		for name in sorted( os.listdir( self.queue_dir + "/pending" ) ):
+			if not name.endswith(".json"):
+				continue
+			running_pathfilename = self.queue_dir + "/running/" + name[:-5] + "@" + self.worker_id + ".json"
+			try:
+				os.rename( self.queue_dir + "/pending/" + name, running_pathfilename )
+			except OSError:
+				continue
+			with open( running_pathfilename, "r" ) as f:
+				return( json.load( f ), running_pathfilename )
+		return( None, None )
+
+	######################################################################################################################################
+	# Takes back, before publishing its result, a task claimed by the worker (the coordinator publishes it again when the heartbeat of
+	# the worker is late). Returns the file taken (in tmp), or None if the task was claimed again by another worker, whose result counts.
+	def finish(self, task, running_pathfilename):
+		finished_pathfilename = self.queue_dir + "/tmp/" + task['id'] + "@" + self.worker_id + ".finished"
+		for pathfilename in [ running_pathfilename, self.queue_dir + "/pending/" + task['id'] + ".json" ]:
+			try:
+				os.rename( pathfilename, finished_pathfilename )
+				return( finished_pathfilename )
+			except OSError:
+				continue
+		return( None )
+
+	######################################################################################################################################
+	# Executes a task. The in-memory state of the previous tasks is discarded (they may belong to other simulations).
+	def execute(self, task):
+		iteration_state.start()
+		if task.get('seed') is None:
+			os.environ.pop( SEED_ENV, None )
+		else:
+			os.environ[ SEED_ENV ] = task['seed']
+		if task.get('selection') is None:
+			os.environ.pop( SELECTION_ENV, None )
+		else:
+			os.environ[ SELECTION_ENV ] = task['selection']
+		returncode, usage = run_script_measured( task['script'], task['args'], task['mode'] )
+		iteration_state.flush()
+		if returncode == 0 and task.get('manifest'):
+			outputs = manifest_summary( record_manifest( task['manifest'], task['outputs'] ) )
+		else:
+			outputs = output_manifest( task['outputs'] )
+		return( { 'id': task['id'], 'worker': self.worker_id, 'returncode': returncode, 'usage': usage, 'outputs': outputs } )
+
+	######################################################################################################################################
+	# Executes the published tasks until no task is published during idle_timeout seconds (forever if None). Returns the number of tasks executed.
+	def run(self, idle_timeout = None):
+		# The heartbeat file exists before the first task is claimed
+		open( self.heartbeat_pathfilename, "a" ).close()
+		threading.Thread( target = self.heartbeat, daemon = True ).start()
+		n_tasks = 0
+		idle_since = time.time()
+		try:
+			while True:
+				task, running_pathfilename = self.claim()
+				if task is None:
+					if (not (idle_timeout is None)) and (time.time() - idle_since) > idle_timeout:
+						break
+					time.sleep( QUEUE_POLL_INTERVAL )
+					continue
+				result = self.execute( task )
+				finished_pathfilename = self.finish( task, running_pathfilename )
+				if not (finished_pathfilename is None):
+					write_queue_file( self.queue_dir, self.queue_dir + "/done/" + task['id'] + ".json", result )
+					os.remove( finished_pathfilename )
+				n_tasks += 1
+				idle_since = time.time()
+		finally:
+			self.stopped.set()
+			if os.path.isfile( self.heartbeat_pathfilename ):
+				os.remove( self.heartbeat_pathfilename )
+		return( n_tasks )
+
+
+##############################################################################################################################
+# Runs a worker of the queue (e.g. in a process of run_worker.py). Returns the number of tasks executed.
+def run_queue_worker( queue_dir, idle_timeout = None ):
+	return( QueueWorker( queue_dir ).run( idle_timeout ) )
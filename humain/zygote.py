@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+##########################################################################################
+# Developers: 	Icaro Alzuru and Aditi Malladi
+# Project: 		HuMaIN (http://humain.acis.ufl.edu)
+# Description: 	Zygote execution mode. The engine starts (once) a zygote process that
+# 				imports the heavy libraries (ZYGOTE_MODULES) and the scripts of the tasks,
+# 				and forks a child for every execution, so the tasks start with warm
+# 				imports while they keep the isolation and the exit codes of a subprocess.
+##########################################################################################
+# Copyright 2019    Advanced Computing and Information Systems (ACIS) Lab - UF
+#                   (https://www.acis.ufl.edu/)
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file
+# except in compliance with the License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the
+# License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+##########################################################################################
+
+import os, sys, json, time, socket, signal, selectors, tempfile, shutil, subprocess, threading, traceback, atexit, runpy, importlib
+
+from humain.constants import *
+from humain.execution import *
+
+##############################################################################################################################
+# True if the script is run by the Python interpreter (.py extension or python in its shebang line)
+def is_python_script( script_filename ):
+	if script_filename.endswith(".py"):
+		return( True )
+	try:
+		with open( script_filename, "rb" ) as f:
+			first_line = f.readline( 256 )
+	except OSError:
+		return( False )
+	return( first_line.startswith( b"#!" ) and (b"python" in first_line) )
+
+##############################################################################################################################
+# Executes a task in the forked child, with the working directory and environment of the engine. The scripts with a main( argv )
+# function (imported by the zygote) are called directly, the other Python scripts are run as __main__, and the rest are executed.
+# Returns the exit code.
+def run_child( request ):
+	script_filename, args_list = request['script'], request['args']
+	try:
+		os.chdir( request['cwd'] )
+		os.environ.clear()
+		os.environ.update( request['env'] )
+		sys.argv = [ script_filename ] + args_list
+		if not is_python_script( script_filename ):
+			os.execv( script_filename, sys.argv )
+		if script_filename in loaded_modules:
+			return( run_in_process( script_filename, args_list ) )
+		try:
+			runpy.run_path( script_filename, run_name = "__main__" )
+		except SystemExit as e:
+			return( exit_code( e.code ) )
+	except BaseException:
+		traceback.print_exc()
+		return( 1 )
+	return( 0 )
+
+##############################################################################################################################
+# Imports the script in the zygote, so its children start with its imports done. Only the scripts whose code is protected by
+# if __name__ == '__main__' are imported (the others would execute their task in the zygote).
+def preload_script( script_filename ):
+	try:
+		with open( script_filename, "r" ) as f:
+			source = f.read()
+	except (OSError, ValueError):
+		return
+	if ("__name__" in source) and ("__main__" in source):
+		try:
+			supports_in_process( script_filename )
+		except SystemExit:
+			pass
+
+
+class ZygoteServer:
+	'Zygote process: it receives the executions through a Unix socket (one connection per execution) and forks a child for each one'
+	######################################################################################################################################
+	# Constructor. The modules are imported before the socket is created, so the engine waits only once for them.
+	def __init__(self, socket_pathfilename):
+		for module_name in ZYGOTE_MODULES:
+			try:
+				importlib.import_module( module_name )
+			except ImportError:
+				pass
+
+		# The socket is created with a temporary name: it exists with its final name only when the zygote is ready
+		self.server = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+		self.server.bind( socket_pathfilename + ".tmp" )
+		self.server.listen( 64 )
+		os.rename( socket_pathfilename + ".tmp", socket_pathfilename )
+
+		# The finished children wake up the main loop through a pipe (SIGCHLD)
+		self.wakeup_r, self.wakeup_w = os.pipe()
+		os.set_blocking( self.wakeup_r, False )
+		os.set_blocking( self.wakeup_w, False )
+		signal.set_wakeup_fd( self.wakeup_w )
+		signal.signal( signal.SIGCHLD, lambda signum, frame: None )
+
+		self.selector = selectors.DefaultSelector()
+		self.selector.register( self.server, selectors.EVENT_READ )
+		self.selector.register( self.wakeup_r, selectors.EVENT_READ )
+		self.children = {}		# pid -> (connection, start time in ns)
+		self.parent_pid = os.getppid()
+
+	######################################################################################################################################
+	# Reads the request of a new connection and forks the child that executes it. The Python scripts are imported first by the
+	# zygote (once).
+	def start_child(self):
+		connection, address = self.server.accept()
+		with connection.makefile("r") as f:
+			request = json.loads( f.readline() )
+		if is_python_script( request['script'] ) and not (request['script'] in loaded_modules):
+			preload_script( request['script'] )
+
+		start_ns = time.time_ns()
+		pid = os.fork()
+		if pid == 0:
+			signal.set_wakeup_fd( -1 )
+			signal.signal( signal.SIGCHLD, signal.SIG_DFL )
+			signal.signal( signal.SIGTERM, signal.SIG_DFL )
+			self.selector.close()
+			self.server.close()
+			connection.close()
+			os.close( self.wakeup_r )
+			os.close( self.wakeup_w )
+			returncode = run_child( request )
+			sys.stdout.flush()
+			sys.stderr.flush()
+			os._exit( returncode & 0xFF )
+		self.children[ pid ] = ( connection, start_ns )
+
+	######################################################################################################################################
+	# Reaps the finished children (after reading their /proc/<pid>/io) and sends their exit code and resource usage to the engine
+	def reap_children(self):
+		while len(self.children) > 0:
+			info = os.waitid( os.P_ALL, 0, os.WEXITED | os.WNOHANG | os.WNOWAIT )
+			if (info is None) or (info.si_pid == 0):
+				return
+			io = read_proc_io( info.si_pid )
+			pid, status, ru = os.wait4( info.si_pid, 0 )
+			if not (pid in self.children):
+				continue
+			connection, start_ns = self.children.pop( pid )
+			usage = usage_record( start_ns, time.time_ns(), (ru.ru_utime, ru.ru_stime, ru.ru_maxrss), None, io )
+			try:
+				connection.sendall( (json.dumps( { 'returncode': os.waitstatus_to_exitcode( status ), 'usage': usage } ) + "\n").encode('utf8') )
+			except OSError:
+				pass
+			connection.close()
+
+	######################################################################################################################################
+	# Serves the executions until the engine finishes
+	def serve(self):
+		while os.getppid() == self.parent_pid:
+			for key, mask in self.selector.select( timeout = 1.0 ):
+				if key.fileobj is self.server:
+					self.start_child()
+				else:
+					try:
+						while os.read( self.wakeup_r, 4096 ):
+							pass
+					except BlockingIOError:
+						pass
+			self.reap_children()
+
+
+class Zygote:
+	'Client of the zygote process of the engine'
+	######################################################################################################################################
+	# Constructor. Starts the zygote process and waits until it is ready.
+	def __init__(self):
+		self.owner_pid = os.getpid()
+		self.socket_dir = tempfile.mkdtemp( prefix = "humain_zygote_" )
+		self.socket_pathfilename = self.socket_dir + "/zygote.sock"
+
+		# The zygote imports the simulator's package from the same directory as the engine
+		env = dict( os.environ )
+		package_dir = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+		env['PYTHONPATH'] = package_dir + ( os.pathsep + env['PYTHONPATH'] if env.get('PYTHONPATH') else "" )
+		self.process = subprocess.Popen( args = [ sys.executable, "-m", "humain.zygote", self.socket_pathfilename ], env = env )
+
+		deadline = time.time() + ZYGOTE_START_TIMEOUT
+		while not os.path.exists( self.socket_pathfilename ):
+			if (self.process.poll() is not None) or (time.time() > deadline):
+				self.stop()
+				print( "\nERROR: The zygote process could not be started.\n" )
+				sys.exit( 110 )
+			time.sleep( 0.01 )
+
+	######################################################################################################################################
+	# Executes the script in a child of the zygote. Returns (exit code, usage).
+	def run(self, script_filename, args_list):
+		request = { 'script': script_filename, 'args': list(args_list), 'cwd': os.getcwd(), 'env': dict( os.environ ) }
+		try:
+			with socket.socket( socket.AF_UNIX, socket.SOCK_STREAM ) as connection:
+				connection.connect( self.socket_pathfilename )
+				connection.sendall( (json.dumps( request ) + "\n").encode('utf8') )
+				with connection.makefile("r") as f:
+					result = json.loads( f.readline() )
+		except (OSError, ValueError):
+			print( "\nERROR: The zygote process finished unexpectedly while executing " + script_filename + ".\n" )
+			sys.exit( 111 )
+		return( result['returncode'], result['usage'] )
+
+	######################################################################################################################################
+	# Finishes the zygote process (only the process that started it)
+	def stop(self):
+		if os.getpid() != self.owner_pid:
+			return
+		if self.process.poll() is None:
+			self.process.terminate()
+			self.process.wait()
+		shutil.rmtree( self.socket_dir, ignore_errors = True )
+
+
+# Zygote of the current process, started with its first execution
+zygote = None
+zygote_lock = threading.Lock()
+
+##############################################################################################################################
+# Executes the script in a child of the zygote (started the first time). Returns (exit code, usage).
+def run_zygote_measured( script_filename, args_list ):
+	global zygote
+	with zygote_lock:
+		if (zygote is None) or (zygote.process.poll() is not None):
+			zygote = Zygote()
+			atexit.register( zygote.stop )
+	return( zygote.run( script_filename, args_list ) )
+
+##############################################################################################################################
+# Executes the script in a child of the zygote. Returns the exit code.
+def run_zygote( script_filename, args_list ):
+	return( run_zygote_measured( script_filename, args_list )[0] )
+
+
+if __name__ == '__main__':
+	""" Zygote process of the engine (started by the Zygote class): python3 -m humain.zygote <socket path>
+	"""
+	signal.signal( signal.SIGTERM, lambda signum, frame: sys.exit( 0 ) )
+	ZygoteServer( sys.argv[1] ).serve()
@@ -20,20 +20,23 @@
 
 import argparse
 import pandas as pd
+from contextlib import ExitStack
 
 from humain.constants import *
 from humain.utils import *
+from humain.store import *
+from humain.specimen_ids import specimen_registry, merge_specimens
 
 
-if __name__ == '__main__':
-	""" Simulates the execution of the consensus algorithm to determine the final value among the crowdsourced values for each image.
+def parse_arguments( argv ):
+	""" Parses and validates the arguments of the task (the outputs are created).
 	"""
 	parser = argparse.ArgumentParser("Simulates the execution of the consensus algorithm to determine the final value among the crowdsourced values for each image.")
 	parser.add_argument('-cr', '--crowd_file', action="store", required=True, help="Reference tsv file with the values transcribed by the volunteers.")
 	parser.add_argument('-co', '--consensus_dir', action="store", required=True, help="Directory where the accepted (consensus reached) and rejected specimens (unknown) are saved.")
 	parser.add_argument('-m', '--metric', action="append", required=True, help="One or more metrics that will be collected during the consensus execution.")
 	parser.add_argument('-o', '--output_dir', action="store", required=True, help="Directory where the accepted and rejected transcriptions will be stored.")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 
 	# Usage:
 	# python3 ./consensus.py -cr ~/Summer2019/HuMaIN_Simulator/selfie/results/scientific_name/sn_crowd/sn_crowd.tsv -co ~/Summer2019/HuMaIN_Simulator/datasets/aocr_mix100/sn_consensus -m duration -o ~/Summer2019/HuMaIN_Simulator/selfie/results/scientific_name/sn_consensus
@@ -85,25 +88,34 @@ if __name__ == '__main__':
 	verify_create_dir( args.output_dir + "/accepted/metrics", 'The output metrics directory for the accepted values could not be created.', parser, 17 )
 	verify_create_dir( args.output_dir + "/rejected/metrics", 'The output metrics directory for the rejected specimens could not be created.', parser, 18 )
 
+	return( args, cons_accepted_file, cons_rejected_file, metrics_dir_accepted, metrics_dir_rejected, output_accepted_file, output_rejected_file )
+
+def main( argv = None ):
+	""" Simulates the execution of the consensus algorithm to determine the final value among the crowdsourced values for each image.
+	"""
+	args, cons_accepted_file, cons_rejected_file, metrics_dir_accepted, metrics_dir_rejected, output_accepted_file, output_rejected_file = parse_arguments( argv )
+
 	################################################################################################################################
 	# Read the specimens files rejected during the suffix extraction task
 	df_s = pd.read_csv( args.crowd_file, sep='\t', names=['filename','value1','value2','value3'] )
 	df_s = df_s.fillna('')
 
 	df_files = df_s['filename']
+	# The tables are joined on the integer IDs of their specimens
+	registry = specimen_registry( args.consensus_dir )
 	################################################################################################################################
-	# Load the values extracted through consensus
-	df_a = pd.read_csv( cons_accepted_file, sep='\t', names=['filename', 'final_value'] )
+	# Load the values extracted through consensus (only of the specimens of the crowdsourced data)
+	df_a = read_table( cons_accepted_file, specimens=df_files, sep='\t', names=['filename', 'final_value'], dtype=str )
 	df_a = df_a.fillna('')
 
-	df_accepted = pd.merge(df_files, df_a, on='filename')
+	df_accepted = merge_specimens( registry, df_files, df_a )
 	df_accepted.to_csv(output_accepted_file, sep='\t', index=False, header=False)
 	################################################################################################################################
 	# Load the specimens (filenames) for which no value could be extracted using consensus
-	df_r = pd.read_csv( cons_rejected_file, sep='\t', names=['filename'] )
+	df_r = read_table( cons_rejected_file, specimens=df_files, sep='\t', names=['filename'], dtype=str )
 	df_r = df_r.fillna('')
 
-	df_rejected = pd.merge(df_files, df_r, on='filename')
+	df_rejected = merge_specimens( registry, df_files, df_r )
 	df_rejected.to_csv(output_rejected_file, sep='\t', index=False, header=False)
 	################################################################################################################################
 
@@ -118,12 +130,50 @@ if __name__ == '__main__':
 		output_metric_file_rejected = args.output_dir + "/rejected/metrics/" + m_name + ".csv"
 
 		# Accepted metric file
-		df_am = pd.read_csv( input_metric_file_accepted, sep=',', names=['filename', 'value'] )
-		df_accepted_m = pd.merge(df_files, df_am, on='filename')
+		df_am = read_table( input_metric_file_accepted, sep=',', names=['filename', 'value'] )
+		df_accepted_m = merge_specimens( registry, df_files, df_am )
 		df_accepted_m.to_csv(output_metric_file_accepted, sep=',', index=False, header=False)
 		# Rejected metric file
-		df_rm = pd.read_csv( input_metric_file_rejected, sep=',', names=['filename', 'value'] )
-		df_rejected_m = pd.merge(df_files, df_rm, on='filename')
+		df_rm = read_table( input_metric_file_rejected, sep=',', names=['filename', 'value'] )
+		df_rejected_m = merge_specimens( registry, df_files, df_rm )
 		df_rejected_m.to_csv(output_metric_file_rejected, sep=',', index=False, header=False)
 
 	sys.exit(0)
+
+def stream( argv ):
+	""" Streaming version of the task: gets the consensus of the specimens sent to the generator, one at a time, and yields the
+	    outputs where each one was saved.
+	"""
+	args, cons_accepted_file, cons_rejected_file, metrics_dir_accepted, metrics_dir_rejected, output_accepted_file, output_rejected_file = parse_arguments( argv )
+	df_a = read_table( cons_accepted_file, sep='\t', names=['filename', 'final_value'] )
+	accepted_lines = index_table_lines( df_a.fillna(''), '\t' )
+	df_r = read_table( cons_rejected_file, sep='\t', names=['filename'] )
+	rejected_lines = index_table_lines( df_r.fillna(''), '\t' )
+	metric_lines = {}		# (metric, accepted) -> filename -> lines
+	for m_name in args.metric:
+		metric_lines[ (m_name, True) ] = index_table_lines( read_table( metrics_dir_accepted + "/" + m_name + ".csv", sep=',', names=['filename', 'value'] ), ',' )
+		metric_lines[ (m_name, False) ] = index_table_lines( read_table( metrics_dir_rejected + "/" + m_name + ".csv", sep=',', names=['filename', 'value'] ), ',' )
+
+	with ExitStack() as stack:
+		f_a = stack.enter_context( open( output_accepted_file, "w+" ) )
+		f_r = stack.enter_context( open( output_rejected_file, "w+" ) )
+		f_metrics = {}
+		for m_name in args.metric:
+			f_metrics[ (m_name, True) ] = stack.enter_context( open( args.output_dir + "/accepted/metrics/" + m_name + ".csv", "w+" ) )
+			f_metrics[ (m_name, False) ] = stack.enter_context( open( args.output_dir + "/rejected/metrics/" + m_name + ".csv", "w+" ) )
+		outputs = []
+		while True:
+			filename = yield outputs
+			outputs = []
+			if filename in accepted_lines:
+				f_a.write( "".join( accepted_lines[ filename ] ) )
+				outputs.append( output_accepted_file )
+			if filename in rejected_lines:
+				f_r.write( "".join( rejected_lines[ filename ] ) )
+				outputs.append( output_rejected_file )
+			for key, f_m in f_metrics.items():
+				f_m.write( "".join( metric_lines[ key ].get( filename, [] ) ) )
+
+
+if __name__ == '__main__':
+	main()
@@ -23,16 +23,17 @@ import pandas as pd
 
 from humain.constants import *
 from humain.utils import *
+from humain.state import iteration_state
 
 ##############################################################################################################################################################
-if __name__ == '__main__':
+def main( argv = None ):
 	""" Creates or augments a wordcount dictionary (eliminating all the special characters) from some TSV (specimen, value) file.
 	""" 
 	# Read arguments
 	parser = argparse.ArgumentParser("Creates or augments a wordcount dictionary (eliminating all the special characters) from some TSV (specimen, value) file.")
 	parser.add_argument('-i','--data_file',action="store", required=True, help="Input TSV file with the unnamed columns: 'specimen', 'value'.")
 	parser.add_argument('-o','--dict_file',action="store", required=True, help="Name of the TSV dictionary file to generate. Unnamed columns: 'value', 'frequency'.")	
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 	
 	# Usage example:
 	# python3 created_dict.py -i ~/Fall2019/HuMaIN_Simulator/selfie/results/recorded_by_hitl/iteration_1/consensus/accepted/accepted.tsv -o ~/Fall2019/HuMaIN_Simulator/selfie/results/recorded_by_hitl/iteration_1/create_dict/dictionary.tsv
@@ -67,15 +68,13 @@ if __name__ == '__main__':
 		sys.exit(6)
 
 	##########################################################################################
-	# LOADS THE PREVIOUS DICTIONARY (IF EXISTS)
+	# LOADS THE PREVIOUS DICTIONARY (IF EXISTS). In-process, it is kept in memory from the previous iteration.
 	dictionary = {}
 	if iteration_number > 1:
-		previous_dict_file = args.dict_file.replace( "iteration_" + str(iteration_number-1), "iteration_" + str(iteration_number) )
+		previous_dict_file = args.dict_file.replace( "iteration_" + str(iteration_number), "iteration_" + str(iteration_number-1) )
+		iteration_state.flush( [ previous_dict_file ] )
 		verify_file( previous_dict_file, 'The previous dictionary file could not be read (' + previous_dict_file + ').', None, 7 )
-		df_dict = pd.read_csv( previous_dict_file, sep='\t', names = ['word', 'count'], encoding='utf8', dtype = {'word':str, 'count':int} )
-		df_dict = df_dict.fillna('')
-		for index, row in df_dict.iterrows():
-			dictionary[ row['word'] ] = int(row['count'])
+		dictionary = dict( iteration_state.get( previous_dict_file, read_wordcount_dict ) )
 
 	##########################################################################################
 	# Read the values from the input file
@@ -99,10 +98,9 @@ if __name__ == '__main__':
 			dictionary[ value ] = 1
 
 	##########################################################################################
-	# Save the dictionary to disk
-	dict_text = ""
-	for key in dictionary.keys():
-		dict_text += key + "\t" + str(dictionary[key]) + "\n"
-	#
-	with open(args.dict_file, "w+") as f:
-		f.write( dict_text )
+	# Save the dictionary (to disk in background, if the iteration state is asynchronous)
+	iteration_state.put( args.dict_file, dictionary, write_wordcount_dict )
+
+
+if __name__ == '__main__':
+	main()
@@ -23,14 +23,14 @@ from shutil import copyfile
 from humain.constants import *
 from humain.utils import *
 
-if __name__ == '__main__':
+def main( argv = None ):
 	""" Simulates the creation of a dictionary from a data file
 	"""
 	parser = argparse.ArgumentParser("Simulates the creation of a dictionary from a data file.")
 	parser.add_argument('-a', '--accepted_file', action="store", required=True, help="File of accepted values (.tsv)")
 	parser.add_argument('-d', '--dict_file', action="store", required=True, help="Dictionary already created from the values in the accepted file.")
 	parser.add_argument('-o', '--output_file', action="store", required=True, help="Output file where the values with their repetition count will be saved.")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 
 	# Usage:
 	# python3 rb_create_dict.py -a ~/Fall2019/HuMaIN_Simulator/selfie/results/recorded_by/consensus/accepted/accepted.tsv -d ~/Fall2019/HuMaIN_Simulator/datasets/aocr_mix100/consensus/recorded_by/accepted/dict_recorded_by.tsv -o ~/Fall2019/HuMaIN_Simulator/selfie/results/recorded_by/rb_create_dict/dictionary.tsv
@@ -62,3 +62,7 @@ if __name__ == '__main__':
 		exit(6)
 
 	sys.exit(0)
+
+
+if __name__ == '__main__':
+	main()
@@ -19,20 +19,27 @@
 ##########################################################################################
 
 import argparse, shutil
-import pandas as pd
+from contextlib import ExitStack
 
 from humain.constants import *
 from humain.utils import *
+from humain.store import *
+from humain.specimen_ids import specimen_registry
 
-if __name__ == '__main__':
-	""" Gets the simulated results of the crowdsourced transcription of a term. Three different users processed every image.
+# Columns of the crowdsourced data and of its metrics used by the task
+CROWD_COLUMNS = ['filename', 'value1', 'value2', 'value3']
+METRIC_COLUMNS = ['filename', 'sec1', 'sec2', 'sec3']
+
+
+def parse_arguments( argv ):
+	""" Parses and validates the arguments of the task (the outputs are created).
 	"""
 	parser = argparse.ArgumentParser("Gets the simulated results of the crowdsourced transcription of a term. Three different users processed every image.")
 	parser.add_argument('-s', '--specimens', action="store", required=True, help="Text file with the list of specimens to be crowdsourced.")
 	parser.add_argument('-f', '--crowd_data', action="store", required=True, help="TSV file with the crowdsourced data from the volunteers.")
 	parser.add_argument('-m', '--metric', action="append", required=True, help="One or more metrics that will be collected when executing the crowdsourcing.")
 	parser.add_argument('-o', '--output_file', action="store", required=True, help="TSV with the transcription made by the volunteers for the specified list of specimens.")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 
 	# Usage example: 
 	# python3 crowdsource.py -s ~/Fall2019/HuMaIN_Simulator/datasets/aocr_mix100/specimen_list.txt -f ~/Fall2019/HuMaIN_Simulator/datasets/aocr_mix100/crowd/terms/zooniverse/recorded_by.tsv -m duration -o ~/Fall2019/HuMaIN_Simulator/selfie/results/recorded_by/crowdsource/recorded_by.tsv
@@ -65,6 +72,13 @@ if __name__ == '__main__':
 	output_metrics_dir = output_dir + "/metrics"
 	verify_create_dir( output_metrics_dir, 'The output directory for the metric values could not be created (' + output_metrics_dir + ').', parser, 7 )
 
+	return( args, input_metrics_dir, output_metrics_dir )
+
+def main( argv = None ):
+	""" Gets the simulated results of the crowdsourced transcription of a term. Three different users processed every image.
+	"""
+	args, input_metrics_dir, output_metrics_dir = parse_arguments( argv )
+
 	################################################################################################################################
 	# Load in a list the specimens that need to be processed
 	specimens_list = []
@@ -73,16 +87,19 @@ if __name__ == '__main__':
 			specimens_list.append( line[:-1].strip() )
 	
 	################################################################################################################################
-	# Load in a dataframe the crowdsourced data
-	df_crowd = pd.read_csv( args.crowd_data, sep='\t' )
+	# Load in a dataframe the crowdsourced data of the selected specimens (values as text, as in the whole table)
+	df_crowd = read_table( args.crowd_data, specimens=specimens_list, columns=CROWD_COLUMNS, sep='\t', dtype=str )
 	df_crowd = df_crowd.fillna('')
 
+	# The rows are selected with the integer IDs of their specimens
+	registry = specimen_registry( args.crowd_data )
+
 	################################################################################################################################
 	# Copy the crowdsourced data for the selected specimens and create a tsv file with this data
-	crowd_data_string = ""
-	for index, row in df_crowd.iterrows():
-		if row['filename'] in specimens_list:
-			crowd_data_string += row['filename'] + "\t" + row['value1'] + "\t" + row['value2'] + "\t" + row['value3'] + "\n"
+	selected = registry.isin( df_crowd['filename'].tolist(), specimens_list )
+	df_crowd = df_crowd[ selected ]
+	crowd_data_string = "".join( filename + "\t" + value1 + "\t" + value2 + "\t" + value3 + "\n"
+		for filename, value1, value2, value3 in zip( df_crowd['filename'], df_crowd['value1'], df_crowd['value2'], df_crowd['value3'] ) )
 
 	with open( args.output_file, "w+" ) as f_out:
 		f_out.write( crowd_data_string )
@@ -93,16 +110,51 @@ if __name__ == '__main__':
 		basename = args.crowd_data.split('/')[-1].split('.')[0]
 		metric_file = input_metrics_dir + "/" + basename + "_" + m_name + ".csv"
 		# Dataframe of the metric file
-		df_in_me = pd.read_csv( metric_file )
+		df_in_me = read_table( metric_file, columns=METRIC_COLUMNS )
 		df_in_me = df_in_me.fillna('')
 
-		metric_string = ""
-		for index, row in df_in_me.iterrows():
-			if row['filename'] in specimens_list:
-				metric_string += row['filename'] + "," + str(row['sec1']) + "," + str(row['sec2']) + "," + str(row['sec3']) + "\n"
+		df_in_me = df_in_me[ registry.isin( df_in_me['filename'].tolist(), specimens_list ) ]
+		metric_string = "".join( filename + "," + str(sec1) + "," + str(sec2) + "," + str(sec3) + "\n"
+			for filename, sec1, sec2, sec3 in zip( df_in_me['filename'], df_in_me['sec1'].tolist(), df_in_me['sec2'].tolist(), df_in_me['sec3'].tolist() ) )
 
 		output_metric_filename = output_metrics_dir + "/" + m_name + ".csv"
 		with open( output_metric_filename, "w+" ) as f_m:
 			f_m.write( metric_string )
 
-	sys.exit(0)		
+	sys.exit(0)
+
+def stream( argv ):
+	""" Streaming version of the task: gets the crowdsourced data of the specimens sent to the generator, one at a time, and yields
+	    the outputs where each one was saved.
+	"""
+	args, input_metrics_dir, output_metrics_dir = parse_arguments( argv )
+	df_crowd = read_table( args.crowd_data, columns=CROWD_COLUMNS, sep='\t' )
+	df_crowd = df_crowd.fillna('')
+	crowd_lines = {}
+	for index, row in df_crowd.iterrows():
+		crowd_lines.setdefault( row['filename'], [] ).append( row['filename'] + "\t" + row['value1'] + "\t" + row['value2'] + "\t" + row['value3'] + "\n" )
+	metric_lines = {}		# metric -> filename -> lines
+	basename = args.crowd_data.split('/')[-1].split('.')[0]
+	for m_name in args.metric:
+		df_in_me = read_table( input_metrics_dir + "/" + basename + "_" + m_name + ".csv", columns=METRIC_COLUMNS )
+		df_in_me = df_in_me.fillna('')
+		metric_lines[ m_name ] = {}
+		for index, row in df_in_me.iterrows():
+			metric_lines[ m_name ].setdefault( row['filename'], [] ).append( row['filename'] + "," + str(row['sec1']) + "," + str(row['sec2']) + "," + str(row['sec3']) + "\n" )
+
+	with ExitStack() as stack:
+		f_out = stack.enter_context( open( args.output_file, "w+" ) )
+		f_metrics = { m_name: stack.enter_context( open( output_metrics_dir + "/" + m_name + ".csv", "w+" ) ) for m_name in args.metric }
+		outputs = []
+		while True:
+			filename = yield outputs
+			outputs = []
+			if filename in crowd_lines:
+				f_out.write( "".join( crowd_lines[ filename ] ) )
+				outputs = [ args.output_file ]
+			for m_name in args.metric:
+				f_metrics[ m_name ].write( "".join( metric_lines[ m_name ].get( filename, [] ) ) )
+
+
+if __name__ == '__main__':
+	main()
@@ -18,21 +18,23 @@
 ##########################################################################################
 
 import argparse, shutil
-import pandas as pd
+from contextlib import ExitStack
 
 from humain.constants import *
 from humain.utils import *
+from humain.store import *
+from humain.specimen_ids import specimen_registry
 
 
-if __name__ == '__main__':
-	""" Simulated version of the regular expression Event Date extraction
+def parse_arguments( argv ):
+	""" Parses and validates the arguments of the task (the outputs are created).
 	"""
 	parser = argparse.ArgumentParser("Run the simulated version of the regular expression Event Date extraction.")
 	parser.add_argument('-d', '--fulltext_dir', action="store", required=True, help="Directory with the fulltext transcription files of the images.")
 	parser.add_argument('-f', '--regexp_file', action="store", required=True, help="File with the correspondent Event Date extracted using the regular expresion algorithm.")	
 	parser.add_argument('-m', '--metric', action="append", required=False, help="One or more metrics that will be collected when running the regular expression extraction.")
 	parser.add_argument('-o', '--output_dir', action="store", required=True, help="Directory where the accepted and rejected extractions will be stored.")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 
 	# Usage example: 
 	# python3 ed_reg_expr.py -d ~/Summer2019/HuMaIN_Simulator/humain/selfie/results/event_date_001/ocr_ds -f ~/Summer2019/HuMaIN_Simulator/datasets/aocr_insects/reg_exp/gc-ocr/reg_expr.tsv -m duration -o ~/Summer2019/HuMaIN_Simulator/humain/selfie/results/event_date_001/reg_expr_ds
@@ -74,21 +76,27 @@ if __name__ == '__main__':
 	verify_create_dir( args.output_dir + "/accepted/metrics", 'The output metrics directory for the accepted event date values could not be created.', parser, 10 )
 	verify_create_dir( args.output_dir + "/rejected/metrics", 'The output metrics directory for the rejected specimens could not be created.', parser, 11 )
 
+	return( args, metrics_dir, accepted_file, rejected_file )
+
+def main( argv = None ):
+	""" Simulated version of the regular expression Event Date extraction
+	"""
+	args, metrics_dir, accepted_file, rejected_file = parse_arguments( argv )
+
 	################################################################################################################################
 	# BUILD A DATAFRAME WITH THE EXTRACTED EVENT DATE VALUES USING REGULAR EXPRESIONS
-	df = pd.read_csv( args.regexp_file, sep='\t', names=['filename', 'value'] )
+	df = read_table( args.regexp_file, sep='\t', names=['filename', 'value'] )
 	df = df.fillna('')
+	# Only the specimens of the input (selected with the integer IDs of the specimens)
+	registry = specimen_registry( args.regexp_file )
+	specimens = list_files_ext( args.fulltext_dir, 'txt' )
+	df = df[ registry.isin( df['filename'].tolist(), specimens ) ]
 
 	################################################################################################################################
 	# LOAD IN DIFFERENT STRUCTURES THE ACCEPTED (WITH EVENT DATE) AND REJECTED SPECIMENS
-	accepted_dict = {}
-	rejected_list = []
-
-	for index, row in df.iterrows():
-		if row['value'] == '':
-			rejected_list.append( row['filename'] )
-		else:
-			accepted_dict[ row['filename'] ] = row['value']
+	is_rejected = ( df['value'] == '' ).to_numpy()
+	accepted_dict = dict( zip( df['filename'][ ~is_rejected ], df['value'][ ~is_rejected ] ) )
+	rejected_list = df['filename'][ is_rejected ].tolist()
 
 	################################################################################################################################
 	# CREATE THE METRIC FILES
@@ -97,15 +105,13 @@ if __name__ == '__main__':
 	for m_name in args.metric:
 		# Loads the metric values in a dataframe
 		metric_file = metrics_dir + "/" + m_name + ".csv"
-		df_metric = pd.read_csv( metric_file, names=['filename', 'value'] )
-		accepted_txt = ""
-		rejected_txt = ""
+		df_metric = read_table( metric_file, names=['filename', 'value'] )
+		df_metric = df_metric[ registry.isin( df_metric['filename'].tolist(), specimens ) ]
 		# Divide the metric value in Accepted and Rejected
-		for index, row in df_metric.iterrows():
-			if row['filename'] in accepted_dict.keys():
-				accepted_txt += row['filename'] + "," + str(row['value']) + "\n"
-			else:
-				rejected_txt += row['filename'] + "," + str(row['value']) + "\n"
+		is_accepted = registry.isin( df_metric['filename'].tolist(), list( accepted_dict ) )
+		metric_lines = [ filename + "," + str(value) + "\n" for filename, value in zip( df_metric['filename'], df_metric['value'].tolist() ) ]
+		accepted_txt = "".join( line for line, accepted in zip( metric_lines, is_accepted ) if accepted )
+		rejected_txt = "".join( line for line, accepted in zip( metric_lines, is_accepted ) if not accepted )
 
 		# Create and fill the Accepted metric file
 		new_metric_filename = args.output_dir + "/accepted/metrics/" + m_name + ".csv"
@@ -134,3 +140,51 @@ if __name__ == '__main__':
 		f_r.write( rejected_txt )
 
 	sys.exit(0)
+
+def stream( argv ):
+	""" Streaming version of the task: processes the specimens sent to the generator, one at a time, and yields the outputs where
+	    each one was saved (the accepted specimens leave the workflow).
+	"""
+	args, metrics_dir, accepted_file, rejected_file = parse_arguments( argv )
+	df = read_table( args.regexp_file, sep='\t', names=['filename', 'value'] )
+	df = df.fillna('')
+	values = {}
+	for index, row in df.iterrows():
+		values.setdefault( row['filename'], [] ).append( row['value'] )
+	metric_values = {}		# metric -> filename -> values
+	for m_name in args.metric:
+		df_metric = read_table( metrics_dir + "/" + m_name + ".csv", names=['filename', 'value'] )
+		metric_values[ m_name ] = {}
+		for index, row in df_metric.iterrows():
+			metric_values[ m_name ].setdefault( row['filename'], [] ).append( str(row['value']) )
+
+	with ExitStack() as stack:
+		f_a = stack.enter_context( open( accepted_file, "w+" ) )
+		f_r = stack.enter_context( open( rejected_file, "w+" ) )
+		f_metrics = {}
+		for m_name in args.metric:
+			f_metrics[ m_name ] = ( stack.enter_context( open( args.output_dir + "/accepted/metrics/" + m_name + ".csv", "w+" ) ),
+				stack.enter_context( open( args.output_dir + "/rejected/metrics/" + m_name + ".csv", "w+" ) ) )
+		outputs = []
+		while True:
+			filename = yield outputs
+			outputs = []
+			# As in main: the last value extracted is accepted, and every empty value rejects the specimen
+			accepted_value = None
+			for value in values.get( filename, [] ):
+				if value == '':
+					f_r.write( filename + "\n" )
+					if not (rejected_file in outputs):
+						outputs.append( rejected_file )
+				else:
+					accepted_value = value
+			if not (accepted_value is None):
+				f_a.write( filename + "\t" + accepted_value + "\n" )
+				outputs.append( accepted_file )
+			for m_name in args.metric:
+				f_m = f_metrics[ m_name ][0] if not (accepted_value is None) else f_metrics[ m_name ][1]
+				f_m.write( "".join( filename + "," + value + "\n" for value in metric_values[ m_name ].get( filename, [] ) ) )
+
+
+if __name__ == '__main__':
+	main()
@@ -25,7 +25,7 @@ from humain.constants import *
 from humain.utils import *
 
 ##############################################################################################################################################################
-if __name__ == '__main__':
+def main( argv = None ):
 	""" Accepts or rejects the values extracted by the NER process based on the local (per-biocollection) and global (iDigBio) frequency lists of the term. """
 	# Read arguments
 	parser = argparse.ArgumentParser("Accepts or rejects the values extracted by the NER process based on the local (per-biocollection) and global (iDigBio) frequency lists of the term.")
@@ -33,7 +33,7 @@ if __name__ == '__main__':
 	parser.add_argument('-ld','--local_dict_file', action="store", required=True, help="File with the dictionary or frequency list of values for the term, in the biocollection.")
 	parser.add_argument('-gd','--global_dict_file', action="store", required=True, help="Frequency list of values for the term in the iDigBio repository.")
 	parser.add_argument('-o', '--output_dir', action="store", required=True, help="Directory where the accepted values and rejected specimens will be saved")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 	
 	# Usage example:
 	# python3 ~/Fall2019/HuMaIN_Simulator/selfie/tasks/freq_lists.py -if ~/Fall2019/HuMaIN_Simulator/selfie/results/rb_ner_comfort/ner/ner.tsv 
@@ -129,4 +129,8 @@ if __name__ == '__main__':
 
 	# # Write the duration of the rejected specimens
 	# with open( args.output_dir + "/rejected/metrics/duration.csv", "w+" ) as f_rd:
-	# 	f_rd.write( text_duration_reject )				
+	# 	f_rd.write( text_duration_reject )
+
+
+if __name__ == '__main__':
+	main()
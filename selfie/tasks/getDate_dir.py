@@ -20,6 +20,8 @@
 import os, sys, argparse, re
 import pandas as pd
 
+from humain.corpus import open_corpus_file
+
 ####################################################################################################
 # Regular expressions to be considered for day, month, and year
 day = re.compile(r'\b(0?[1-9]|[12][\d]|3[01])\b')
@@ -171,13 +173,13 @@ def getDate( s ): # Return: isDate, month, day, year, length
 
 
 
-if __name__ == '__main__':
+def main( argv = None ):
 	""" Extract the event-date DC term from the text files of a directory
 	"""
 	parser = argparse.ArgumentParser("Extract the event-date DC term from the text files of a directory.")
 	parser.add_argument('-sd', '--srcdir', action="store", required=True, help="Directory where the text files are located.")
 	parser.add_argument('-o', '--output_file', action="store", required=True, help="Text file where the filename and event-date values will be saved.")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 	# Usage example
 	# python3 getDate_dir.py -sd ./test/input -o ./test/output/test.tsv
 
@@ -195,12 +197,9 @@ if __name__ == '__main__':
 	# Process each text file
 	output_text = ""
 	for filename in files_list:
-		txt_path_filename = args.srcdir + "/" + filename
-
 		# Read the content of the text file
-		f = open(txt_path_filename, 'r')
-		label = f.read().replace('\n', ' ').lower()
-		f.close()
+		with open_corpus_file( args.srcdir, filename ) as f:
+			label = f.read().replace('\n', ' ').lower()
 		
 		# Eliminate special characters
 		label = special.sub(' ', label)
@@ -214,5 +213,9 @@ if __name__ == '__main__':
 				final_date = final_date[:-1]
 			output_text += filename + '\t' + final_date + '\n'
 
-	with open(args.output_file, "w") as os:
-		os.write(output_text)
+	with open(args.output_file, "w") as f_out:
+		f_out.write(output_text)
+
+
+if __name__ == '__main__':
+	main()
@@ -25,11 +25,12 @@ from spacy.util import minibatch, compounding
 
 from humain.constants import *
 from humain.utils import *
+from humain.state import iteration_state
 
 valid_terms = ["COUNTY", "EVENTDATE", "HABITAT", "RECORDEDBY", "SCIENTIFICNAME", "STATEPROVINCE"]
 
 ##############################################################################################################################################################
-if __name__ == '__main__':
+def main( argv = None ):
 	""" Using the crowdsourced data, trains the NER model and augments the local dictionary for the term. """
 	# Read arguments
 	parser = argparse.ArgumentParser("Using the crowdsourced data, trains the NER model and augments the local dictionary for the term.")
@@ -38,7 +39,7 @@ if __name__ == '__main__':
 	parser.add_argument('-t','--term',action="store", required=True, help="Darwin Core Term to search and for which the model will be trained.")
 	parser.add_argument('-it','--iterations',action="store", required=True, help="Number of iterations to use for training.")
 	parser.add_argument('-od', '--output_dir', action="store", required=True, help="Directory with the new Spacy trained model and the new dictionary version.")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 	
 	# Usage example:
 	# python3 ~/Fall2019/HuMaIN_Simulator/selfie/tasks/learning.py -af ~/Fall2019/HuMaIN_Simulator/selfie/results/rb_ner_comfort/consensus_sim/accepted/accepted.tsv 
@@ -91,7 +92,7 @@ if __name__ == '__main__':
 		current_iteration_number = 0
 
 	################################################################################################################################
-	# LOADS THE PREVIOUS DICTIONARY (IF EXISTS)
+	# LOADS THE PREVIOUS DICTIONARY (IF EXISTS). In-process, it is kept in memory from the previous iteration.
 	################################################################################################################################
 	dictionary = {}
 	if current_iteration_number > 1:
@@ -99,11 +100,9 @@ if __name__ == '__main__':
 		previous_results_dir = results_dir.replace("_" + str(current_iteration_number), "_" + str(previous_iteration_number) )
 		previous_dict_filename = previous_results_dir + "/learning/dictionary.tsv"
 		#
+		iteration_state.flush( [ previous_dict_filename ] )
 		verify_file( previous_dict_filename, 'The previous dictionary file could not be read (' + previous_dict_filename + ').', None, 7 )
-		df_dict = pd.read_csv( previous_dict_filename, sep='\t', names = ['word', 'count'], encoding='utf8', dtype = {'word':str, 'count':int} )
-		df_dict = df_dict.fillna('')
-		for index, row in df_dict.iterrows():
-			dictionary[ row['word'] ] = int(row['count'])
+		dictionary = dict( iteration_state.get( previous_dict_filename, read_wordcount_dict ) )
 
 	################################################################################################################################
 	# Read the specimens files that will be processed
@@ -168,15 +167,10 @@ if __name__ == '__main__':
 		f_t.write( training_text )
 
 	################################################################################################################################	
-	# Save the dictionary to disk
+	# Save the dictionary (to disk in background, if the iteration state is asynchronous)
 	################################################################################################################################
-	dict_text = ""
-	for key in dictionary.keys():
-		dict_text += key + "\t" + str(dictionary[key]) + "\n"
-	#
 	new_dict_filename = results_dir + "/learning/dictionary.tsv"
-	with open( new_dict_filename, "w+" ) as f_dict:
-		f_dict.write( dict_text )
+	iteration_state.put( new_dict_filename, dictionary, write_wordcount_dict )
 	print("Dictionary saved to", new_dict_filename)
 
 	################################################################################################################################
@@ -190,7 +184,12 @@ if __name__ == '__main__':
 		base_model_name = previous_results_dir + "/learning/model"
 
 	print("Model loaded for training: " + base_model_name)
-	nlp = spacy.load( base_model_name )
+	# The model of the previous iteration is kept in memory (in-process) and taken out of it, since it is trained in place; the base
+	# model is always loaded
+	if current_iteration_number > 1:
+		nlp = iteration_state.pop( base_model_name, spacy.load )
+	else:
+		nlp = spacy.load( base_model_name )
 	print("number of Iterations: " + str(n_iter))
 	
 	# create the built-in pipeline components and add them to the pipeline. nlp.create_pipe works for built-ins that are registered with spaCy
@@ -223,6 +222,10 @@ if __name__ == '__main__':
 					losses=losses,
 				)
 	################################################################################################################################
-	# Save the trained model to the correspondent directory
-	nlp.to_disk(model_directory)
-	print("Model saved to", model_directory)
\ No newline at end of file
+	# Save the trained model to the correspondent directory (in background, if the iteration state is asynchronous)
+	iteration_state.put( model_directory, nlp, lambda path, model: model.to_disk( path ) )
+	print("Model saved to", model_directory)
+
+
+if __name__ == '__main__':
+	main()
@@ -23,11 +23,13 @@ import pandas as pd
 
 from humain.constants import *
 from humain.utils import *
+from humain.corpus import *
+from humain.state import iteration_state
 
 valid_terms = ["COUNTY", "EVENTDATE", "HABITAT", "RECORDEDBY", "SCIENTIFICNAME", "STATEPROVINCE"]
 
 ##############################################################################################################################################################
-if __name__ == '__main__':
+def main( argv = None ):
 	""" NER: Scans every sentence looking up for the term under study. """
 	# Read arguments
 	parser = argparse.ArgumentParser("NER: Scans every sentence looking up for the term under study.")
@@ -36,7 +38,7 @@ if __name__ == '__main__':
 	parser.add_argument('-md','--model_dir',action="store", required=True, help="Directory with the text files in Spacy format.")
 	parser.add_argument('-t','--term',action="store", required=True, help="Darwin Core Term to search using the trained model.")
 	parser.add_argument('-o', '--output_file', action="store", required=True, help="TSV file with the extracted term's value for each file (specimen).")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 	
 	# Usage example:
 	# python3 ~/Fall2019/HuMaIN_Simulator/selfie/tasks/ner.py -if ~/Fall2019/HuMaIN_Simulator/selfie/results/rb_ner_comfort/remaining_specimens.txt -dd ~/Fall2019/HuMaIN_Simulator/datasets/wedigbio/trn_data_spacy_format/wdb_comfort -md ~/Fall2019/HuMaIN_Simulator/selfie/results/rb_ner_comfort/learning/model -t RECORDEDBY -o ~/Fall2019/HuMaIN_Simulator/selfie/results/rb_ner_comfort/ner/ner.tsv
@@ -74,7 +76,8 @@ if __name__ == '__main__':
 	# LOAD THE MODEL
 	################################################################################################################################
 	print("Loading model from", args.model_dir)
-	nlp = spacy.load( args.model_dir )
+	# In-process, the model trained in the same iteration is already in memory
+	nlp = iteration_state.get( args.model_dir, spacy.load )
 	if not nlp:
 		print( "\nERROR: The model could not be loaded (" + args.model_dir + ").\n" )
 		sys.exit( 9 )
@@ -88,19 +91,18 @@ if __name__ == '__main__':
 	remaining_set = set( df_remaining["filename"].tolist() )
 
 	# All the data files available
-	filenames = os.listdir( args.data_dir )
-	filename_list = list(f for f in filenames if f.endswith('.txt'))
+	filename_list = list_corpus_files( args.data_dir, 'txt' )
 
 	# Intersection of both lists of files
 	filename_list = list( set(filename_list) & remaining_set)
 
 	text_to_save = ""
-	text_rejected = ""
+	rejected_list = []
 	for src_file in filename_list:
 		# start_time = time.time()
 		term_found = False
 
-		with open( args.data_dir + "/" + src_file ) as f:
+		with open_corpus_file( args.data_dir, src_file ) as f:
 			lines = f.readlines()
 		# Remove whitespace characters like `\n` at the end of each line
 		lines = [x.strip() for x in lines] 
@@ -118,7 +120,7 @@ if __name__ == '__main__':
 					term_found = True
 
 		if not term_found:
-		 	text_rejected += src_file + "\n"
+		 	rejected_list.append( src_file )
 	
 	################################################################################################################################
 	# SAVE THE OUTPUT FILES
@@ -126,6 +128,9 @@ if __name__ == '__main__':
 	# Write the candidate values to the output file
 	with open( args.output_file, "w+" ) as f_a:
 		f_a.write( text_to_save )
-	with open( rejected_filename, "w+" ) as f_r:
-		f_r.write( text_rejected )
-	
\ No newline at end of file
+	# The rejected specimens are also kept in memory for the selection of the next subset
+	iteration_state.put( rejected_filename, rejected_list, write_specimen_list )
+
+
+if __name__ == '__main__':
+	main()
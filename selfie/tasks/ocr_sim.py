@@ -18,14 +18,16 @@
 ##########################################################################################
 
 import os, sys, argparse
-import pandas as pd
-from shutil import copyfile
+from contextlib import ExitStack
 
 from humain.constants import *
 from humain.utils import *
+from humain.store import *
+from humain.corpus import *
+from humain.specimen_ids import specimen_registry
 
-if __name__ == '__main__':
-	""" Using a list of specimens' images, create a copy of their OCR-ed data.
+def parse_arguments( argv ):
+	""" Parses and validates the arguments of the task (the output directories are created).
 	"""
 	parser = argparse.ArgumentParser("Using a list of specimens' images, create a copy of their OCR-ed data.")
 	parser.add_argument('-id', '--ocr_input_dir', action="append", required=True, help="Directory with the OCR-ed data. Including the 'metrics' subdirectory.")
@@ -33,7 +35,8 @@ if __name__ == '__main__':
 	parser.add_argument('-sl', '--specimens_list', action="store", required=True, help="TXT file with the list of specimens that will be OCR-ed (one per line).")
 	parser.add_argument('-m', '--metric', action="append", required=True, help="One or more metrics that will be collected during the OCR execution.")	
 	parser.add_argument('-od', '--output_dir', action="store", required=True, help="Directory where the OCR-ed values and metrics will be saved.")
-	args = parser.parse_args()
+	parser.add_argument('-sm', '--selection', action="store", required=False, default=os.environ.get( SELECTION_ENV ) or DEFAULT_SELECTION_MODE, help="How the selected files are placed in the output directory: " + ", ".join( SELECTION_MODES ) + " (selection manifest). Default: the " + SELECTION_ENV + " environment variable, or " + DEFAULT_SELECTION_MODE + ".")
+	args = parser.parse_args( argv )
 
 	# Usage:
 	# python3 ocr.py -id ~/Fall2019/HuMaIN_Simulator/datasets/aocr_mix100/ocr/ocropus -i True -sl ~/Fall2019/HuMaIN_Simulator/datasets/aocr_mix100/specimen_list.txt -m duration -od ~/Fall2019/HuMaIN_Simulator/selfie/results/event_date/ocr
@@ -67,49 +70,131 @@ if __name__ == '__main__':
 	# args.output_dir
 	verify_create_dir( args.output_dir, 'The output directory (' + args.output_dir + ') was not found and could not be created.', parser, 6 )
 	verify_create_dir( args.output_dir + "/metrics", 'The metrics output directory (' + (args.output_dir  + "/metrics") + ') was not found and could not be created.', parser, 7 )
-	
+
+	# args.selection
+	if not (args.selection in SELECTION_MODES):
+		print("\nERROR: Invalid value for the --selection parameter (" + args.selection + "). It must be one of: " + ", ".join( SELECTION_MODES ) + ".\n")
+		parser.print_help()
+		sys.exit(8)
+
+	args.include = arg_include
+	return( args )
+
+def select_files( input_dir, specimens_list, include ):
+	""" OCR-ed files of the input directory to process: the ones in the list of specimens (include) or the others. In the order of the list
+	    of specimens, or of the directory.
+	"""
+	# List of OCR-ed files in the input directory
+	ocred_files_list = list_corpus_files( input_dir, 'txt' )
+	# List of files in the specimens list
+	included_list = []
+	with open_dataset( specimens_list ) as f:
+		line = f.readline()
+		while line:
+			line = line.strip().replace('.jpg', '.txt')
+			included_list += [line]
+			line = f.readline()
+	# Files to process
+	ocred_files_set = set( ocred_files_list )
+	included_set = set( included_list )
+	if include:
+		candidates = [ filename for filename in included_list if filename in ocred_files_set ]
+	else:
+		candidates = [ filename for filename in ocred_files_list if not (filename in included_set) ]
+	return( list( dict.fromkeys( candidates ) ) )
+
+def main( argv = None ):
+	""" Using a list of specimens' images, create a copy of their OCR-ed data.
+	"""
+	args = parse_arguments( argv )
+
 	################################################################################################################################
 	# SPECIMENS SELECTION
 	################################################################################################################################
+	selection = []		# (input directory, filename) of the selection manifest
 	for input_dir in args.ocr_input_dir:
-		# List of OCR-ed files in the input directory
-		filenames = os.listdir( input_dir )
-		ocred_files_list = list(f for f in filenames if f.endswith('.txt'))
-		# List of files in the specimens list
-		included_list = []
-		with open(args.specimens_list, "r") as f:
-			line = f.readline()
-			while line:
-				line = line.strip().replace('.jpg', '.txt')
-				included_list += [line]
-				line = f.readline()
-		# Files to process
-		ocred_files_set = set( ocred_files_list )
-		included_set = set( included_list )
-		selected_files_set = set()
-		if arg_include:
-			selected_files_set = included_set & ocred_files_set
-		else:
-			selected_files_set = ocred_files_set - included_set
-		selected_files_list = list( selected_files_set )
+		selected_files_list = select_files( input_dir, args.specimens_list, args.include )
 
-		# Copy the OCR-ed files
-		for filename in selected_files_list:
-			copyfile(input_dir + "/" + filename, args.output_dir + "/" + filename)
+		# Copy (or link) the OCR-ed files, or add them to the selection manifest
+		if args.selection == 'manifest':
+			selection += [ ( input_dir, filename ) for filename in selected_files_list ]
+		else:
+			for filename in selected_files_list:
+				select_corpus_file( input_dir, filename, args.output_dir, args.selection )
 
-		# Create the metric files and copy the correspondent values
+		# Create the metric files and copy the correspondent values (the metrics of the images are matched by the integer IDs of
+		# their specimens)
+		registry = specimen_registry( input_dir )
 		for m_name in args.metric:
 			input_metric_file = input_dir + "/metrics/" + m_name + ".csv"
-			df_m = pd.read_csv( input_metric_file, sep=',', names=['filename', 'metric_value'] )
+			df_m = read_table( input_metric_file, sep=',', names=['filename', 'metric_value'] )
 			df_m = df_m.fillna('')
 			# Copy just the right lines
-			m_text = ""
-			for index, row in df_m.iterrows():
-				m_filename = row['filename'].replace('.jpg','.txt')
-				if m_filename in selected_files_list:
-					m_line = m_filename + "," + str(row['metric_value']) + "\n"
-					m_text += m_line
+			m_filenames = [ filename.replace('.jpg','.txt') for filename in df_m['filename'] ]
+			selected = registry.isin( m_filenames, selected_files_list )
+			m_text = "".join( m_filename + "," + str(metric_value) + "\n"
+				for m_filename, metric_value, is_selected in zip( m_filenames, df_m['metric_value'], selected ) if is_selected )
 			# Save the metric information (Incremental)
 			output_metric_file = args.output_dir + "/metrics/" + m_name + ".csv"
 			with open(output_metric_file, "a+") as f_m:
 				f_m.write(m_text)
+
+	# The selection manifest replaces the one of a previous execution
+	if args.selection == 'manifest':
+		write_selection( args.output_dir, selection )
+	else:
+		remove_selection( args.output_dir )
+
+def specimens( argv ):
+	""" Specimens selected from the OCR-ed data, once each (first task of a streaming execution).
+	"""
+	args = parse_arguments( argv )
+	selected = {}
+	for input_dir in args.ocr_input_dir:
+		selected.update( dict.fromkeys( select_files( input_dir, args.specimens_list, args.include ) ) )
+	for filename in selected:
+		yield filename
+
+def stream( argv ):
+	""" Streaming version of the task: copies the OCR-ed data of the specimens sent to the generator, one at a time, and yields the
+	    outputs where each one was saved.
+	"""
+	args = parse_arguments( argv )
+	ocred_files = {}
+	metric_lines = {}		# (input directory, metric) -> filename -> lines
+	for input_dir in args.ocr_input_dir:
+		ocred_files[ input_dir ] = set( list_corpus_files( input_dir, 'txt' ) )
+		for m_name in args.metric:
+			df_m = read_table( input_dir + "/metrics/" + m_name + ".csv", sep=',', names=['filename', 'metric_value'] )
+			df_m = df_m.fillna('')
+			lines = {}
+			for index, row in df_m.iterrows():
+				m_filename = row['filename'].replace('.jpg','.txt')
+				lines.setdefault( m_filename, [] ).append( m_filename + "," + str(row['metric_value']) + "\n" )
+			metric_lines[ (input_dir, m_name) ] = lines
+
+	# The metric values are appended, as in main. The selection manifest is written as the specimens arrive.
+	with ExitStack() as stack:
+		f_metrics = { m_name: stack.enter_context( open( args.output_dir + "/metrics/" + m_name + ".csv", "a+" ) ) for m_name in args.metric }
+		if args.selection == 'manifest':
+			f_selection = stack.enter_context( open( args.output_dir + "/" + SELECTION_FILENAME, "w+" ) )
+		else:
+			remove_selection( args.output_dir )
+		outputs = []
+		while True:
+			filename = yield outputs
+			outputs = []
+			for input_dir in args.ocr_input_dir:
+				if filename in ocred_files[ input_dir ]:
+					if args.selection == 'manifest':
+						f_selection.write( os.path.abspath( input_dir ) + "\t" + filename + "\n" )
+						f_selection.flush()
+					else:
+						select_corpus_file( input_dir, filename, args.output_dir, args.selection )
+					for m_name in args.metric:
+						f_metrics[ m_name ].write( "".join( metric_lines[ (input_dir, m_name) ].get( filename, [] ) ) )
+					outputs = [ args.output_dir + "/" + filename ]
+
+
+if __name__ == '__main__':
+	main()
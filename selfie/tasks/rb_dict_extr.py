@@ -18,14 +18,15 @@
 # and limitations under the License.
 ##########################################################################################
 
-import os, sys, argparse, re, codecs, time
+import os, sys, argparse, re, time
 import pandas as pd
 
 from humain.constants import *
 from humain.utils import *
+from humain.corpus import *
 
 ##############################################################################################################################################################
-if __name__ == '__main__':
+def main( argv = None ):
 	""" Extraction of the Recorded-by term using a dictionary. """
 	# Read arguments
 	parser = argparse.ArgumentParser("Extraction of the term via brute-force, using a dictionary.")
@@ -33,7 +34,7 @@ if __name__ == '__main__':
 	parser.add_argument('-d','--dict_file',action="store", required=True, help="Dictionary file.")
 	parser.add_argument('-t','--threshold',action="store", required=False, type=int, default=1, help="Minimum count registered in the dictionary for an entry to be accepted.")
 	parser.add_argument('-o', '--output_dir', action="store", required=True, help="Directory where the accepted values and rejected specimens will be saved")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 	
 	# Usage example:
 	# python3 ~/Summer2019/HuMaIN/rb_dict_extr.py -i ~/Fall2019/HuMaIN_Simulator/selfie/results/recorded_by/ocr -d ~/Fall2019/HuMaIN_Simulator/selfie/results/recorded_by/rb_create_dict/dictionary.tsv -o ~/Fall2019/HuMaIN_Simulator/selfie/results/recorded_by/rb_dict_extr
@@ -83,8 +84,7 @@ if __name__ == '__main__':
 
 	################################################################################################################################
 	# Read the specimens files that will be processed
-	filenames = os.listdir( args.input_dir )
-	filename_list = list(f for f in filenames if f.endswith('.txt'))
+	filename_list = list_corpus_files( args.input_dir, 'txt' )
 
 	text_accept = ""
 	text_reject = ""
@@ -95,9 +95,7 @@ if __name__ == '__main__':
 		start_time = time.time()
 
 		# Read the content of the text file, coverting to unicode
-		f = codecs.open(args.input_dir + "/" + src_file, encoding='utf-8', mode='r')
-		data = f.read().replace('\n', ' ').replace('  ', ' ').lower()
-		f.close()
+		data = read_corpus_text( args.input_dir, src_file ).replace('\n', ' ').replace('  ', ' ').lower()
 
 		# Eliminate special characters
 		pattern = re.compile('[\W_]+')
@@ -130,4 +128,8 @@ if __name__ == '__main__':
 
 	# Write the duration of the rejected specimens
 	with open( args.output_dir + "/rejected/metrics/duration.csv", "w+" ) as f_rd:
-		f_rd.write( text_duration_reject )				
+		f_rd.write( text_duration_reject )
+
+
+if __name__ == '__main__':
+	main()
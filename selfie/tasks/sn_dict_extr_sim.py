@@ -23,8 +23,10 @@ import pandas as pd
 
 from humain.constants import *
 from humain.utils import *
+from humain.store import *
+from humain.specimen_ids import specimen_registry, merge_specimens
 
-if __name__ == '__main__':
+def main( argv = None ):
 	""" Simulation of the extraction of scientific names by using a dictionary to scan the words of the text files.
 	"""
 	parser = argparse.ArgumentParser("Simulation of the extraction of scientific names by using a dictionary to scan the words of the text files.")
@@ -33,7 +35,7 @@ if __name__ == '__main__':
 	parser.add_argument('-d', '--dict_extr_dir', action="store", required=True, help="Directory with the result of the extraction of scientific names by using a dictionary.")
 	parser.add_argument('-m', '--metric', action="append", required=False, help="One or more metrics that will be collected when verifying the scientific name.")
 	parser.add_argument('-o', '--output_dir', action="store", required=True, help="Directory where the accepted and rejected extractions will be stored.")
-	args = parser.parse_args()	
+	args = parser.parse_args( argv )	
 
 	# Usage example:
 	# python3 sn_dict_extr.py -s ~/Summer2019/HuMaIN_Simulator/selfie/results/scientific_name/sn_suffix_ds/rejected/rejected.tsv -n ~/Summer2019/HuMaIN_Simulator/selfie/results/scientific_name/sn_norm_dict/rejected/rejected.tsv -d ~/Summer2019/HuMaIN_Simulator/datasets/aocr_mix100/sn_dict_extr/ocropus -m duration -o ~/Summer2019/HuMaIN_Simulator/selfie/results/scientific_name/sn_dict_extr
@@ -96,20 +98,22 @@ if __name__ == '__main__':
 	df_n = df_n.fillna('')
 
 	df_files = pd.concat([df_s, df_n])
+	# The tables are joined on the integer IDs of their specimens
+	registry = specimen_registry( args.dict_extr_dir )
 
 	################################################################################################################################
-	# Load the scientific name extracted using the dictionary extraction task
-	df_a = pd.read_csv( dict_accepted_file, sep='\t', names=['filename', 'candidate', 'dict_entry'] )
+	# Load the scientific name extracted using the dictionary extraction task (only of the rejected specimens)
+	df_a = read_table( dict_accepted_file, specimens=df_files['filename'], columns=['filename', 'dict_entry'], sep='\t', names=['filename', 'candidate', 'dict_entry'], dtype=str )
 	df_a = df_a.fillna('')
 
-	df_accepted = pd.merge(df_files, df_a, on='filename')[['filename','dict_entry']]
+	df_accepted = merge_specimens( registry, df_files, df_a )[['filename','dict_entry']]
 	df_accepted.to_csv(output_accepted_file, sep='\t', index=False, header=False)
 	################################################################################################################################
 	# Load the specimens (filenames) for which no scientific name could be extracted using the dictionary extraction task
-	df_r = pd.read_csv( dict_rejected_file, sep='\t', names=['filename'] )
+	df_r = read_table( dict_rejected_file, specimens=df_files['filename'], sep='\t', names=['filename'], dtype=str )
 	df_r = df_r.fillna('')
 
-	df_rejected = pd.merge(df_files, df_r, on='filename')
+	df_rejected = merge_specimens( registry, df_files, df_r )
 	df_rejected.to_csv(output_rejected_file, sep='\t', index=False, header=False)
 	################################################################################################################################
 
@@ -124,10 +128,14 @@ if __name__ == '__main__':
 		output_metric_file_rejected = args.output_dir + "/rejected/metrics/" + m_name + ".csv"
 
 		# Accepted metric file
-		df_am = pd.read_csv( input_metric_file_accepted, sep=',', names=['filename', 'value'] )
-		df_accepted_m = pd.merge(df_files, df_am, on='filename')
+		df_am = read_table( input_metric_file_accepted, sep=',', names=['filename', 'value'] )
+		df_accepted_m = merge_specimens( registry, df_files, df_am )
 		df_accepted_m.to_csv(output_metric_file_accepted, sep=',', index=False, header=False)
 		# Rejected metric file
-		df_rm = pd.read_csv( input_metric_file_rejected, sep=',', names=['filename', 'value'] )
-		df_rejected_m = pd.merge(df_files, df_rm, on='filename')
+		df_rm = read_table( input_metric_file_rejected, sep=',', names=['filename', 'value'] )
+		df_rejected_m = merge_specimens( registry, df_files, df_rm )
 		df_rejected_m.to_csv(output_metric_file_rejected, sep=',', index=False, header=False)
+
+
+if __name__ == '__main__':
+	main()
@@ -19,12 +19,11 @@
 ##########################################################################################
 
 import argparse, shutil
-from shutil import copyfile
 
 from humain.constants import *
 from humain.utils import *
 
-if __name__ == '__main__':
+def main( argv = None ):
 	""" Normalization of the scientific-names candidates, previously extracted using suffixes, in a dictionary of scientific names.
 	"""
 	parser = argparse.ArgumentParser("Normalization of the scientific-names candidates, previously extracted using suffixes, in a dictionary of scientific names.")
@@ -32,7 +31,7 @@ if __name__ == '__main__':
 	parser.add_argument('-n', '--norm_dir', action="store", required=True, help="Directory with the accepted and rejected candidate values and metrics.")
 	parser.add_argument('-m', '--metric', action="append", required=False, help="One or more metrics that will be collected when verifying the scientific name.")
 	parser.add_argument('-o', '--output_dir', action="store", required=True, help="Directory where the accepted and rejected extractions will be stored.")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 
 	# Usage example: 
 	# python3 sn_dict_norm.py -f ~/Summer2019/HuMaIN_Simulator/selfie/results/scientific_name/sn_suffix_ds/accepted/accepted.tsv -n ~/Summer2019/HuMaIN_Simulator/datasets/aocr_mix100/sn_norm_dict/ocropus -m duration -o ~/Summer2019/HuMaIN_Simulator/selfie/results/scientific_name/sn_norm_dict
@@ -87,9 +86,12 @@ if __name__ == '__main__':
 	verify_create_dir( args.output_dir + "/rejected/metrics", 'The output metrics directory for the rejected specimens could not be created.', parser, 17 )
 
 	################################################################################################################################
+	# Specimens of the input (only their values are copied)
+	specimens = read_specimen_set( args.candidates_file )
+
 	# Copy the accepted values
 	try:
-		copyfile(norm_accepted_file, output_accepted_file)
+		copy_specimen_lines(norm_accepted_file, output_accepted_file, specimens)
 	except IOError as e:
 		print("\nERROR: Unable to copy the accepted file. %s\n" % norm_accepted_file)
 		sys.exit( 18 )
@@ -99,7 +101,7 @@ if __name__ == '__main__':
 
 	# Copy the rejected specimens
 	try:
-		copyfile(norm_rejected_file, output_rejected_file)
+		copy_specimen_lines(norm_rejected_file, output_rejected_file, specimens)
 	except IOError as e:
 		print("\nERROR: Unable to copy the rejected file. %s\n" % norm_rejected_file)
 		sys.exit( 19 )
@@ -115,7 +117,7 @@ if __name__ == '__main__':
 		output_metric_file_rejected = args.output_dir + "/rejected/metrics/" + m_name + ".csv"
 		# Copy the accepted metric file
 		try:
-			copyfile(metric_file_accepted, output_metric_file_accepted)
+			copy_specimen_lines(metric_file_accepted, output_metric_file_accepted, specimens, ',')
 		except IOError as e:
 			print("\nERROR: Unable to copy the accepted metric file. %s\n" % metric_file_accepted)
 			sys.exit( 20 )
@@ -124,7 +126,7 @@ if __name__ == '__main__':
 			sys.exit( 20 )
 		# Copy the rejected metric file
 		try:
-			copyfile(metric_file_rejected, output_metric_file_rejected)
+			copy_specimen_lines(metric_file_rejected, output_metric_file_rejected, specimens, ',')
 		except IOError as e:
 			print("\nERROR: Unable to copy the rejected metric file. %s\n" % metric_file_rejected)
 			sys.exit( 20 )
@@ -133,3 +135,7 @@ if __name__ == '__main__':
 			sys.exit( 20 )
 
 	sys.exit(0)
+
+
+if __name__ == '__main__':
+	main()
@@ -19,12 +19,11 @@
 
 import argparse, shutil
 import pandas as pd
-from shutil import copyfile
 
 from humain.constants import *
 from humain.utils import *
 
-if __name__ == '__main__':
+def main( argv = None ):
 	""" Simulated version of the extraction of Scientific Name candidates by suffixes
 	"""
 	parser = argparse.ArgumentParser("Simulated version of the extraction of Scientific Name candidates by suffixes.")
@@ -32,7 +31,7 @@ if __name__ == '__main__':
 	parser.add_argument('-s', '--suffix_dir', action="store", required=True, help="File with the Scientific Name candidates extracted using suffixes algorithm.")	
 	parser.add_argument('-m', '--metric', action="append", required=False, help="One or more metrics that will be collected when running the regular expression extraction.")
 	parser.add_argument('-o', '--output_dir', action="store", required=True, help="Directory where the accepted and rejected extractions will be stored.")
-	args = parser.parse_args()
+	args = parser.parse_args( argv )
 
 	# Usage example: 
 	# python3 sn_suffix_ds.py -d ~/Summer2019/HuMaIN_Simulator/selfie/results/scientific_name/ocr_ds -s ~/Summer2019/HuMaIN_Simulator/datasets/aocr_mix100/sn_suffix/ocropus -m duration -o ~/Summer2019/HuMaIN_Simulator/selfie/results/scientific_name/sn_suffix_ds
@@ -87,9 +86,12 @@ if __name__ == '__main__':
 	verify_create_dir( args.output_dir + "/rejected/metrics", 'The output metrics directory for the rejected specimens could not be created.', parser, 17 )
 
 	################################################################################################################################
+	# Specimens of the input (only their values are copied)
+	specimens = set( list_files_ext( args.fulltext_dir, 'txt' ) )
+
 	# Copy the accepted values
 	try:
-		copyfile(suff_accepted_file, output_accepted_file)
+		copy_specimen_lines(suff_accepted_file, output_accepted_file, specimens)
 	except IOError as e:
 		print("\nERROR: Unable to copy the accepted file. %s\n" % suff_accepted_file)
 		sys.exit( 18 )
@@ -99,7 +101,7 @@ if __name__ == '__main__':
 
 	# Copy the rejected specimens
 	try:
-		copyfile(suff_rejected_file, output_rejected_file)
+		copy_specimen_lines(suff_rejected_file, output_rejected_file, specimens)
 	except IOError as e:
 		print("\nERROR: Unable to copy the rejected file. %s\n" % suff_rejected_file)
 		sys.exit( 19 )
@@ -115,7 +117,7 @@ if __name__ == '__main__':
 		output_metric_file_rejected = args.output_dir + "/rejected/metrics/" + m_name + ".csv"
 		# Copy the accepted metric file
 		try:
-			copyfile(metric_file_accepted, output_metric_file_accepted)
+			copy_specimen_lines(metric_file_accepted, output_metric_file_accepted, specimens, ',')
 		except IOError as e:
 			print("\nERROR: Unable to copy the accepted metric file. %s\n" % metric_file_accepted)
 			sys.exit( 20 )
@@ -124,7 +126,7 @@ if __name__ == '__main__':
 			sys.exit( 20 )
 		# Copy the rejected metric file
 		try:
-			copyfile(metric_file_rejected, output_metric_file_rejected)
+			copy_specimen_lines(metric_file_rejected, output_metric_file_rejected, specimens, ',')
 		except IOError as e:
 			print("\nERROR: Unable to copy the rejected metric file. %s\n" % metric_file_rejected)
 			sys.exit( 20 )
@@ -133,3 +135,7 @@ if __name__ == '__main__':
 			sys.exit( 20 )
 
 	sys.exit(0)
+
+
+if __name__ == '__main__':
+	main()
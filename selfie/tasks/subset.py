@@ -22,9 +22,17 @@ import pandas as pd
 
 from humain.constants import *
 from humain.utils import *
+from humain.state import iteration_state
 
 ##############################################################################################################################################################
-if __name__ == '__main__':
+# Specimens of a rejected file (TSV file with the unnamed columns 'specimen' and, optionally, 'value')
+def read_rejected_specimens( rejected_file ):
+	df_r = pd.read_csv( rejected_file, sep='\t', names = ['specimen', 'value'] )
+	df_r.fillna('', inplace= True)
+	return( list(df_r['specimen']) )
+
+##############################################################################################################################################################
+def main( argv = None ):
 	""" Randomly selects n specimens from the unprocessed specimens"""
 	# Read arguments
 	parser = argparse.ArgumentParser("Randomly selects n specimens from the unprocessed specimens")
@@ -32,7 +40,8 @@ if __name__ == '__main__':
 	parser.add_argument('-n','--subset_size',action="store", required=True, help="Number of specimens to select in every subset.")
 	parser.add_argument('-mt','--m_ar_task',action="append", required=False, help="Accept/Reject directory generated by a machine task. Rejected specimens will be reprocessed.")
 	parser.add_argument('-o', '--output_file', action="store", required=True, help="Text file where the list of selected specimens will be saved.")
-	args = parser.parse_args()
+	parser.add_argument('-s', '--seed', action="store", required=False, default=os.environ.get( SEED_ENV ), help="Seed of the random selection (default: the " + SEED_ENV + " environment variable, if defined). Every iteration uses a different stream.")
+	args = parser.parse_args( argv )
 
 	# Usage example:
 	# python3 ~/Fall2019/HuMaIN_Simulator/selfie/tasks/subset.py -i ~/Fall2019/HuMaIN_Simulator/datasets/aocr_mix100/specimen_list.txt -n 20 -mt rb_dict_extr -o ~/Fall2019/HuMaIN_Simulator/selfie/results/recorded_by_hitl/iteration_2/selected_specimens.txt
@@ -84,11 +93,10 @@ if __name__ == '__main__':
 		# Machine self-aware tasks
 		for m_task in args.m_ar_task:
 			rejected_file = previous_results_dir + "/" + m_task + "/rejected/rejected.txt"
+			iteration_state.flush( [ rejected_file ] )
 			verify_file( rejected_file, 'Rejected file was not found for task ' + m_task + ' in the iteration directory ' + previous_results_dir +  '.', None, 5 )
-			# Open the file and add to the set the 
-			df_r = pd.read_csv( rejected_file, sep='\t', names = ['specimen', 'value'] )
-			df_r.fillna('', inplace= True)
-			available_specimens = available_specimens | set(df_r['specimen'])
+			# Add to the set the rejected specimens (in-process, kept in memory by the task of the previous iteration)
+			available_specimens = available_specimens | set( iteration_state.get( rejected_file, read_rejected_specimens ) )
 
 	##########################################################################################		
 	# GENERATE THE LIST OF SELECTED SPECIMENS
@@ -98,7 +106,9 @@ if __name__ == '__main__':
 	elif len(available_specimens) <= subset_size:
 		selected_specimens = available_specimens
 	else:
-		selected_specimens = random.sample( available_specimens, subset_size )
+		# With a seed, the selection is reproducible (the same for a seed and iteration, in-process or in a subprocess)
+		rng = random.Random( args.seed + "-" + str(current_iteration_number) ) if args.seed else random
+		selected_specimens = rng.sample( sorted(available_specimens), subset_size )
 
 	##########################################################################################		
 	# SAVE THE SUBSET OF SELECTED SPECIMENS
@@ -120,4 +130,8 @@ if __name__ == '__main__':
 	with open( os.path.dirname(args.output_file) + "/remaining_specimens.txt", "w+" ) as f_r:
 		f_r.write( output_text )
 
-	sys.exit(0)
\ No newline at end of file
+	sys.exit(0)
+
+
+if __name__ == '__main__':
+	main()